@@ -0,0 +1,122 @@
+"""Cache of final SLH transaction receipts, keyed by tx hash.
+
+A receipt buried under `confirmations` blocks will not change any more,
+so once a sale tx gets that deep its status and decoded Transfer logs are
+kept in the `tx_receipts` table, with a small in-process LRU in front of
+it. A repeat verification then needs no RPC at all. Receipts that are
+not deep enough yet are never stored.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import db
+
+logger = logging.getLogger("slhnet.receipts")
+
+SLH_CONFIRMATIONS = int(os.environ.get("SLH_CONFIRMATIONS", "15"))
+
+
+@dataclass(frozen=True)
+class CachedReceipt:
+    tx_hash: str
+    block_number: int
+    status: int
+    transfers: List[Dict[str, Any]]  # [{"from", "to", "value": int}]
+
+
+class ReceiptCache:
+    def __init__(
+        self,
+        confirmations: int = SLH_CONFIRMATIONS,
+        max_memory: int = 10_000,
+        load: Callable[[str], Optional[Dict[str, Any]]] = db.get_tx_receipt,
+        store: Callable[..., None] = db.store_tx_receipt,
+    ) -> None:
+        self.confirmations = max(1, confirmations)
+        self.max_memory = max_memory
+        self._load = load
+        self._store = store
+        self._memory: "OrderedDict[str, CachedReceipt]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"memory_hits": 0, "store_hits": 0, "misses": 0, "stored": 0, "store_errors": 0}
+
+    def is_final(self, block_number: int, head: int) -> bool:
+        return head - block_number + 1 >= self.confirmations
+
+    def _remember(self, receipt: CachedReceipt) -> None:
+        with self._lock:
+            self._memory[receipt.tx_hash] = receipt
+            self._memory.move_to_end(receipt.tx_hash)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def get(self, tx_hash: str) -> Optional[CachedReceipt]:
+        """Final receipt for tx_hash if it was cached before, else None. Blocking."""
+        tx_hash = tx_hash.lower()
+        with self._lock:
+            receipt = self._memory.get(tx_hash)
+            if receipt is not None:
+                self._memory.move_to_end(tx_hash)
+                self.stats["memory_hits"] += 1
+                return receipt
+        try:
+            row = self._load(tx_hash)
+        except Exception as e:
+            logger.warning("Receipt cache lookup failed for %s: %s", tx_hash, e)
+            row = None
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        receipt = CachedReceipt(
+            tx_hash=tx_hash,
+            block_number=int(row["block_number"]),
+            status=int(row["status"]),
+            transfers=[
+                {"from": t["from"], "to": t["to"], "value": int(t["value"])}
+                for t in row["transfers"]
+            ],
+        )
+        self.stats["store_hits"] += 1
+        self._remember(receipt)
+        return receipt
+
+    def put(
+        self, tx_hash: str, block_number: int, status: int, transfers: List[Dict[str, Any]], head: int
+    ) -> bool:
+        """
+        Cache the receipt if it is final at chain head `head`. Blocking; True if it
+        was persisted (a failed write still keeps it in memory for this process).
+        """
+        if not self.is_final(block_number, head):
+            return False
+        receipt = CachedReceipt(tx_hash.lower(), block_number, status, list(transfers))
+        self._remember(receipt)
+        try:
+            self._store(
+                receipt.tx_hash,
+                block_number,
+                status,
+                # uint256 does not fit a JSON number safely – store it as a string
+                [{"from": t["from"], "to": t["to"], "value": str(t["value"])} for t in transfers],
+            )
+        except Exception as e:
+            logger.warning("Failed to persist receipt %s: %s", receipt.tx_hash, e)
+            self.stats["store_errors"] += 1
+            return False
+        self.stats["stored"] += 1
+        return True
+
+
+_receipt_cache: Optional[ReceiptCache] = None
+
+
+def get_receipt_cache() -> ReceiptCache:
+    global _receipt_cache
+    if _receipt_cache is None:
+        _receipt_cache = ReceiptCache()
+    return _receipt_cache
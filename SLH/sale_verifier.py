@@ -0,0 +1,364 @@
+"""Async verification of SLH sale transactions.
+
+Submitted tx hashes go through a queue and are checked by a few worker
+tasks. Receipts are fetched with async JSON-RPC calls over httpx, so the
+event loop is never blocked. Each RPC endpoint has its own concurrency
+limit, and a tx that is not mined yet is retried with exponential backoff.
+Finished checks are written to `token_sales` in batches (one row per tx
+hash), and the future returned by `submit()` resolves once its row is
+stored. Final receipts
+are kept in the receipt cache, so re-checking a tx needs no RPC.
+"""
+
+import asyncio
+import logging
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+import db_async
+from SLH.receipt_cache import ReceiptCache, get_receipt_cache
+from SLH.slh_token import SLH_CHAIN_ID, decode_transfer_logs, evaluate_receipt, preload_eth_utils
+
+logger = logging.getLogger("slhnet.sale_verifier")
+
+TX_HASH_RE = re.compile(r"^0x[0-9a-fA-F]{64}$")
+
+SaleRow = Tuple[int, str, int, float, str, str, Optional[str], Optional[int]]
+# returns (sale_id, already_verified) per row, in input order
+SaveBatch = Callable[[List[SaleRow]], Awaitable[List[Tuple[int, bool]]]]
+
+
+@dataclass(frozen=True)
+class SaleResult:
+    tx_hash: str
+    ok: bool
+    message: str
+    amount_slh: Optional[float]
+    block_number: Optional[int]
+    sale_id: Optional[int] = None
+    # the tx was already stored as a verified sale before this check
+    already_credited: bool = False
+
+    @property
+    def status(self) -> str:
+        return "verified" if self.ok else "failed"
+
+
+@dataclass
+class _SaleCheck:
+    user_id: int
+    tx_hash: str
+    wallet_address: str
+    min_amount: float
+    future: "asyncio.Future[SaleResult]"
+    attempts: int = 0
+    last_error: str = field(default="")
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return (self.tx_hash, self.user_id)
+
+
+class SaleVerifier:
+    def __init__(
+        self,
+        rpc_urls: Sequence[str],
+        per_rpc_concurrency: int = 4,
+        workers: int = 8,
+        max_queue: int = 1000,
+        max_attempts: int = 10,
+        base_delay: float = 3.0,
+        max_delay: float = 60.0,
+        flush_interval: float = 1.0,
+        flush_size: int = 50,
+        timeout: float = 10.0,
+        chain_id: int = SLH_CHAIN_ID,
+        save: SaveBatch = db_async.create_token_sales,
+        receipts: Optional[ReceiptCache] = None,
+    ) -> None:
+        if not rpc_urls:
+            raise ValueError("at least one RPC url is required")
+        self.rpc_urls = list(rpc_urls)
+        self.per_rpc_concurrency = per_rpc_concurrency
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.timeout = timeout
+        self.chain_id = chain_id
+        self._save = save
+        self._receipts = receipts if receipts is not None else get_receipt_cache()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_use: Dict[str, int] = {url: 0 for url in self.rpc_urls}
+        self._tasks: List[asyncio.Task] = []
+        # keyed by (tx_hash, user_id): a user only shares the future of their own check
+        self._retries: Dict[Tuple[str, int], asyncio.TimerHandle] = {}
+        self._inflight: Dict[Tuple[str, int], _SaleCheck] = {}
+        self._done: List[Tuple[_SaleCheck, SaleResult]] = []
+        self._flush_now: Optional[asyncio.Event] = None
+        self._warmup: Optional["asyncio.Future[None]"] = None
+        self.stats: Dict[str, int] = {
+            "submitted": 0, "verified": 0, "failed": 0, "retries": 0, "rpc_errors": 0, "saved": 0,
+            "cached": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._flush_now = asyncio.Event()
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        # the first checksum() would otherwise import eth_utils on the event loop
+        self._warmup = loop.run_in_executor(None, preload_eth_utils)
+        self._limits = {url: asyncio.Semaphore(self.per_rpc_concurrency) for url in self.rpc_urls}
+        self._tasks = [
+            loop.create_task(self._worker(), name=f"sale-verifier-{i}") for i in range(self.workers)
+        ]
+        self._tasks.append(loop.create_task(self._flusher(), name="sale-verifier-flush"))
+        logger.info(
+            "Sale verifier started (%s workers, %s RPC endpoints x %s)",
+            self.workers, len(self.rpc_urls), self.per_rpc_concurrency,
+        )
+
+    def submit(
+        self, user_id: int, tx_hash: str, wallet_address: str, min_amount: float
+    ) -> "asyncio.Future[SaleResult]":
+        """
+        Queue a tx for verification. The same tx already in progress for the same
+        user shares its future; another user submitting it gets a check of their
+        own, and only the first one stored is credited.
+        """
+        tx_hash = tx_hash.strip()
+        if not TX_HASH_RE.match(tx_hash):
+            raise ValueError("tx_hash לא תקין")
+        tx_hash = tx_hash.lower()
+        if not self._tasks:
+            self.start()
+        existing = self._inflight.get((tx_hash, user_id))
+        if existing is not None:
+            return existing.future
+        if len(self._inflight) >= self.max_queue:
+            raise RuntimeError("יותר מדי עסקאות ממתינות לבדיקה, נסה שוב בעוד כמה דקות")
+
+        check = _SaleCheck(
+            user_id=user_id,
+            tx_hash=tx_hash,
+            wallet_address=wallet_address,
+            min_amount=min_amount,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._inflight[check.key] = check
+        self._queue.put_nowait(check)
+        self.stats["submitted"] += 1
+        return check.future
+
+    # ---------- RPC ----------
+
+    def _pick_endpoint(self) -> str:
+        return min(self.rpc_urls, key=lambda url: self._in_use[url])
+
+    async def _rpc_batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """Several JSON-RPC calls in one HTTP request; results in call order."""
+        batch = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        url = self._pick_endpoint()
+        self._in_use[url] += 1
+        try:
+            async with self._limits[url]:
+                response = await self._client.post(url, json=batch)
+        finally:
+            self._in_use[url] -= 1
+        response.raise_for_status()
+        replies = {item.get("id"): item for item in response.json()}
+        results = []
+        for i, (method, _) in enumerate(calls):
+            reply = replies.get(i) or {}
+            if reply.get("error") or "result" not in reply:
+                raise RuntimeError(f"{method}: {reply.get('error')}")
+            results.append(reply["result"])
+        return results
+
+    # ---------- workers ----------
+
+    async def _worker(self) -> None:
+        try:
+            await self._warmup
+        except Exception as e:
+            logger.warning("Preloading eth_utils failed: %s", e)
+        while True:
+            check = await self._queue.get()
+            try:
+                await self._verify(check)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Sale verification of %s crashed: %s", check.tx_hash, e)
+                self._finish(check, SaleResult(check.tx_hash, False, f"שגיאה באימות העסקה: {e}", None, None))
+            finally:
+                self._queue.task_done()
+
+    async def _verify(self, check: _SaleCheck) -> None:
+        cached = await db_async.run_db(self._receipts.get, check.tx_hash)
+        if cached is not None:
+            self.stats["cached"] += 1
+            ok, message, amount, block_number = evaluate_receipt(
+                cached.status, cached.block_number, cached.transfers,
+                check.wallet_address, check.min_amount,
+            )
+            self._finish(check, SaleResult(check.tx_hash, ok, message, amount, block_number))
+            return
+
+        try:
+            receipt, head = await self._rpc_batch(
+                [("eth_getTransactionReceipt", [check.tx_hash]), ("eth_blockNumber", [])]
+            )
+        except Exception as e:
+            self.stats["rpc_errors"] += 1
+            self._retry(check, f"שגיאה בקריאת העסקה: {e}")
+            return
+        if receipt is None:
+            # not mined yet – try again later
+            self._retry(check, "העסקה לא נמצאה בשרשרת (TransactionNotFound)")
+            return
+
+        block_number = int(receipt["blockNumber"], 16)
+        status = int(receipt.get("status") or "0x0", 16)
+        try:
+            transfers = decode_transfer_logs(receipt.get("logs") or []) if status == 1 else []
+        except Exception as e:
+            self._finish(
+                check, SaleResult(check.tx_hash, False, f"שגיאה בניתוח האירועים: {e}", None, block_number)
+            )
+            return
+
+        ok, message, amount, block_number = evaluate_receipt(
+            status, block_number, transfers, check.wallet_address, check.min_amount
+        )
+        self._finish(check, SaleResult(check.tx_hash, ok, message, amount, block_number))
+        # stored only once it is deep enough below the chain head
+        try:
+            await db_async.run_db(
+                self._receipts.put, check.tx_hash, block_number, status, transfers, int(head, 16)
+            )
+        except Exception as e:
+            logger.warning("Failed to cache receipt %s: %s", check.tx_hash, e)
+
+    def _retry(self, check: _SaleCheck, reason: str) -> None:
+        check.attempts += 1
+        check.last_error = reason
+        if check.attempts >= self.max_attempts:
+            self._finish(
+                check,
+                SaleResult(check.tx_hash, False, f"{reason} (אחרי {check.attempts} ניסיונות)", None, None),
+            )
+            return
+        self.stats["retries"] += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (check.attempts - 1))
+        delay *= random.uniform(0.8, 1.2)
+        loop = asyncio.get_running_loop()
+        self._retries[check.key] = loop.call_later(delay, self._requeue, check)
+
+    def _requeue(self, check: _SaleCheck) -> None:
+        self._retries.pop(check.key, None)
+        if self._queue is not None:
+            self._queue.put_nowait(check)
+
+    def _finish(self, check: _SaleCheck, result: SaleResult) -> None:
+        self.stats["verified" if result.ok else "failed"] += 1
+        self._done.append((check, result))
+        if len(self._done) >= self.flush_size:
+            self._flush_now.set()
+
+    # ---------- batched writes ----------
+
+    async def _flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._done:
+            return
+        batch, self._done = self._done, []
+        rows: List[SaleRow] = [
+            (
+                check.user_id,
+                check.wallet_address,
+                self.chain_id,
+                result.amount_slh or 0,
+                check.tx_hash,
+                result.status,
+                None if result.ok else result.message,
+                result.block_number,
+            )
+            for check, result in batch
+        ]
+        try:
+            sale_ids = await self._save(rows)
+        except Exception as e:
+            # try again on the next flush
+            logger.error("Failed to store %s sale verifications: %s", len(batch), e)
+            self._done[:0] = batch
+            return
+        self.stats["saved"] += len(batch)
+        for (check, result), (sale_id, already_verified) in zip(batch, sale_ids):
+            self._inflight.pop(check.key, None)
+            if not check.future.done():
+                check.future.set_result(
+                    SaleResult(
+                        result.tx_hash, result.ok, result.message,
+                        result.amount_slh, result.block_number, sale_id,
+                        already_credited=already_verified,
+                    )
+                )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Finish checks already running, store finished results, drop the rest."""
+        if not self._tasks:
+            return
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Sale verifier stopped with %s checks still queued", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._flush()
+
+        for check in list(self._inflight.values()):
+            if not check.future.done():
+                check.future.cancel()
+        if self._inflight:
+            logger.warning("Sale verifier dropped %s unfinished checks", len(self._inflight))
+        self._inflight.clear()
+        self._done.clear()
+        await self._client.aclose()
+        self._client = None
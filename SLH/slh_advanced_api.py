@@ -3,11 +3,10 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-from db import (
-    get_reserve_stats,
-    get_approval_stats,
+from db_async import (
     get_top_referrers,
     get_monthly_payments,
+    get_stats_snapshot,
 )
 
 router = APIRouter(prefix="/api/advanced", tags=["advanced"])
@@ -41,6 +40,7 @@ class RiskSummary(BaseModel):
     total_net: float
     diversification_index: float
     notes: List[str]
+    cache_age_seconds: float = 0.0
 
 
 # ============
@@ -153,7 +153,7 @@ async def top_referrers(limit: int = 10):
     """
     מחזיר את המפנים המובילים לפי טבלת referrals.
     """
-    rows = get_top_referrers(limit=limit)
+    rows = await get_top_referrers(limit=limit)
     return {
         "items": rows,
         "count": len(rows),
@@ -170,7 +170,8 @@ async def risk_summary():
     - כמה נטו נשאר
     - אינדקס דמיוני לפיזור סיכון (כרגע חישוב פשוט).
     """
-    stats = get_reserve_stats() or {}
+    snapshot = await get_stats_snapshot()
+    stats = snapshot["reserve"] or {}
     total_amount = float(stats.get("total_amount") or 0)
     total_reserve = float(stats.get("total_reserve") or 0)
     total_net = float(stats.get("total_net") or 0)
@@ -191,4 +192,5 @@ async def risk_summary():
         total_net=total_net,
         diversification_index=diversification_index,
         notes=notes,
+        cache_age_seconds=snapshot["cache_age_seconds"],
     )
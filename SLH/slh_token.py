@@ -1,150 +1,410 @@
-﻿\"\"\"SLH Token integration on Binance Smart Chain (BSC)
-
-- Validate BSC addresses
-- Read SLH balance
-- Verify on-chain sale tx (Transfer from user -> treasury)
-\"\"\"
-
-import os
-from typing import Optional, Tuple
-
-from web3 import Web3
-from web3.exceptions import TransactionNotFound
-
-SLH_CHAIN_ID = 56
-SLH_RPC_URL = os.environ.get("BSC_RPC_URL", "https://bsc-dataseed.binance.org/")
-SLH_TOKEN_ADDRESS = os.environ.get(
-    "SLH_TOKEN_ADDRESS",
-    "0xACb0A09414CEA1C879c67bB7A877E4e19480f022"
-)
-SLH_TOKEN_SYMBOL = os.environ.get("SLH_TOKEN_SYMBOL", "SLH")
-SLH_TOKEN_DECIMALS = int(os.environ.get("SLH_TOKEN_DECIMALS", "15"))
-
-TREASURY_ADDRESS = os.environ.get(
-    "SLH_TREASURY_ADDRESS",
-    "0x000000000000000000000000000000000000dEaD"  # replace with your real treasury address
-)
-
-w3 = Web3(Web3.HTTPProvider(SLH_RPC_URL))
-
-ERC20_ABI = [
-    {
-        "constant": True,
-        "inputs": [{"name": "_owner", "type": "address"}],
-        "name": "balanceOf",
-        "outputs": [{"name": "balance", "type": "uint256"}],
-        "type": "function",
-    },
-    {
-        "constant": True,
-        "inputs": [],
-        "name": "decimals",
-        "outputs": [{"name": "", "type": "uint8"}],
-        "type": "function",
-    },
-    {
-        "constant": True,
-        "inputs": [],
-        "name": "symbol",
-        "outputs": [{"name": "", "type": "string"}],
-        "type": "function",
-    },
-    {
-        "anonymous": False,
-        "inputs": [
-            {"indexed": True, "name": "from", "type": "address"},
-            {"indexed": True, "name": "to", "type": "address"},
-            {"indexed": False, "name": "value", "type": "uint256"},
-        ],
-        "name": "Transfer",
-        "type": "event",
-    },
-]
-
-SLH_CONTRACT = w3.eth.contract(
-    address=Web3.to_checksum_address(SLH_TOKEN_ADDRESS),
-    abi=ERC20_ABI,
-)
-
-
-def is_valid_bsc_address(address: str) -> bool:
-    try:
-        return w3.is_address(address)
-    except Exception:
-        return False
-
-
-def checksum(address: str) -> str:
-    return Web3.to_checksum_address(address)
-
-
-def get_slh_balance(address: str) -> Optional[float]:
-    if not is_valid_bsc_address(address):
-        return None
-    try:
-        raw = SLH_CONTRACT.functions.balanceOf(checksum(address)).call()
-        return raw / (10 ** SLH_TOKEN_DECIMALS)
-    except Exception:
-        return None
-
-
-def verify_slh_sale_tx(
-    tx_hash: str,
-    expected_from: str,
-    min_amount: float,
-    treasury_address: Optional[str] = None,
-) -> Tuple[bool, str, Optional[float], Optional[int]]:
-    if treasury_address is None:
-        treasury_address = TREASURY_ADDRESS
-
-    try:
-        tx_hash = tx_hash.strip()
-        if not tx_hash.startswith("0x"):
-            return False, "tx_hash לא תקין", None, None
-
-        receipt = w3.eth.get_transaction_receipt(tx_hash)
-    except TransactionNotFound:
-        return False, "העסקה לא נמצאה בשרשרת (TransactionNotFound)", None, None
-    except Exception as e:
-        return False, f"שגיאה בקריאת העסקה: {e}", None, None
-
-    if receipt.status != 1:
-        return False, "העסקה נכשלה (status != 1)", None, receipt.blockNumber
-
-    from_addr_checksum = checksum(expected_from)
-    treasury_checksum = checksum(treasury_address)
-    token_addr_checksum = checksum(SLH_TOKEN_ADDRESS)
-
-    amount_found = 0
-
-    try:
-        events = SLH_CONTRACT.events.Transfer().process_receipt(receipt)
-        for ev in events:
-            if (
-                ev["address"] == token_addr_checksum
-                and ev["args"]["from"] == from_addr_checksum
-                and ev["args"]["to"] == treasury_checksum
-            ):
-                amount_found += ev["args"]["value"]
-
-        if amount_found == 0:
-            return (
-                False,
-                "לא נמצאה העברת SLH מהמשתמש לכתובת הטרז'רי בעסקה הזו",
-                None,
-                receipt.blockNumber,
-            )
-
-        amount_slh = amount_found / (10 ** SLH_TOKEN_DECIMALS)
-        if amount_slh < min_amount:
-            return (
-                False,
-                f"הסכום בעסקה ({amount_slh} {SLH_TOKEN_SYMBOL}) קטן מהנדרש ({min_amount})",
-                amount_slh,
-                receipt.blockNumber,
-            )
-
-        return True, "OK", amount_slh, receipt.blockNumber
-
-    except Exception as e:
-        return False, f"שגיאה בניתוח האירועים: {e}", None, receipt.blockNumber
+﻿"""SLH Token integration on Binance Smart Chain (BSC)
+
+- Validate BSC addresses
+- Read SLH balance (single address or JSON-RPC batch, cached per block)
+- Verify on-chain sale tx (Transfer from user -> treasury)
+
+web3 is heavy to import, so nothing here imports it at module load: the
+client (`w3`) and the contract (`SLH_CONTRACT`) are built on first use.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+SLH_CHAIN_ID = 56
+SLH_RPC_URL = os.environ.get("BSC_RPC_URL", "https://bsc-dataseed.binance.org/")
+SLH_TOKEN_ADDRESS = os.environ.get(
+    "SLH_TOKEN_ADDRESS",
+    "0xACb0A09414CEA1C879c67bB7A877E4e19480f022"
+)
+SLH_TOKEN_SYMBOL = os.environ.get("SLH_TOKEN_SYMBOL", "SLH")
+SLH_TOKEN_DECIMALS = int(os.environ.get("SLH_TOKEN_DECIMALS", "15"))
+
+TREASURY_ADDRESS = os.environ.get(
+    "SLH_TREASURY_ADDRESS",
+    "0x000000000000000000000000000000000000dEaD"  # replace with your real treasury address
+)
+
+# Batched balance reads: max eth_call entries per JSON-RPC batch request,
+# and how long (seconds) the chain head is trusted before it is re-read.
+SLH_RPC_BATCH_SIZE = int(os.environ.get("SLH_RPC_BATCH_SIZE", "200"))
+SLH_BALANCE_TTL = float(os.environ.get("SLH_BALANCE_TTL", "3"))
+SLH_RPC_TIMEOUT = float(os.environ.get("SLH_RPC_TIMEOUT", "10"))
+
+ERC20_ABI = [
+    {
+        "constant": True,
+        "inputs": [{"name": "_owner", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "decimals",
+        "outputs": [{"name": "", "type": "uint8"}],
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "symbol",
+        "outputs": [{"name": "", "type": "string"}],
+        "type": "function",
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "from", "type": "address"},
+            {"indexed": True, "name": "to", "type": "address"},
+            {"indexed": False, "name": "value", "type": "uint256"},
+        ],
+        "name": "Transfer",
+        "type": "event",
+    },
+]
+
+_w3 = None
+_contract = None
+_init_lock = threading.Lock()
+
+
+def get_w3():
+    """Shared Web3 client, created on first use."""
+    global _w3
+    if _w3 is None:
+        with _init_lock:
+            if _w3 is None:
+                from web3 import Web3
+
+                _w3 = Web3(Web3.HTTPProvider(SLH_RPC_URL))
+    return _w3
+
+
+def get_slh_contract():
+    """SLH ERC20 contract bound to `get_w3()`, created on first use."""
+    global _contract
+    if _contract is None:
+        w3 = get_w3()
+        with _init_lock:
+            if _contract is None:
+                _contract = w3.eth.contract(address=checksum(SLH_TOKEN_ADDRESS), abi=ERC20_ABI)
+    return _contract
+
+
+def __getattr__(name: str):
+    # backwards compatible `from SLH.slh_token import w3, SLH_CONTRACT`
+    if name == "w3":
+        return get_w3()
+    if name == "SLH_CONTRACT":
+        return get_slh_contract()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def preload_eth_utils() -> None:
+    """Import eth_utils ahead of time (~200 ms); the helpers below import it lazily."""
+    import eth_utils  # noqa: F401
+
+
+def is_valid_bsc_address(address: str) -> bool:
+    from eth_utils import is_address
+
+    try:
+        return is_address(address)
+    except Exception:
+        return False
+
+
+def checksum(address: str) -> str:
+    from eth_utils import to_checksum_address
+
+    return to_checksum_address(address)
+
+
+# keccak("balanceOf(address)")[:4]
+BALANCE_OF_SELECTOR = "0x70a08231"
+
+
+class BalanceReader:
+    """Reads many SLH balances in one JSON-RPC batch request.
+
+    Each batch is `eth_blockNumber` plus one `eth_call(balanceOf)` per
+    address. Results are cached per address together with the block number
+    they were read at. An entry is served while it is at or above the known
+    chain head, and the head itself is re-read once it is older than `ttl`
+    seconds. So repeated lookups within one block cost no RPC at all.
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        token_address: str,
+        batch_size: int = 200,
+        ttl: float = 3.0,
+        timeout: float = 10.0,
+        max_entries: int = 50_000,
+    ) -> None:
+        self.rpc_url = rpc_url
+        self.token_address = checksum(token_address)
+        self.batch_size = max(1, batch_size)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        # checksum address -> (block_number, raw balance)
+        self._cache: Dict[str, Tuple[int, int]] = {}
+        self._head: Optional[int] = None
+        self._head_at = 0.0
+        self.rpc_requests = 0
+
+    def _http(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(timeout=self.timeout)
+        return self._client
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _call_data(self, address: str) -> str:
+        return BALANCE_OF_SELECTOR + address[2:].lower().rjust(64, "0")
+
+    def _fetch(self, addresses: List[str]) -> Tuple[int, Dict[str, Optional[int]]]:
+        batch = [{"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []}]
+        for i, address in enumerate(addresses, start=1):
+            batch.append(
+                {
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "eth_call",
+                    "params": [{"to": self.token_address, "data": self._call_data(address)}, "latest"],
+                }
+            )
+        self.rpc_requests += 1
+        response = self._http().post(self.rpc_url, json=batch)
+        response.raise_for_status()
+        replies = {item.get("id"): item for item in response.json()}
+
+        head = replies.get(0, {}).get("result")
+        if head is None:
+            raise RuntimeError(f"eth_blockNumber failed: {replies.get(0)}")
+        balances: Dict[str, Optional[int]] = {}
+        for i, address in enumerate(addresses, start=1):
+            result = replies.get(i, {}).get("result")
+            balances[address] = int(result, 16) if result and result != "0x" else None
+        return int(head, 16), balances
+
+    def get_raw_balances(self, addresses: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Raw balances keyed by checksum address (None where the call failed)."""
+        wanted = list(dict.fromkeys(addresses))
+        now = time.monotonic()
+        with self._lock:
+            head_fresh = self._head is not None and now - self._head_at < self.ttl
+            result: Dict[str, Optional[int]] = {}
+            missing: List[str] = []
+            for address in wanted:
+                entry = self._cache.get(address)
+                if head_fresh and entry is not None and entry[0] >= self._head:
+                    result[address] = entry[1]
+                else:
+                    missing.append(address)
+
+        for start in range(0, len(missing), self.batch_size):
+            chunk = missing[start:start + self.batch_size]
+            head, balances = self._fetch(chunk)
+            with self._lock:
+                if self._head is None or head >= self._head:
+                    self._head = head
+                    self._head_at = time.monotonic()
+                for address, raw in balances.items():
+                    if raw is not None:
+                        self._cache[address] = (head, raw)
+                if len(self._cache) > self.max_entries:
+                    # entries below the head would be refetched anyway
+                    self._cache = {a: e for a, e in self._cache.items() if e[0] >= self._head}
+            result.update(balances)
+        return result
+
+
+_balance_reader: Optional[BalanceReader] = None
+
+
+def get_balance_reader() -> BalanceReader:
+    global _balance_reader
+    if _balance_reader is None:
+        _balance_reader = BalanceReader(
+            SLH_RPC_URL,
+            SLH_TOKEN_ADDRESS,
+            batch_size=SLH_RPC_BATCH_SIZE,
+            ttl=SLH_BALANCE_TTL,
+            timeout=SLH_RPC_TIMEOUT,
+        )
+    return _balance_reader
+
+
+def get_slh_balances(addresses: Iterable[str]) -> Dict[str, Optional[float]]:
+    """SLH balances for many addresses in one RPC round trip (per batch).
+
+    Keys are the addresses exactly as passed in; invalid addresses and
+    failed reads map to None.
+    """
+    addresses = list(addresses)
+    valid = {a: checksum(a) for a in addresses if is_valid_bsc_address(a)}
+    try:
+        raw = get_balance_reader().get_raw_balances(valid.values())
+    except Exception:
+        raw = {}
+    scale = 10 ** SLH_TOKEN_DECIMALS
+    balances: Dict[str, Optional[float]] = {}
+    for address in addresses:
+        value = raw.get(valid[address]) if address in valid else None
+        balances[address] = value / scale if value is not None else None
+    return balances
+
+
+def get_slh_balance(address: str) -> Optional[float]:
+    return get_slh_balances([address])[address]
+
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def decode_transfer_logs(logs: Iterable[dict], token_address: str = SLH_TOKEN_ADDRESS) -> List[dict]:
+    """SLH Transfer events from raw JSON-RPC receipt logs, as {"from", "to", "value"}."""
+    token = token_address.lower()
+    transfers = []
+    for log in logs:
+        topics = log.get("topics") or []
+        if (
+            str(log.get("address", "")).lower() != token
+            or len(topics) != 3
+            or str(topics[0]).lower() != TRANSFER_TOPIC
+        ):
+            continue
+        transfers.append(
+            {
+                "from": checksum("0x" + str(topics[1])[-40:]),
+                "to": checksum("0x" + str(topics[2])[-40:]),
+                "value": int(log.get("data") or "0x0", 16),
+            }
+        )
+    return transfers
+
+
+def evaluate_sale(
+    transfers: Iterable[dict],
+    block_number: Optional[int],
+    expected_from: str,
+    min_amount: float,
+    treasury_address: Optional[str] = None,
+) -> Tuple[bool, str, Optional[float], Optional[int]]:
+    """Sums the user -> treasury transfers of a successful receipt and checks the amount."""
+    if treasury_address is None:
+        treasury_address = TREASURY_ADDRESS
+    from_addr_checksum = checksum(expected_from)
+    treasury_checksum = checksum(treasury_address)
+
+    amount_found = sum(
+        t["value"]
+        for t in transfers
+        if t["from"] == from_addr_checksum and t["to"] == treasury_checksum
+    )
+    if amount_found == 0:
+        return (
+            False,
+            "לא נמצאה העברת SLH מהמשתמש לכתובת הטרז'רי בעסקה הזו",
+            None,
+            block_number,
+        )
+
+    amount_slh = amount_found / (10 ** SLH_TOKEN_DECIMALS)
+    if amount_slh < min_amount:
+        return (
+            False,
+            f"הסכום בעסקה ({amount_slh} {SLH_TOKEN_SYMBOL}) קטן מהנדרש ({min_amount})",
+            amount_slh,
+            block_number,
+        )
+
+    return True, "OK", amount_slh, block_number
+
+
+def evaluate_receipt(
+    status: int,
+    block_number: Optional[int],
+    transfers: Iterable[dict],
+    expected_from: str,
+    min_amount: float,
+    treasury_address: Optional[str] = None,
+) -> Tuple[bool, str, Optional[float], Optional[int]]:
+    """Verdict for a mined tx from its status and decoded SLH transfers."""
+    if status != 1:
+        return False, "העסקה נכשלה (status != 1)", None, block_number
+    return evaluate_sale(transfers, block_number, expected_from, min_amount, treasury_address)
+
+
+def verify_slh_sale_tx(
+    tx_hash: str,
+    expected_from: str,
+    min_amount: float,
+    treasury_address: Optional[str] = None,
+) -> Tuple[bool, str, Optional[float], Optional[int]]:
+    """Blocking check of one sale tx. From async code use SLH.sale_verifier instead.
+
+    Receipts past the confirmation depth are cached (SLH.receipt_cache), so
+    checking the same tx again is a local lookup.
+    """
+    from SLH.receipt_cache import get_receipt_cache
+
+    tx_hash = tx_hash.strip()
+    if not tx_hash.startswith("0x"):
+        return False, "tx_hash לא תקין", None, None
+
+    cache = get_receipt_cache()
+    cached = cache.get(tx_hash)
+    if cached is not None:
+        return evaluate_receipt(
+            cached.status, cached.block_number, cached.transfers,
+            expected_from, min_amount, treasury_address,
+        )
+
+    from web3.exceptions import TransactionNotFound
+
+    w3 = get_w3()
+    try:
+        receipt = w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return False, "העסקה לא נמצאה בשרשרת (TransactionNotFound)", None, None
+    except Exception as e:
+        return False, f"שגיאה בקריאת העסקה: {e}", None, None
+
+    token_addr_checksum = checksum(SLH_TOKEN_ADDRESS)
+
+    try:
+        transfers = []
+        if receipt.status == 1:
+            transfers = [
+                {"from": ev["args"]["from"], "to": ev["args"]["to"], "value": ev["args"]["value"]}
+                for ev in get_slh_contract().events.Transfer().process_receipt(receipt)
+                if ev["address"] == token_addr_checksum
+            ]
+    except Exception as e:
+        return False, f"שגיאה בניתוח האירועים: {e}", None, receipt.blockNumber
+
+    try:
+        cache.put(tx_hash, receipt.blockNumber, receipt.status, transfers, w3.eth.block_number)
+    except Exception:
+        pass  # no cache entry – the verdict itself is still valid
+
+    return evaluate_receipt(
+        receipt.status, receipt.blockNumber, transfers,
+        expected_from, min_amount, treasury_address,
+    )
@@ -0,0 +1,159 @@
+# admin_export.py
+"""
+ייצוא מלא של טבלאות לצוות הכספים (התאמות / reconciliation).
+
+GET /api/admin/export/{table}?format=csv|ndjson&since=...&until=...
+
+השורות נמשכות ב-server-side cursor (db.iter_export_rows) ונשלחות כ-chunked
+response, כך שהזיכרון קבוע בלי קשר לגודל הטבלה. בסוף כל ייצוא נרשמים
+ללוג מספר השורות, הבייטים והקצב.
+
+הגישה דורשת header בשם X-Admin-Token שתואם ל-ADMIN_API_TOKEN; אם המשתנה
+לא מוגדר, ה-endpoints כבויים.
+"""
+import csv
+import hmac
+import io
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+import db
+
+logger = logging.getLogger("slhnet.export")
+
+router = APIRouter()
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+# כמה שורות מאחדים ל-chunk אחד של התשובה
+ROWS_PER_CHUNK = 500
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _require_admin(token: Optional[str]) -> None:
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=503, detail="admin export disabled (ADMIN_API_TOKEN not set)")
+    if not token or not hmac.compare_digest(token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+def _json_value(value: Any) -> Any:
+    # Decimal כמחרוזת – בלי לאבד דיוק בסכומים
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(columns: Sequence[str], rows: Iterator[Tuple]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(
+            [v.isoformat() if isinstance(v, (datetime, date)) else v for v in row]
+        )
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(columns: Sequence[str], rows: Iterator[Tuple]) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(
+            json.dumps(
+                {col: _json_value(v) for col, v in zip(columns, row)},
+                ensure_ascii=False,
+            )
+        )
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _export_stream(
+    table: str,
+    fmt: str,
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Iterator[bytes]:
+    columns = db.EXPORT_TABLES[table]
+    stats = {"rows": 0, "bytes": 0}
+    started = time.monotonic()
+
+    def counted(rows: Iterator[Tuple]) -> Iterator[Tuple]:
+        for row in rows:
+            stats["rows"] += 1
+            yield row
+
+    source = db.iter_export_rows(table, since=since, until=until)
+    rows = counted(source)
+    chunks = _csv_chunks(columns, rows) if fmt == "csv" else _ndjson_chunks(columns, rows)
+    completed = False
+    try:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            stats["bytes"] += len(data)
+            yield data
+        completed = True
+    finally:
+        # מחזיר את החיבור ל-pool גם כשהלקוח התנתק באמצע
+        source.close()
+        elapsed = time.monotonic() - started
+        logger.info(
+            "Export %s (%s) %s: %s rows, %.1f KiB in %.2fs (%.0f rows/s, %.1f KiB/s)",
+            table,
+            fmt,
+            "completed" if completed else "aborted",
+            stats["rows"],
+            stats["bytes"] / 1024,
+            elapsed,
+            stats["rows"] / elapsed if elapsed > 0 else 0.0,
+            stats["bytes"] / 1024 / elapsed if elapsed > 0 else 0.0,
+        )
+
+
+@router.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    since: Optional[datetime] = Query(None, description="כולל (created_at >= since)"),
+    until: Optional[datetime] = Query(None, description="לא כולל (created_at < until)"),
+    x_admin_token: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """ייצוא טבלה (payments / token_sales / slh_token_sales / referrals) בזרימה."""
+    _require_admin(x_admin_token)
+    if table not in db.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"unknown table {table!r}")
+    if not db.DATABASE_URL:
+        raise HTTPException(status_code=503, detail="database not configured")
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    return StreamingResponse(
+        _export_stream(table, format, since, until),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}-{stamp}.{format}"'},
+    )
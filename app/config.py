@@ -18,8 +18,21 @@ class Settings:
         self.faucet_amount: int = int(os.getenv("FAUCET_AMOUNT", "100"))
         self.faucet_token: str = os.getenv("FAUCET_TOKEN", "SLH")
 
+        # מקסימום נמענים בהעברה מרוכזת אחת (/airdrop, POST /admin/bulk-transfer)
+        self.bulk_transfer_max: int = int(os.getenv("BULK_TRANSFER_MAX", "5000"))
+
         self.port: int = int(os.getenv("PORT", "8080"))
 
+        # fast-ack webhook: מחזירים 200 מיד ו-workers ברקע מעבדים עדכונים
+        self.webhook_fast_ack: bool = os.getenv("WEBHOOK_FAST_ACK", "false").lower() in ("1", "true", "yes")
+        self.update_workers: int = int(os.getenv("UPDATE_WORKERS", "8"))
+        self.update_queue_size: int = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+
+        # מניעת עיבוד כפול של update_id: memory / sqlite
+        self.update_dedup_backend: str = os.getenv("UPDATE_DEDUP_BACKEND", "memory").lower()
+        self.update_dedup_ttl: float = float(os.getenv("UPDATE_DEDUP_TTL", "86400"))
+        self.update_dedup_sqlite_path: str = os.getenv("UPDATE_DEDUP_SQLITE_PATH", "./seen_updates.db")
+
     @staticmethod
     def _parse_admin_ids(value: str) -> List[int]:
         if not value:
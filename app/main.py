@@ -1,27 +1,61 @@
+import hmac
 import logging
-from typing import Dict, Any
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Union
 
 import httpx
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from pydantic import BaseModel, Field
 from telegram import Update
 
+from core.update_dedup import SqliteSeenStore, UpdateDeduplicator
+from core.update_queue import UpdateDispatcher
+
 from .config import settings
-from .db import Base, engine
 from .db import SessionLocal, init_db
+from .services import candles as candles_service
+from .services import orders as orders_service
+from .services import users as users_service
+from .services import wallet as wallet_service
 from .telegram import get_application
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# יצירת הטבלאות אם לא קיימות
-Base.metadata.create_all(bind=engine)
-
 # אפליקציית FastAPI
 app = FastAPI(title="SLHTON API", version="1.0.0")
 
-# יוצרים את ה-Application של הבוט פעם אחת
-telegram_app = get_application()
+# ה-Application של הבוט נוצר פעם אחת, בשימוש הראשון (get_application שומר אותו)
+# ולא בזמן import – כך import של המודול זול ולא דורש BOT_TOKEN.
+
+
+async def _process_raw_update(data: Dict[str, Any]) -> None:
+    telegram_app = get_application()
+    update = Update.de_json(data, telegram_app.bot)
+    await telegram_app.process_update(update)
+
+
+# תור עדכונים עם workers (משמש רק במצב WEBHOOK_FAST_ACK)
+update_dispatcher = UpdateDispatcher(
+    _process_raw_update,
+    workers=settings.update_workers,
+    max_queue=settings.update_queue_size,
+    name="app",
+)
+
+# מניעת עיבוד כפול של עדכונים שטלגרם שולח שוב
+update_dedup = UpdateDeduplicator(
+    scope="app",
+    ttl=settings.update_dedup_ttl,
+    store=(
+        SqliteSeenStore(settings.update_dedup_sqlite_path)
+        if settings.update_dedup_backend == "sqlite"
+        else None
+    ),
+)
 
 
 async def _ensure_telegram_app_started() -> None:
@@ -29,6 +63,7 @@ async def _ensure_telegram_app_started() -> None:
     פונקציית עזר שמוודאת שה-Application של טלגרם מאותחל ורץ.
     נשתמש בה גם ב-startup וגם ב-webhook (ליתר ביטחון).
     """
+    telegram_app = get_application()
     if not getattr(telegram_app, "_initialized", False):
         logger.info("Telegram Application not initialized – initializing...")
         await telegram_app.initialize()
@@ -88,6 +123,8 @@ async def on_startup():
     logger.info("=== FastAPI startup: initializing Telegram Application & webhook ===")
     await _ensure_telegram_app_started()
     _set_telegram_webhook()
+    if settings.webhook_fast_ack:
+        update_dispatcher.start()
     logger.info("=== Startup complete ===")
 
 
@@ -97,7 +134,9 @@ async def on_shutdown() -> None:
     אירוע כיבוי – עצירה מסודרת של הבוט.
     """
     logger.info("Shutting down Telegram Application...")
+    await update_dispatcher.stop()
     try:
+        telegram_app = get_application()
         if getattr(telegram_app, "running", False):
             await telegram_app.stop()
         if getattr(telegram_app, "_initialized", False):
@@ -120,6 +159,176 @@ async def meta() -> Dict[str, Any]:
     }
 
 
+@app.get("/orderbook/{token_symbol}")
+def orderbook(token_symbol: str, levels: int = Query(20, ge=1, le=orders_service.MAX_DEPTH_LEVELS)) -> Dict[str, Any]:
+    """
+    עומק ספר ההזמנות של טוקן: רמות המחיר הטובות בכל צד, עם כמות מצטברת
+    ומספר הזמנות בכל רמה. הסכומים מוחזרים כמחרוזות כדי לא לאבד דיוק.
+    """
+    db = SessionLocal()
+    try:
+        depth = orders_service.get_depth(db, token_symbol, levels)
+        last_price = candles_service.get_last_price(db, token_symbol)
+    finally:
+        db.close()
+
+    def _levels(side):
+        return [
+            {"price": str(level.price), "amount": str(level.quantity), "orders": level.orders}
+            for level in side
+        ]
+
+    best_bid = depth["bids"][0].price if depth["bids"] else None
+    best_ask = depth["asks"][0].price if depth["asks"] else None
+    return {
+        "token_symbol": token_symbol.upper(),
+        "best_bid": str(best_bid) if best_bid is not None else None,
+        "best_ask": str(best_ask) if best_ask is not None else None,
+        "spread": str(best_ask - best_bid) if best_bid is not None and best_ask is not None else None,
+        "last_price": str(last_price) if last_price is not None else None,
+        "bids": _levels(depth["bids"]),
+        "asks": _levels(depth["asks"]),
+    }
+
+
+@app.get("/candles/{token_symbol}")
+def candles(
+    token_symbol: str,
+    interval: str = Query("1m", pattern="^(1m|5m|1h|1d)$"),
+    start: Optional[datetime] = Query(None, description="UTC, כולל"),
+    end: Optional[datetime] = Query(None, description="UTC, לא כולל"),
+    limit: int = Query(500, ge=1, le=candles_service.MAX_CANDLES),
+) -> Dict[str, Any]:
+    """
+    נרות OHLCV מחושבים מראש (מתעדכנים בכל fill) בסדר עולה.
+    בלי start מוחזרים `limit` הנרות האחרונים.
+    """
+    start = candles_service.to_naive_utc(start) if start else None
+    end = candles_service.to_naive_utc(end) if end else None
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    db = SessionLocal()
+    try:
+        rows = candles_service.get_candles(db, token_symbol, interval, start, end, limit)
+    finally:
+        db.close()
+
+    return {
+        "token_symbol": token_symbol.upper(),
+        "interval": interval,
+        "candles": [
+            {
+                "t": c.bucket_start.isoformat(),
+                "open": str(c.open),
+                "high": str(c.high),
+                "low": str(c.low),
+                "close": str(c.close),
+                "volume": str(c.volume),
+                "trades": c.trades,
+            }
+            for c in rows
+        ],
+    }
+
+
+@app.get("/trades/{token_symbol}")
+def trades(token_symbol: str, limit: int = Query(50, ge=1, le=candles_service.MAX_CANDLES)) -> Dict[str, Any]:
+    """העסקאות האחרונות של הטוקן, מהחדשה לישנה."""
+    db = SessionLocal()
+    try:
+        rows = candles_service.list_trades(db, token_symbol, limit)
+    finally:
+        db.close()
+
+    return {
+        "token_symbol": token_symbol.upper(),
+        "trades": [
+            {
+                "id": t.id,
+                "price": str(t.price),
+                "amount": str(t.amount),
+                "taker_side": t.taker_side,
+                "buy_order_id": t.buy_order_id,
+                "sell_order_id": t.sell_order_id,
+                "created_at": t.created_at.isoformat(),
+            }
+            for t in rows
+        ],
+    }
+
+
+_basic_auth = HTTPBasic(auto_error=False)
+
+
+def _require_admin_api(credentials: Optional[HTTPBasicCredentials] = Depends(_basic_auth)) -> None:
+    """Basic auth מול BOT_API_USER / BOT_API_PASS; בלי שניהם ה-endpoints של אדמין כבויים."""
+    if not settings.bot_api_user or not settings.bot_api_pass:
+        raise HTTPException(status_code=503, detail="admin API disabled (BOT_API_USER/BOT_API_PASS not set)")
+    if credentials is None or not (
+        hmac.compare_digest(credentials.username, settings.bot_api_user)
+        and hmac.compare_digest(credentials.password, settings.bot_api_pass)
+    ):
+        raise HTTPException(status_code=401, detail="unauthorized", headers={"WWW-Authenticate": "Basic"})
+
+
+class BulkTransferItem(BaseModel):
+    recipient: Union[int, str] = Field(description="telegram_id או @username")
+    amount: Union[Decimal, str]
+
+
+class BulkTransferRequest(BaseModel):
+    from_telegram_id: int
+    token_symbol: str = "SLH"
+    note: str = Field("airdrop", max_length=32)
+    transfers: List[BulkTransferItem]
+
+
+@app.post("/admin/bulk-transfer", dependencies=[Depends(_require_admin_api)])
+def bulk_transfer(payload: BulkTransferRequest) -> Dict[str, Any]:
+    """
+    העברה מרוכזת (airdrop) מהארנק של from_telegram_id לרשימת נמענים,
+    בטרנזקציה אחת. מחזיר תוצאה לכל נמען באותו סדר.
+    """
+    db = SessionLocal()
+    try:
+        sender = users_service.get_user_by_telegram_id(db, payload.from_telegram_id)
+        if sender is None:
+            raise HTTPException(status_code=404, detail="sender not found")
+        # כמו place_order: סמלי טוקן תמיד באותיות גדולות ("slh" הוא אותו ארנק SLH)
+        token_symbol = payload.token_symbol.strip().upper()
+        sender_wallet = wallet_service.get_or_create_wallet(db, sender, token_symbol)
+        try:
+            report = wallet_service.bulk_transfer(
+                db,
+                sender_wallet,
+                [(item.recipient, item.amount) for item in payload.transfers],
+                token_symbol=token_symbol,
+                note=payload.note,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return {
+            "ok": report.ok,
+            "total": str(report.total),
+            "sent": report.sent,
+            "failed": len(report.failed),
+            "sender_balance": str(report.sender_balance) if report.sender_balance is not None else None,
+            "results": [
+                {
+                    "recipient": r.recipient,
+                    "amount": str(r.amount) if r.amount is not None else None,
+                    "status": r.status,
+                    "wallet_id": r.wallet_id,
+                }
+                for r in report.results
+            ],
+        }
+    finally:
+        db.close()
+
+
 @app.post("/telegram/webhook")
 async def telegram_webhook(request: Request):
     """
@@ -130,8 +339,29 @@ async def telegram_webhook(request: Request):
     """
     await _ensure_telegram_app_started()
 
-    data = await request.json()
-    update = Update.de_json(data, telegram_app.bot)
-    await telegram_app.process_update(update)
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    update_id = data.get("update_id") if isinstance(data, dict) else None
+    # כמו ב-main.py הראשי: update_id חייב להיות int (bool הוא תת-מחלקה של int)
+    if not isinstance(update_id, int) or isinstance(update_id, bool):
+        return JSONResponse({"ok": False, "error": "invalid update"}, status_code=400)
+
+    if await update_dedup.is_duplicate(update_id):
+        return JSONResponse({"ok": True, "duplicate": True})
+
+    if settings.webhook_fast_ack:
+        # מצב fast-ack: רק מכניסים לתור ומחזירים לטלגרם מיד
+        if not update_dispatcher.enqueue(data):
+            await update_dedup.forget(update_id)
+            return JSONResponse({"ok": False, "error": "busy"}, status_code=503)
+        return JSONResponse({"ok": True})
+
+    try:
+        await _process_raw_update(data)
+    except Exception:
+        await update_dedup.forget(update_id)
+        raise
 
     return JSONResponse({"ok": True})
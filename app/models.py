@@ -10,18 +10,23 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# ב-SQLite רק INTEGER PRIMARY KEY מקבל autoincrement; בפוסטגרס נשאר BIGINT
+BigIntegerPK = BigInteger().with_variant(Integer, "sqlite")
+
 
 class User(Base):
     __tablename__ = "users"
 
     # מפתח פנימי לדמו
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, index=True)
 
     # מזהה טלגרם אמיתי – חייב BIGINT
     telegram_id = Column(BigInteger, unique=True, nullable=False, index=True)
@@ -38,7 +43,7 @@ class User(Base):
 class Wallet(Base):
     __tablename__ = "wallets"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, index=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
 
     # כרגע ארנק פנימי בסגנון SLH-<telegram_id>-SLH
@@ -73,7 +78,7 @@ class Tx(Base):
 
     __tablename__ = "txs"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, index=True)
     wallet_id = Column(BigInteger, ForeignKey("wallets.id"), nullable=False, index=True)
 
     amount = Column(Numeric(18, 8), nullable=False)
@@ -94,7 +99,7 @@ class Transfer(Base):
 
     __tablename__ = "transfers"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, index=True)
 
     from_wallet_id = Column(
         BigInteger, ForeignKey("wallets.id"), nullable=False, index=True
@@ -123,7 +128,7 @@ class Order(Base):
 
     __tablename__ = "orders"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, index=True)
 
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
     wallet_id = Column(BigInteger, ForeignKey("wallets.id"), nullable=False, index=True)
@@ -132,6 +137,7 @@ class Order(Base):
     side = Column(String(4), nullable=False)
 
     token_symbol = Column(String(32), nullable=False, default="SLH")
+    # הכמות שעוד פתוחה בספר – יורדת עם כל fill (ההיסטוריה ב-trades)
     amount = Column(Numeric(18, 8), nullable=False)
     price = Column(Numeric(18, 8), nullable=False)
 
@@ -141,3 +147,52 @@ class Order(Base):
 
     user = relationship("User", back_populates="orders")
     wallet = relationship("Wallet", back_populates="orders")
+
+
+class Trade(Base):
+    """
+    עסקה (fill) שנוצרה במנוע ההתאמה בין הזמנת קניה להזמנת מכירה.
+    המחיר הוא המחיר של ההזמנה שחיכתה בספר (maker).
+    """
+
+    __tablename__ = "trades"
+    __table_args__ = (Index("ix_trades_token_created", "token_symbol", "created_at"),)
+
+    id = Column(BigIntegerPK, primary_key=True, index=True)
+
+    token_symbol = Column(String(32), nullable=False)
+    price = Column(Numeric(18, 8), nullable=False)
+    amount = Column(Numeric(18, 8), nullable=False)
+
+    buy_order_id = Column(BigInteger, ForeignKey("orders.id"), nullable=False, index=True)
+    sell_order_id = Column(BigInteger, ForeignKey("orders.id"), nullable=False, index=True)
+
+    # הצד של ההזמנה הנכנסת (taker): "buy" / "sell"
+    taker_side = Column(String(4), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Candle(Base):
+    """
+    נר OHLCV לטוקן ולאינטרוול (1m/5m/1h/1d), מתעדכן בכל fill.
+    bucket_start הוא תחילת הנר ב-UTC.
+    """
+
+    __tablename__ = "candles"
+    __table_args__ = (
+        UniqueConstraint("token_symbol", "interval", "bucket_start", name="uq_candles_bucket"),
+    )
+
+    id = Column(BigIntegerPK, primary_key=True, index=True)
+
+    token_symbol = Column(String(32), nullable=False)
+    interval = Column(String(4), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+
+    open = Column(Numeric(18, 8), nullable=False)
+    high = Column(Numeric(18, 8), nullable=False)
+    low = Column(Numeric(18, 8), nullable=False)
+    close = Column(Numeric(18, 8), nullable=False)
+    volume = Column(Numeric(18, 8), nullable=False)
+    trades = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,151 @@
+"""
+נרות OHLCV (1m/5m/1h/1d) שמתעדכנים בכל fill של מנוע ההתאמה.
+
+place_order קורא ל-record_fills באותה טרנזקציה ששומרת את ה-trades, וכל
+נר שנגע בו מתעדכן בנקודה (lookup לפי token/interval/bucket_start) – בלי
+לסרוק את היסטוריית העסקאות. קריאת טווח נרות היא range scan על אותו מפתח.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from .. import models
+from .matching import Fill
+
+# אורך כל interval בשניות
+INTERVALS: Dict[str, int] = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+MAX_CANDLES = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+
+BarKey = Tuple[str, str, datetime]
+
+
+def to_naive_utc(ts: datetime) -> datetime:
+    """העמודות שומרות UTC בלי tzinfo; זמן עם אזור זמן מומר ל-UTC נאיבי."""
+    if ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_start(ts: datetime, interval: str) -> datetime:
+    """תחילת הנר (UTC) שאליו שייך הזמן ts."""
+    seconds = INTERVALS[interval]
+    elapsed = int((to_naive_utc(ts) - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=elapsed - elapsed % seconds)
+
+
+def _aggregate(fills: Iterable[Fill], ts: datetime) -> Dict[BarKey, dict]:
+    """מאחד fills (לפי סדר הביצוע) לנר חלקי אחד לכל token/interval/bucket."""
+    bars: Dict[BarKey, dict] = {}
+    for fill in fills:
+        for interval in INTERVALS:
+            key = (fill.token_symbol, interval, bucket_start(ts, interval))
+            bar = bars.get(key)
+            if bar is None:
+                bars[key] = {
+                    "open": fill.price,
+                    "high": fill.price,
+                    "low": fill.price,
+                    "close": fill.price,
+                    "volume": fill.amount,
+                    "trades": 1,
+                }
+                continue
+            bar["high"] = max(bar["high"], fill.price)
+            bar["low"] = min(bar["low"], fill.price)
+            bar["close"] = fill.price
+            bar["volume"] += fill.amount
+            bar["trades"] += 1
+    return bars
+
+
+def record_fills(db: Session, fills: List[Fill], ts: datetime) -> None:
+    """
+    ממזג את ה-fills לנרות הקיימים (או יוצר נרות חדשים). לא עושה commit –
+    רץ בתוך הטרנזקציה של place_order, שמחזיקה את ה-lock של המנוע.
+    """
+    bars = _aggregate(fills, ts)
+    existing: Dict[BarKey, models.Candle] = {}
+    for token_symbol in {key[0] for key in bars}:
+        # כל הנרות שנוגעים ב-fills של הטוקן – שאילתה אחת לכל האינטרוולים
+        keys = [(interval, start) for token, interval, start in bars if token == token_symbol]
+        for candle in db.execute(
+            select(models.Candle).where(
+                models.Candle.token_symbol == token_symbol,
+                tuple_(models.Candle.interval, models.Candle.bucket_start).in_(keys),
+            )
+        ).scalars():
+            existing[(token_symbol, candle.interval, candle.bucket_start)] = candle
+
+    for (token_symbol, interval, start), bar in bars.items():
+        candle = existing.get((token_symbol, interval, start))
+        if candle is None:
+            db.add(
+                models.Candle(
+                    token_symbol=token_symbol,
+                    interval=interval,
+                    bucket_start=start,
+                    **bar,
+                )
+            )
+            continue
+
+        candle.high = max(candle.high, bar["high"])
+        candle.low = min(candle.low, bar["low"])
+        candle.close = bar["close"]
+        candle.volume = candle.volume + bar["volume"]
+        candle.trades = candle.trades + bar["trades"]
+
+
+def get_candles(
+    db: Session,
+    token_symbol: str,
+    interval: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 500,
+) -> List[models.Candle]:
+    """
+    נרות בטווח [start, end) בסדר עולה. בלי start מוחזרים `limit` הנרות האחרונים.
+    נרות בלי עסקאות לא נשמרים, ולכן לא מופיעים (אין מילוי של פערים).
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+    limit = max(1, min(limit, MAX_CANDLES))
+
+    query = select(models.Candle).where(
+        models.Candle.token_symbol == token_symbol.upper(),
+        models.Candle.interval == interval,
+    )
+    if start is not None:
+        query = query.where(models.Candle.bucket_start >= bucket_start(start, interval))
+    if end is not None:
+        query = query.where(models.Candle.bucket_start < to_naive_utc(end))
+
+    if start is None:
+        rows = db.execute(query.order_by(models.Candle.bucket_start.desc()).limit(limit)).scalars().all()
+        return list(reversed(rows))
+    return list(db.execute(query.order_by(models.Candle.bucket_start).limit(limit)).scalars())
+
+
+def get_last_price(db: Session, token_symbol: str) -> Optional[Decimal]:
+    """מחיר העסקה האחרונה, מהנר האחרון של 1m."""
+    candles = get_candles(db, token_symbol, "1m", limit=1)
+    return candles[0].close if candles else None
+
+
+def list_trades(db: Session, token_symbol: str, limit: int = 50) -> List[models.Trade]:
+    """העסקאות האחרונות של טוקן (trade tape), מהחדשה לישנה."""
+    return list(
+        db.execute(
+            select(models.Trade)
+            .where(models.Trade.token_symbol == token_symbol.upper())
+            .order_by(models.Trade.created_at.desc(), models.Trade.id.desc())
+            .limit(max(1, min(limit, MAX_CANDLES)))
+        ).scalars()
+    )
@@ -0,0 +1,304 @@
+"""
+מנוע התאמה (matching engine) בזיכרון, לפי עדיפות מחיר-זמן (price-time priority).
+
+לכל token_symbol יש ספר הזמנות (OrderBook): רמות מחיר ממוינות (bisect על
+רשימת מחירים) ובכל רמה תור FIFO של הזמנות. הזמנה חדשה קודם מותאמת מול
+הצד הנגדי (match-on-insert) – במחיר של ההזמנה שחיכתה בספר – ומה שנשאר
+ממנה נכנס לספר.
+
+המנוע לא נוגע ב-DB: orders.place_order שומר את ה-fills והכמויות שנותרו,
+ואם השמירה נכשלת המנוע מתאפס ונטען מחדש מההזמנות הפתוחות בטבלה.
+המנוע מחזיק מצב בתוך התהליך, ולכן מניח שרץ worker אחד של השרת.
+"""
+import bisect
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+BUY = "buy"
+SELL = "sell"
+SIDES = (BUY, SELL)
+
+# דיוק העמודות Numeric(18, 8) במודל: 8 ספרות אחרי הנקודה, עד 10 לפניה
+QUANTUM = Decimal("0.00000001")
+MAX_VALUE = Decimal(10) ** 10
+
+
+def to_decimal(value) -> Decimal:
+    """ממיר float/str/Decimal לדיוק של הטבלה (8 ספרות אחרי הנקודה)."""
+    return Decimal(str(value)).quantize(QUANTUM)
+
+
+def parse_decimal(value) -> Decimal:
+    """
+    כמו to_decimal, לקלט מבחוץ: ValueError אם הערך אינו מספר סופי שנכנס
+    לעמודה Numeric(18, 8) (nan, inf, 1e20, "abc"). את הסימן בודק הקורא.
+    """
+    try:
+        number = Decimal(str(value))
+        if number.is_finite() and abs(number) < MAX_VALUE:
+            number = number.quantize(QUANTUM)
+            if abs(number) < MAX_VALUE:
+                return number
+    except InvalidOperation:
+        pass
+    raise ValueError(f"not a finite Numeric(18, 8) value: {value!r}")
+
+
+@dataclass(slots=True)
+class RestingOrder:
+    order_id: int
+    user_id: int
+    side: str
+    price: Decimal
+    remaining: Decimal
+
+
+@dataclass(frozen=True, slots=True)
+class Fill:
+    token_symbol: str
+    price: Decimal
+    amount: Decimal
+    maker_order_id: int
+    taker_order_id: int
+    taker_side: str
+    # כמה נשאר להזמנה שחיכתה בספר אחרי ה-fill (0 = נסגרה)
+    maker_remaining: Decimal
+
+    @property
+    def buy_order_id(self) -> int:
+        return self.taker_order_id if self.taker_side == BUY else self.maker_order_id
+
+    @property
+    def sell_order_id(self) -> int:
+        return self.maker_order_id if self.taker_side == BUY else self.taker_order_id
+
+
+@dataclass
+class MatchResult:
+    order_id: int
+    fills: List[Fill] = field(default_factory=list)
+    # הכמות שלא הותאמה ונשארה בספר
+    remaining: Decimal = Decimal(0)
+
+    @property
+    def filled(self) -> Decimal:
+        return sum((f.amount for f in self.fills), Decimal(0))
+
+
+@dataclass(frozen=True, slots=True)
+class DepthLevel:
+    price: Decimal
+    quantity: Decimal
+    orders: int
+
+
+class PriceLevel:
+    """כל ההזמנות במחיר אחד, לפי סדר הגעה, עם סכום כמויות ומספר הזמנות."""
+
+    __slots__ = ("price", "orders", "quantity", "count")
+
+    def __init__(self, price: Decimal) -> None:
+        self.price = price
+        self.orders: Deque[RestingOrder] = deque()
+        self.quantity = Decimal(0)
+        self.count = 0
+
+
+class OrderBook:
+    def __init__(self, token_symbol: str) -> None:
+        self.token_symbol = token_symbol
+        self._levels: Dict[str, Dict[Decimal, PriceLevel]] = {BUY: {}, SELL: {}}
+        # מחירים בסדר עולה: ה-bid הטוב ביותר בסוף, ה-ask הטוב ביותר בהתחלה
+        self._prices: Dict[str, List[Decimal]] = {BUY: [], SELL: []}
+        self._orders: Dict[int, RestingOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def best_bid(self) -> Optional[Decimal]:
+        prices = self._prices[BUY]
+        return prices[-1] if prices else None
+
+    def best_ask(self) -> Optional[Decimal]:
+        prices = self._prices[SELL]
+        return prices[0] if prices else None
+
+    def _best_level(self, side: str) -> Optional[PriceLevel]:
+        prices = self._prices[side]
+        if not prices:
+            return None
+        price = prices[-1] if side == BUY else prices[0]
+        return self._levels[side][price]
+
+    def _drop_level(self, side: str, price: Decimal) -> None:
+        del self._levels[side][price]
+        prices = self._prices[side]
+        del prices[bisect.bisect_left(prices, price)]
+
+    def depth(self, levels: int = 10) -> Dict[str, List[DepthLevel]]:
+        """N רמות המחיר הטובות בכל צד – עלות לפי N, לא לפי מספר ההזמנות בספר."""
+        bids = self._levels[BUY]
+        asks = self._levels[SELL]
+        return {
+            "bids": [
+                DepthLevel(price, bids[price].quantity, bids[price].count)
+                for price in self._prices[BUY][: -levels - 1 : -1]
+            ],
+            "asks": [
+                DepthLevel(price, asks[price].quantity, asks[price].count)
+                for price in self._prices[SELL][:levels]
+            ],
+        }
+
+    def add(self, order: RestingOrder) -> None:
+        """מכניס הזמנה לספר בלי התאמה (למשל בטעינה מה-DB)."""
+        levels = self._levels[order.side]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = PriceLevel(order.price)
+            bisect.insort(self._prices[order.side], order.price)
+        level.orders.append(order)
+        level.quantity += order.remaining
+        level.count += 1
+        self._orders[order.order_id] = order
+
+    def cancel(self, order_id: int) -> bool:
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        level = self._levels[order.side][order.price]
+        level.quantity -= order.remaining
+        level.count -= 1
+        # ההזמנה נשארת בתור ומדולגת בהתאמה (remaining = 0), בלי O(n) על ה-deque
+        order.remaining = Decimal(0)
+        if level.count == 0:
+            self._drop_level(order.side, order.price)
+        return True
+
+    def submit(self, order: RestingOrder) -> MatchResult:
+        """מתאים הזמנה נכנסת מול הצד הנגדי; מה שנשאר נכנס לספר."""
+        opposite = SELL if order.side == BUY else BUY
+        result = MatchResult(order.order_id)
+
+        while order.remaining > 0:
+            level = self._best_level(opposite)
+            if level is None:
+                break
+            if order.side == BUY and level.price > order.price:
+                break
+            if order.side == SELL and level.price < order.price:
+                break
+
+            queue = level.orders
+            while queue and order.remaining > 0:
+                maker = queue[0]
+                if maker.remaining <= 0:
+                    # בוטלה קודם
+                    queue.popleft()
+                    continue
+                amount = min(order.remaining, maker.remaining)
+                maker.remaining -= amount
+                order.remaining -= amount
+                level.quantity -= amount
+                result.fills.append(
+                    Fill(
+                        token_symbol=self.token_symbol,
+                        price=level.price,
+                        amount=amount,
+                        maker_order_id=maker.order_id,
+                        taker_order_id=order.order_id,
+                        taker_side=order.side,
+                        maker_remaining=maker.remaining,
+                    )
+                )
+                if maker.remaining == 0:
+                    queue.popleft()
+                    level.count -= 1
+                    del self._orders[maker.order_id]
+
+            if level.count == 0:
+                self._drop_level(opposite, level.price)
+
+        result.remaining = order.remaining
+        if order.remaining > 0:
+            self.add(order)
+        return result
+
+
+class MatchingEngine:
+    """ספרי הזמנות לפי token_symbol. הפעולות מוגנות ב-lock אחד."""
+
+    def __init__(self) -> None:
+        self.books: Dict[str, OrderBook] = {}
+        self.lock = threading.RLock()
+        self.loaded = False
+        # token_symbol של כל הזמנה שבספר, בשביל cancel לפי id
+        self._token_of: Dict[int, str] = {}
+
+    def book(self, token_symbol: str) -> OrderBook:
+        book = self.books.get(token_symbol)
+        if book is None:
+            book = self.books[token_symbol] = OrderBook(token_symbol)
+        return book
+
+    def depth(self, token_symbol: str, levels: int = 10) -> Dict[str, List[DepthLevel]]:
+        with self.lock:
+            book = self.books.get(token_symbol)
+            if book is None:
+                return {"bids": [], "asks": []}
+            return book.depth(levels)
+
+    def tokens(self) -> List[str]:
+        """הטוקנים שיש להם הזמנות פתוחות."""
+        with self.lock:
+            return sorted(symbol for symbol, book in self.books.items() if len(book))
+
+    def submit(
+        self,
+        order_id: int,
+        user_id: int,
+        side: str,
+        token_symbol: str,
+        amount: Decimal,
+        price: Decimal,
+    ) -> MatchResult:
+        if side not in SIDES:
+            raise ValueError("side must be 'buy' or 'sell'")
+        with self.lock:
+            book = self.book(token_symbol)
+            result = book.submit(RestingOrder(order_id, user_id, side, price, amount))
+            for fill in result.fills:
+                if fill.maker_remaining == 0:
+                    self._token_of.pop(fill.maker_order_id, None)
+            if result.remaining > 0:
+                self._token_of[order_id] = token_symbol
+            return result
+
+    def cancel(self, order_id: int) -> bool:
+        with self.lock:
+            token_symbol = self._token_of.pop(order_id, None)
+            if token_symbol is None:
+                return False
+            return self.books[token_symbol].cancel(order_id)
+
+    def load(self, orders: Iterable[Tuple[str, RestingOrder]]) -> None:
+        """בונה את הספרים מחדש מזוגות (token_symbol, הזמנה) בסדר הגעה (created_at, id)."""
+        with self.lock:
+            self.books = {}
+            self._token_of = {}
+            for token_symbol, order in orders:
+                self.book(token_symbol).add(order)
+                self._token_of[order.order_id] = token_symbol
+            self.loaded = True
+
+    def reset(self) -> None:
+        with self.lock:
+            self.books = {}
+            self._token_of = {}
+            self.loaded = False
@@ -1,36 +1,214 @@
-from typing import List
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Tuple
 
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 from .. import models
+from . import candles as candles_service
+from . import wallet as wallet_service
+from .matching import (
+    MAX_VALUE,
+    SIDES,
+    DepthLevel,
+    MatchingEngine,
+    MatchResult,
+    RestingOrder,
+    parse_decimal,
+    to_decimal,
+)
 
+# מנוע ההתאמה של התהליך; נטען מההזמנות הפתוחות בשימוש הראשון
+engine = MatchingEngine()
 
-def create_order(
+MAX_DEPTH_LEVELS = 100
+
+
+def load_order_books(db: Session) -> None:
+    """בונה את ספרי ההזמנות מחדש מכל ההזמנות הפתוחות, לפי סדר הגעה."""
+    rows = db.execute(
+        select(
+            models.Order.id,
+            models.Order.user_id,
+            models.Order.side,
+            models.Order.token_symbol,
+            models.Order.price,
+            models.Order.amount,
+        )
+        .where(models.Order.is_open.is_(True))
+        .order_by(models.Order.created_at, models.Order.id)
+    )
+    engine.load(
+        (
+            token_symbol,
+            RestingOrder(order_id, user_id, side, to_decimal(price), to_decimal(amount)),
+        )
+        for order_id, user_id, side, token_symbol, price, amount in rows
+    )
+
+
+def _parse_order_value(value, name: str) -> Decimal:
+    """כמות/מחיר של הזמנה: מספר סופי, חיובי, שנכנס לעמודה Numeric(18, 8)."""
+    try:
+        number = parse_decimal(value)
+    except ValueError:
+        number = None
+    if number is None or number <= 0:
+        raise ValueError(f"{name} must be a number greater than 0 and less than {MAX_VALUE:,}")
+    return number
+
+
+def _ensure_loaded(db: Session) -> None:
+    """
+    טוען את הספרים אם צריך. מי שמתאים/מבטל קורא לזה בתוך engine.lock, כדי
+    ש-reset מקביל (אחרי כשל בשמירה) לא ישאיר אותו מול ספר ריק.
+    """
+    if not engine.loaded:
+        with engine.lock:
+            if not engine.loaded:
+                load_order_books(db)
+
+
+def _persist_match(db: Session, order: models.Order, result: MatchResult) -> None:
+    """
+    שומר את ה-fills כ-Trade, מעדכן את הכמות שנותרה בכל הזמנה שהשתתפה
+    ומעדכן את נרות ה-OHLCV.
+    """
+    order.amount = result.remaining
+    order.is_open = result.remaining > 0
+    if not result.fills:
+        return
+
+    now = datetime.utcnow()
+
+    db.execute(
+        insert(models.Trade),
+        [
+            {
+                "token_symbol": fill.token_symbol,
+                "price": fill.price,
+                "amount": fill.amount,
+                "buy_order_id": fill.buy_order_id,
+                "sell_order_id": fill.sell_order_id,
+                "taker_side": fill.taker_side,
+                "created_at": now,
+            }
+            for fill in result.fills
+        ],
+    )
+    # כל maker מופיע לכל היותר פעם אחת בהתאמה של הזמנה נכנסת
+    db.execute(
+        update(models.Order),
+        [
+            {
+                "id": fill.maker_order_id,
+                "amount": fill.maker_remaining,
+                "is_open": fill.maker_remaining > 0,
+            }
+            for fill in result.fills
+        ],
+    )
+    candles_service.record_fills(db, result.fills, now)
+
+
+def place_order(
     db: Session,
     user: models.User,
     side: str,
     token_symbol: str,
     amount: float,
     price: float,
-) -> models.Order:
+) -> Tuple[models.Order, MatchResult]:
+    """
+    יוצר הזמנה ומתאים אותה מיד מול ספר ההזמנות של הטוקן.
+    מחזיר את ההזמנה (amount = הכמות שנשארה פתוחה) ואת תוצאת ההתאמה.
+    """
     side = side.lower()
-    if side not in {"buy", "sell"}:
+    if side not in SIDES:
         raise ValueError("side must be 'buy' or 'sell'")
+    token_symbol = token_symbol.upper()
+    amount = _parse_order_value(amount, "amount")
+    price = _parse_order_value(price, "price")
+
+    user_wallet = wallet_service.get_or_create_wallet(db, user, token_symbol)
+
+    with engine.lock:
+        _ensure_loaded(db)
+        order = models.Order(
+            user_id=user.id,
+            wallet_id=user_wallet.id,
+            side=side,
+            token_symbol=token_symbol,
+            amount=amount,
+            price=price,
+            is_open=True,
+        )
+        db.add(order)
+        db.flush()
+
+        result = engine.submit(order.id, user.id, side, token_symbol, amount, price)
+        try:
+            _persist_match(db, order, result)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # הספר בזיכרון כבר השתנה – נטען אותו מחדש מה-DB בפעם הבאה
+            engine.reset()
+            raise
 
-    order = models.Order(
-        user_id=user.id,
-        side=side,
-        token_symbol=token_symbol,
-        amount=amount,
-        price=price,
-        is_open=True,
-    )
-    db.add(order)
-    db.commit()
     db.refresh(order)
+    return order, result
+
+
+def create_order(
+    db: Session,
+    user: models.User,
+    side: str,
+    token_symbol: str,
+    amount: float,
+    price: float,
+) -> models.Order:
+    order, _ = place_order(db, user, side, token_symbol, amount, price)
     return order
 
 
+def cancel_order(db: Session, user: models.User, order_id: int) -> bool:
+    """מבטל הזמנה פתוחה של המשתמש. מחזיר False אם אין כזו."""
+    with engine.lock:
+        _ensure_loaded(db)
+        order = (
+            db.query(models.Order)
+            .filter(
+                models.Order.id == order_id,
+                models.Order.user_id == user.id,
+                models.Order.is_open.is_(True),
+            )
+            .first()
+        )
+        if order is None:
+            return False
+        order.is_open = False
+        db.commit()
+        engine.cancel(order_id)
+    return True
+
+
+def get_depth(db: Session, token_symbol: str, levels: int = 10) -> Dict[str, List[DepthLevel]]:
+    """
+    עומק ספר ההזמנות: עד `levels` רמות מחיר בכל צד, עם כמות מצטברת ומספר הזמנות.
+    מוגש מהספר בזיכרון, בלי לטעון הזמנות מה-DB.
+    """
+    _ensure_loaded(db)
+    levels = max(1, min(levels, MAX_DEPTH_LEVELS))
+    return engine.depth(token_symbol.upper(), levels)
+
+
+def list_order_book_tokens(db: Session) -> List[str]:
+    _ensure_loaded(db)
+    return engine.tokens()
+
+
 def list_open_orders(db: Session) -> List[models.Order]:
     return (
         db.query(models.Order)
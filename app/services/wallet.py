@@ -1,7 +1,22 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .. import models
 from ..config import settings
+from .matching import parse_decimal
+
+# INSERT ... ON CONFLICT DO NOTHING לפי ה-DB (Postgres, או SQLite לדמו מקומי)
+_INSERT_IGNORE = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _wallet_address(telegram_id: int, token_symbol: str) -> str:
+    return f"SLH-{telegram_id}-{token_symbol}"
 
 
 def get_or_create_wallet(
@@ -20,29 +35,74 @@ def get_or_create_wallet(
     if wallet:
         return wallet
 
-    address = f"SLH-{user.telegram_id}-{token_symbol}"
+    address = _wallet_address(user.telegram_id, token_symbol)
     wallet = models.Wallet(
         user_id=user.id,
         address=address,
         token_symbol=token_symbol,
-        balance=0.0,
+        balance=Decimal(0),
     )
     db.add(wallet)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # בקשה מקבילה של אותו משתמש יצרה את הארנק (address ייחודי)
+        db.rollback()
+        return (
+            db.query(models.Wallet)
+            .filter(models.Wallet.address == address)
+            .one()
+        )
     db.refresh(wallet)
     return wallet
 
 
+def _to_amount(value) -> Decimal:
+    """
+    ממיר float/str/Decimal לדיוק של עמודת balance (Numeric(18, 8)).
+    ערך שאינו מספר סופי שנכנס לעמודה (nan, inf, 1e20) -> ValueError.
+    """
+    try:
+        return parse_decimal(value)
+    except ValueError:
+        raise ValueError("הסכום אינו מספר חוקי.") from None
+
+
+def _credit(db: Session, wallet_id: int, amount: Decimal) -> None:
+    db.execute(
+        update(models.Wallet)
+        .where(models.Wallet.id == wallet_id)
+        .values(balance=models.Wallet.balance + amount)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _debit(db: Session, wallet_id: int, amount: Decimal) -> bool:
+    """
+    הורדה אטומית: UPDATE מותנה ב-balance >= amount. מחזיר False אם אין מספיק יתרה.
+    הבדיקה והעדכון הם פקודה אחת, כך ששתי העברות במקביל לא יכולות לעבור
+    שתיהן על אותה יתרה.
+    """
+    result = db.execute(
+        update(models.Wallet)
+        .where(models.Wallet.id == wallet_id, models.Wallet.balance >= amount)
+        .values(balance=models.Wallet.balance - amount)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
 def deposit(
     db: Session,
     wallet: models.Wallet,
     amount: float,
     token_symbol: str = "SLH",
 ) -> models.Wallet:
-    wallet.balance += amount
+    amount = _to_amount(amount)
+    _credit(db, wallet.id, amount)
     tx = models.Tx(
         wallet_id=wallet.id,
-        tx_type="deposit",
+        note="deposit",
         amount=amount,
         token_symbol=token_symbol,
     )
@@ -66,38 +126,250 @@ def transfer(
 ) -> tuple[models.Wallet, models.Wallet]:
     """
     העברת SLH מארנק שולח לארנק נמען.
-    יוצרת Tx כפול: transfer_out + transfer_in.
-    """
+    יוצרת Transfer ו-Tx כפול: transfer_out + transfer_in.
 
+    היתרה לא נקראת ל-Python: ההורדה היא UPDATE מותנה (balance >= amount)
+    והזיכוי הוא UPDATE יחסי, באותה טרנזקציה. שתי השורות ננעלות לפי סדר
+    ה-id של הארנקים, כדי ש-A→B ו-B→A במקביל לא ייצרו deadlock.
+    """
+    amount = _to_amount(amount)
     if amount <= 0:
         raise ValueError("הסכום חייב להיות גדול מ-0.")
 
     if from_wallet.id == to_wallet.id:
         raise ValueError("אי אפשר לשלוח לעצמך.")
 
-    if from_wallet.balance < amount:
+    try:
+        if from_wallet.id < to_wallet.id:
+            debited = _debit(db, from_wallet.id, amount)
+            if debited:
+                _credit(db, to_wallet.id, amount)
+        else:
+            _credit(db, to_wallet.id, amount)
+            debited = _debit(db, from_wallet.id, amount)
+
+        if debited:
+            db.add_all(
+                [
+                    models.Transfer(
+                        from_wallet_id=from_wallet.id,
+                        to_wallet_id=to_wallet.id,
+                        amount=amount,
+                        token_symbol=token_symbol,
+                    ),
+                    models.Tx(
+                        wallet_id=from_wallet.id,
+                        note="transfer_out",
+                        amount=amount,
+                        token_symbol=token_symbol,
+                    ),
+                    models.Tx(
+                        wallet_id=to_wallet.id,
+                        note="transfer_in",
+                        amount=amount,
+                        token_symbol=token_symbol,
+                    ),
+                ]
+            )
+            db.commit()
+        else:
+            db.rollback()
+    except Exception:
+        db.rollback()
+        raise
+
+    if not debited:
         raise ValueError("אין מספיק יתרה בארנק לשליחה.")
 
-    from_wallet.balance -= amount
-    to_wallet.balance += amount
+    # commit מסמן את שני הארנקים כ-expired; היתרות נטענות מחדש בגישה הבאה
+    return from_wallet, to_wallet
 
-    tx_out = models.Tx(
-        wallet_id=from_wallet.id,
-        tx_type="transfer_out",
-        amount=amount,
-        token_symbol=token_symbol,
-    )
-    tx_in = models.Tx(
-        wallet_id=to_wallet.id,
-        tx_type="transfer_in",
-        amount=amount,
-        token_symbol=token_symbol,
+
+# ---------- העברה מרוכזת (airdrop) ----------
+
+Recipient = Union[int, str]  # telegram_id או "@username"
+
+
+@dataclass
+class BulkTransferResult:
+    recipient: str
+    amount: Optional[Decimal]
+    # "sent" / "unknown_recipient" / "invalid_amount" / "self_transfer" / "insufficient_balance"
+    status: str
+    wallet_id: Optional[int] = None
+
+
+@dataclass
+class BulkTransferReport:
+    ok: bool
+    total: Decimal
+    sent: int
+    results: List[BulkTransferResult] = field(default_factory=list)
+    sender_balance: Optional[Decimal] = None
+
+    @property
+    def failed(self) -> List[BulkTransferResult]:
+        return [r for r in self.results if r.status != "sent"]
+
+
+def _resolve_recipients(
+    db: Session, refs: Sequence[str], token_symbol: str
+) -> Dict[str, models.Wallet]:
+    """
+    ממפה "@username" / telegram_id לארנק, בשתי שאילתות משתמשים ואחת של ארנקים.
+    משתמש בלי ארנק בטוקן מקבל ארנק חדש (באותה טרנזקציה, בלי commit). ארנק
+    שנוצר במקביל (get_or_create_wallet, airdrop אחר) לא מפיל את ההעברה:
+    ה-INSERT מדלג על כתובת קיימת והארנקים נטענים מחדש.
+    """
+    usernames = {ref[1:] for ref in refs if ref.startswith("@")}
+    telegram_ids = {int(ref) for ref in refs if not ref.startswith("@") and ref.lstrip("-").isdigit()}
+
+    users: Dict[str, models.User] = {}
+    if usernames:
+        for user in db.execute(select(models.User).where(models.User.username.in_(usernames))).scalars():
+            users[f"@{user.username}"] = user
+    if telegram_ids:
+        for user in db.execute(select(models.User).where(models.User.telegram_id.in_(telegram_ids))).scalars():
+            users[str(user.telegram_id)] = user
+    if not users:
+        return {}
+
+    user_ids = {user.id for user in users.values()}
+    wallets_query = select(models.Wallet).where(
+        models.Wallet.user_id.in_(user_ids),
+        models.Wallet.token_symbol == token_symbol,
     )
+    wallets = {w.user_id: w for w in db.execute(wallets_query).scalars()}
 
-    db.add(tx_out)
-    db.add(tx_in)
-    db.commit()
-    db.refresh(from_wallet)
-    db.refresh(to_wallet)
+    missing = {user.id: user for user in users.values() if user.id not in wallets}
+    if missing:
+        rows = [
+            {
+                "user_id": user.id,
+                "address": _wallet_address(user.telegram_id, token_symbol),
+                "token_symbol": token_symbol,
+                "balance": Decimal(0),
+            }
+            for user in missing.values()
+        ]
+        make_insert = _INSERT_IGNORE.get(db.get_bind().dialect.name)
+        stmt = make_insert(models.Wallet).on_conflict_do_nothing() if make_insert else insert(models.Wallet)
+        db.execute(stmt, rows)
+        wallets = {w.user_id: w for w in db.execute(wallets_query).scalars()}
+    return {ref: wallets[user.id] for ref, user in users.items() if user.id in wallets}
 
-    return from_wallet, to_wallet
+
+def bulk_transfer(
+    db: Session,
+    from_wallet: models.Wallet,
+    transfers: Sequence[Tuple[Recipient, Union[float, str, Decimal]]],
+    token_symbol: str = "SLH",
+    note: str = "airdrop",
+) -> BulkTransferReport:
+    """
+    העברה מארנק אחד לאלפי נמענים בטרנזקציה אחת.
+
+    שורות לא תקינות (נמען לא קיים, סכום לא חוקי, העברה לעצמך) מדולגות
+    ומדווחות. על השאר: בדיקת יתרה אחת – הורדת הסכום הכולל ב-UPDATE מותנה –
+    זיכוי של כל הנמענים ב-executemany, ו-Transfer + שני Tx לכל שורה ב-bulk
+    insert. אם אין מספיק יתרה לסכום הכולל, לא נשלח כלום.
+    """
+    if len(transfers) > settings.bulk_transfer_max:
+        raise ValueError(f"יותר מדי נמענים ({len(transfers)} > {settings.bulk_transfer_max}).")
+
+    results: List[BulkTransferResult] = []
+    pending: List[Tuple[BulkTransferResult, str]] = []
+    for recipient, raw_amount in transfers:
+        ref = str(recipient).strip()
+        try:
+            amount = _to_amount(raw_amount)
+        except ValueError:
+            amount = None
+        result = BulkTransferResult(recipient=ref, amount=amount, status="pending")
+        results.append(result)
+        if amount is None or amount <= 0:
+            result.status = "invalid_amount"
+            continue
+        pending.append((result, ref))
+
+    try:
+        wallets = _resolve_recipients(db, [ref for _, ref in pending], token_symbol)
+
+        credits: Dict[int, Decimal] = {}
+        valid: List[BulkTransferResult] = []
+        for result, ref in pending:
+            wallet = wallets.get(ref)
+            if wallet is None:
+                result.status = "unknown_recipient"
+                continue
+            if wallet.id == from_wallet.id:
+                result.status = "self_transfer"
+                continue
+            result.wallet_id = wallet.id
+            credits[wallet.id] = credits.get(wallet.id, Decimal(0)) + result.amount
+            valid.append(result)
+
+        total = sum((r.amount for r in valid), Decimal(0))
+        if not valid:
+            db.rollback()
+            return BulkTransferReport(ok=False, total=total, sent=0, results=results)
+
+        # זיכוי לפי סדר id, וההורדה מהשולח במקום שלו בסדר – כמו ב-transfer, בלי deadlock
+        credit_stmt = (
+            update(models.Wallet.__table__)
+            .where(models.Wallet.__table__.c.id == bindparam("wallet_id"))
+            .values(balance=models.Wallet.__table__.c.balance + bindparam("delta"))
+        )
+        ordered = sorted(credits.items())
+        below = [{"wallet_id": wid, "delta": delta} for wid, delta in ordered if wid < from_wallet.id]
+        above = [{"wallet_id": wid, "delta": delta} for wid, delta in ordered if wid > from_wallet.id]
+
+        if below:
+            db.execute(credit_stmt, below)
+        if not _debit(db, from_wallet.id, total):
+            db.rollback()
+            for result in valid:
+                result.status = "insufficient_balance"
+            return BulkTransferReport(ok=False, total=total, sent=0, results=results)
+        if above:
+            db.execute(credit_stmt, above)
+
+        db.execute(
+            insert(models.Transfer),
+            [
+                {
+                    "from_wallet_id": from_wallet.id,
+                    "to_wallet_id": r.wallet_id,
+                    "amount": r.amount,
+                    "token_symbol": token_symbol,
+                }
+                for r in valid
+            ],
+        )
+        db.execute(
+            insert(models.Tx),
+            [
+                {
+                    "wallet_id": wallet_id,
+                    "note": f"{note}_{direction}",
+                    "amount": r.amount,
+                    "token_symbol": token_symbol,
+                }
+                for r in valid
+                for wallet_id, direction in ((from_wallet.id, "out"), (r.wallet_id, "in"))
+            ],
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for result in valid:
+        result.status = "sent"
+    return BulkTransferReport(
+        ok=True,
+        total=total,
+        sent=len(valid),
+        results=results,
+        sender_balance=from_wallet.balance,
+    )
@@ -25,12 +25,14 @@ def get_application() -> Application:
     app.add_handler(CommandHandler("faucet", handlers.faucet))
     app.add_handler(CommandHandler("order", handlers.order))
     app.add_handler(CommandHandler("orders", handlers.orders))
+    app.add_handler(CommandHandler("cancel", handlers.cancel))
 
     # פקודת שליחה בין משתמשים
     app.add_handler(CommandHandler("send", handlers.send))
 
     # פאנל אדמין
     app.add_handler(CommandHandler("adminpanel", handlers.adminpanel))
+    app.add_handler(CommandHandler("airdrop", handlers.airdrop))
 
     _application = app
     return app
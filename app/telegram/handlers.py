@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from telegram import Update
+from telegram import Message, Update
+from telegram.constants import MessageLimit
 from telegram.ext import ContextTypes
 
 from ..db import SessionLocal
@@ -9,10 +10,30 @@ from ..services import orders as orders_service
 from ..config import settings
 
 
+# /orders: רמות מחיר לכל צד (עד 5 טוקנים בהודעה)
+MAX_ORDERS_LEVELS = 20
+
+
 def _get_db() -> Session:
     return SessionLocal()
 
 
+async def _reply_lines(message: Message, lines: list[str]) -> None:
+    """שולח שורות כמה הודעות לפי הצורך, כל אחת מתחת למגבלת האורך של טלגרם."""
+    chunks: list[list[str]] = [[]]
+    size = 0
+    for line in lines:
+        if size + len(line) + 1 > MessageLimit.MAX_TEXT_LENGTH:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(line)
+        size += len(line) + 1
+    for chunk in chunks:
+        text = "\n".join(chunk).strip("\n")
+        if text:
+            await message.reply_text(text)
+
+
 # /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     db = _get_db()
@@ -34,7 +55,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             "/deposit <amount> - הפקדה דמו\n"
             "/send <amount> <@username|telegram_id> - שליחת SLH למשתמש אחר\n"
             "/order <buy|sell> <token> <amount> <price> - יצירת הזמנה\n"
-            "/orders - צפייה בהזמנות פתוחות\n"
+            "/orders [token] [levels] - ספר ההזמנות (עומק לפי רמות מחיר)\n"
+            "/cancel <order_id> - ביטול הזמנה פתוחה\n"
             "/faucet - קבלת טוקנים חינמיים\n"
             "/adminpanel - לפקודות אדמין"
         )
@@ -182,7 +204,7 @@ async def order(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
 
         try:
-            order_obj = orders_service.create_order(
+            order_obj, match = orders_service.place_order(
                 db,
                 user=user,
                 side=side,
@@ -194,33 +216,87 @@ async def order(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             await update.effective_message.reply_text(str(e))
             return
 
-        text = (
-            "הזמנה נוצרה בהצלחה:\n"
-            f"ID: {order_obj.id}\n"
-            f"Side: {order_obj.side}\n"
-            f"Token: {order_obj.token_symbol}\n"
-            f"Amount: {order_obj.amount}\n"
-            f"Price: {order_obj.price}"
-        )
-        await update.effective_message.reply_text(text)
+        lines = [
+            "הזמנה נוצרה בהצלחה:",
+            f"ID: {order_obj.id}",
+            f"Side: {order_obj.side}",
+            f"Token: {order_obj.token_symbol}",
+            f"Price: {order_obj.price}",
+            f"בוצע: {match.filled} ({len(match.fills)} עסקאות)",
+            f"נשאר פתוח: {match.remaining:f}",
+        ]
+        for fill in match.fills[:10]:
+            lines.append(f"  • {fill.amount} @ {fill.price} (מול #{fill.maker_order_id})")
+        if len(match.fills) > 10:
+            lines.append(f"  ... ועוד {len(match.fills) - 10}")
+        await update.effective_message.reply_text("\n".join(lines))
     finally:
         db.close()
 
 
-# /orders
+# /orders [token] [levels]
 async def orders(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    args = context.args or []
+    try:
+        levels = int(args[1]) if len(args) > 1 else 5
+    except ValueError:
+        await update.effective_message.reply_text("levels חייב להיות מספר.")
+        return
+    levels = max(1, min(levels, MAX_ORDERS_LEVELS))
+
     db = _get_db()
     try:
-        open_orders = orders_service.list_open_orders(db)
-        if not open_orders:
+        tokens = [args[0].upper()] if args else orders_service.list_order_book_tokens(db)[:5]
+        lines: list[str] = []
+        for token in tokens:
+            depth = orders_service.get_depth(db, token, levels)
+            if not depth["bids"] and not depth["asks"]:
+                continue
+            lines.append(f"📈 {token}")
+            lines.append("ASK (מכירה):")
+            for level in reversed(depth["asks"]):
+                lines.append(f"  {level.price} × {level.quantity} ({level.orders})")
+            lines.append("BID (קניה):")
+            for level in depth["bids"]:
+                lines.append(f"  {level.price} × {level.quantity} ({level.orders})")
+            lines.append("")
+
+        if not lines:
             await update.effective_message.reply_text("אין הזמנות פתוחות כרגע.")
             return
 
-        lines: list[str] = ["הזמנות פתוחות:"]
-        for o in open_orders[:20]:
-            lines.append(f"#{o.id} {o.side.upper()} {o.amount} {o.token_symbol} @ {o.price}")
+        await _reply_lines(update.effective_message, lines)
+    finally:
+        db.close()
 
-        await update.effective_message.reply_text("\n".join(lines))
+
+# /cancel <order_id>
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not context.args:
+        await update.effective_message.reply_text("שימוש: /cancel <order_id>")
+        return
+
+    try:
+        order_id = int(context.args[0])
+    except ValueError:
+        await update.effective_message.reply_text("order_id חייב להיות מספר.")
+        return
+
+    db = _get_db()
+    try:
+        tg_user = update.effective_user
+
+        user = users_service.get_or_create_user(
+            db,
+            telegram_id=tg_user.id,
+            username=tg_user.username,
+            first_name=tg_user.first_name,
+        )
+
+        if orders_service.cancel_order(db, user, order_id):
+            await update.effective_message.reply_text(f"הזמנה #{order_id} בוטלה.")
+        else:
+            await update.effective_message.reply_text("לא נמצאה הזמנה פתוחה שלך עם המספר הזה.")
     finally:
         db.close()
 
@@ -320,6 +396,75 @@ async def adminpanel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     text = (
         "Admin Panel\n"
         "- /orders - צפייה בהזמנות\n"
+        "- /airdrop - העברה מרוכזת מהארנק שלך (שורה לכל נמען: <@username|telegram_id> <amount>)\n"
         "- (ניתן להרחיב לפקודות נוספות בהמשך)"
     )
     await update.effective_message.reply_text(text)
+
+
+def _parse_airdrop_lines(text: str) -> list[tuple[str, str]]:
+    """
+    שורה לכל נמען אחרי הפקודה: "<@username|telegram_id> <amount>".
+    אפשר גם כמה זוגות באותה שורה, מופרדים בפסיק.
+    """
+    pairs: list[tuple[str, str]] = []
+    command_and_body = text.split(maxsplit=1)
+    body = command_and_body[1] if len(command_and_body) > 1 else ""
+    for chunk in body.replace(",", "\n").splitlines():
+        parts = chunk.split()
+        if not parts:
+            continue
+        pairs.append((parts[0], parts[1] if len(parts) > 1 else ""))
+    return pairs
+
+
+# /airdrop
+# <@username|telegram_id> <amount>
+# ...
+async def airdrop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    tg_user = update.effective_user
+
+    if tg_user.id not in settings.admin_owner_ids:
+        await update.effective_message.reply_text("אין לך הרשאת אדמין.")
+        return
+
+    pairs = _parse_airdrop_lines(update.effective_message.text or "")
+    if not pairs:
+        await update.effective_message.reply_text(
+            "שימוש:\n/airdrop\n@user1 10\n123456789 5.5\n..."
+        )
+        return
+
+    db = _get_db()
+    try:
+        admin = users_service.get_or_create_user(
+            db,
+            telegram_id=tg_user.id,
+            username=tg_user.username,
+            first_name=tg_user.first_name,
+        )
+        admin_wallet = wallet_service.get_or_create_wallet(db, admin)
+
+        try:
+            report = wallet_service.bulk_transfer(db, admin_wallet, pairs)
+        except ValueError as e:
+            await update.effective_message.reply_text(str(e))
+            return
+
+        lines = [
+            "✅ Airdrop בוצע" if report.ok else "❌ Airdrop לא בוצע",
+            f"נמענים: {report.sent}/{len(report.results)}",
+            f"סה\"כ: {report.total:f} {admin_wallet.token_symbol}",
+        ]
+        if report.sender_balance is not None:
+            lines.append(f"יתרה בארנק שלך: {report.sender_balance}")
+        failed = report.failed
+        if failed:
+            lines.append(f"לא נשלחו ({len(failed)}):")
+            for result in failed[:20]:
+                lines.append(f"  {result.recipient}: {result.status}")
+            if len(failed) > 20:
+                lines.append(f"  ... ועוד {len(failed) - 20}")
+        await update.effective_message.reply_text("\n".join(lines))
+    finally:
+        db.close()
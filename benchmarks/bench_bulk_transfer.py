@@ -0,0 +1,88 @@
+"""
+Benchmark: חלוקת SLH ל-`recipients` נמענים – transfer אחד לכל נמען
+(commit לכל אחד) מול wallet_service.bulk_transfer בטרנזקציה אחת.
+
+רץ מול קובץ SQLite זמני (commit אמיתי לדיסק) ובודק שהיתרות זהות בשתי הדרכים.
+
+שימוש:
+    python benchmarks/bench_bulk_transfer.py [recipients]
+"""
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import models  # noqa: E402
+from app.services import wallet as wallet_service  # noqa: E402
+
+
+def setup(url: str, recipients: int):
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    with SessionLocal() as db:
+        sender = models.User(telegram_id=1, username="treasury")
+        db.add(sender)
+        db.flush()
+        db.add(models.Wallet(user_id=sender.id, address="SLH-1-SLH", token_symbol="SLH", balance=Decimal(10**6)))
+        for i in range(recipients):
+            user = models.User(telegram_id=1000 + i, username=f"r{i}")
+            db.add(user)
+            db.flush()
+            db.add(models.Wallet(user_id=user.id, address=f"SLH-{1000 + i}-SLH", token_symbol="SLH"))
+        db.commit()
+    return engine, SessionLocal
+
+
+def balances(SessionLocal):
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(models.User.telegram_id, models.Wallet.balance).join(models.Wallet.user)
+        ).all()
+        txs = db.scalar(select(func.count()).select_from(models.Tx))
+    return dict(rows), txs
+
+
+def main() -> None:
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pairs = [(1000 + i, Decimal(i % 50 + 1) / 4) for i in range(recipients)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, SessionLocal = setup(f"sqlite:///{tmp}/loop.db", recipients)
+        with SessionLocal() as db:
+            sender = db.query(models.Wallet).filter_by(address="SLH-1-SLH").one()
+            wallets = {w.user.telegram_id: w for w in db.query(models.Wallet).all()}
+            started = time.perf_counter()
+            for telegram_id, amount in pairs:
+                wallet_service.transfer(db, sender, wallets[telegram_id], amount)
+            loop_time = time.perf_counter() - started
+        loop_balances, loop_txs = balances(SessionLocal)
+        engine.dispose()
+
+        engine, SessionLocal = setup(f"sqlite:///{tmp}/bulk.db", recipients)
+        with SessionLocal() as db:
+            sender = db.query(models.Wallet).filter_by(address="SLH-1-SLH").one()
+            started = time.perf_counter()
+            report = wallet_service.bulk_transfer(db, sender, pairs)
+            bulk_time = time.perf_counter() - started
+        bulk_balances, bulk_txs = balances(SessionLocal)
+        engine.dispose()
+
+    assert report.ok and report.sent == recipients
+    assert loop_balances == bulk_balances
+    assert loop_txs == bulk_txs == 2 * recipients
+
+    print(f"{recipients} recipients, total {report.total} SLH")
+    print(f"  transfer() per recipient : {loop_time:7.2f}s  ({recipients / loop_time:,.0f} recipients/s)")
+    print(f"  bulk_transfer()          : {bulk_time:7.2f}s  ({recipients / bulk_time:,.0f} recipients/s)")
+    print(f"  speedup                  : {loop_time / bulk_time:6.1f}x, identical balances and Tx rows")
+
+
+if __name__ == "__main__":
+    main()
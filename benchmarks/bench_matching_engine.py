@@ -0,0 +1,171 @@
+"""
+Benchmark: מנוע ההתאמה (app/services/matching.py) עם ספר של 100k הזמנות פתוחות.
+
+1. מנוע בלבד: בונים ספר של `resting` הזמנות (bids מתחת ל-100, asks מעל),
+   ושולחים `incoming` הזמנות אקראיות – חלקן חוצות את ה-spread ומייצרות
+   fills/partial fills, חלקן נכנסות לספר. מודדים הזמנות לשנייה.
+2. מסלול מלא: orders.place_order מול SQLite בזיכרון עם אותו גודל ספר –
+   כולל INSERT להזמנה, שמירת Trade ועדכון הכמויות שנשארו – ובסוף בודקים
+   שהספר בזיכרון זהה להזמנות הפתוחות בטבלה, ושהנרות שנבנו תוך כדי זהים
+   לנרות שמחושבים מחדש מכל טבלת trades.
+
+שימוש:
+    python benchmarks/bench_matching_engine.py [resting] [incoming] [db_orders]
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import models  # noqa: E402
+from app.services import orders as orders_service  # noqa: E402
+from app.services.candles import INTERVALS, bucket_start  # noqa: E402
+from app.services.matching import BUY, SELL, MatchingEngine, to_decimal  # noqa: E402
+
+
+def random_order(rng: random.Random, cross_ratio: float):
+    """הזמנה אקראית: בהסתברות cross_ratio חוצה את ה-spread, אחרת נכנסת לספר."""
+    side = BUY if rng.random() < 0.5 else SELL
+    if rng.random() < cross_ratio:
+        offset = rng.randint(0, 50)
+        price = 100.00 + offset / 100 if side == BUY else 99.99 - offset / 100
+    else:
+        offset = rng.randint(1, 1000)
+        price = 100.00 - offset / 100 if side == BUY else 99.99 + offset / 100
+    amount = rng.randint(1, 200) / 10
+    return side, to_decimal(amount), to_decimal(price)
+
+
+def bench_engine(resting: int, incoming: int) -> None:
+    rng = random.Random(7)
+    engine = MatchingEngine()
+    started = time.perf_counter()
+    for order_id in range(1, resting + 1):
+        side, amount, price = random_order(rng, cross_ratio=0.0)
+        engine.submit(order_id, order_id % 997, side, "SLH", amount, price)
+    build_time = time.perf_counter() - started
+    book = engine.book("SLH")
+    assert len(book) == resting
+
+    orders = [random_order(rng, cross_ratio=0.5) for _ in range(incoming)]
+    fills = partial = 0
+    taker_volume = maker_volume = Decimal(0)
+    started = time.perf_counter()
+    for i, (side, amount, price) in enumerate(orders, start=resting + 1):
+        result = engine.submit(i, i % 997, side, "SLH", amount, price)
+        fills += len(result.fills)
+        if result.fills and result.remaining > 0:
+            partial += 1
+        taker_volume += amount - result.remaining
+        maker_volume += sum((f.amount for f in result.fills), Decimal(0))
+    elapsed = time.perf_counter() - started
+
+    assert taker_volume == maker_volume
+    assert book.best_bid() < book.best_ask()
+
+    print(f"engine only: {resting} resting orders (built in {build_time:.2f}s)")
+    print(f"  {incoming} orders in {elapsed:.2f}s -> {incoming / elapsed:,.0f} orders/s")
+    print(f"  {fills} fills, {partial} partially filled takers, book now {len(book)} orders")
+    print(f"  best bid {book.best_bid()} / best ask {book.best_ask()}")
+
+
+def bench_place_order(resting: int, incoming: int) -> None:
+    rng = random.Random(11)
+    db_engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(db_engine)
+
+    with Session(db_engine) as db:
+        users = []
+        for i in range(50):
+            user = models.User(telegram_id=1000 + i, username=f"bench{i}")
+            db.add(user)
+            users.append(user)
+        db.flush()
+        wallets = {}
+        for user in users:
+            wallet = models.Wallet(user_id=user.id, address=f"SLH-{user.telegram_id}-SLH", token_symbol="SLH")
+            db.add(wallet)
+            wallets[user.id] = wallet
+        db.flush()
+
+        rows = []
+        for i in range(resting):
+            side, amount, price = random_order(rng, cross_ratio=0.0)
+            user = users[i % len(users)]
+            rows.append({
+                "user_id": user.id, "wallet_id": wallets[user.id].id, "side": side,
+                "token_symbol": "SLH", "amount": amount, "price": price, "is_open": True,
+            })
+        db.execute(insert(models.Order), rows)
+        db.commit()
+
+        orders_service.engine.reset()
+        started = time.perf_counter()
+        orders_service.load_order_books(db)
+        load_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fills = 0
+        for i in range(incoming):
+            side, amount, price = random_order(rng, cross_ratio=0.5)
+            _, result = orders_service.place_order(db, users[i % len(users)], side, "SLH", amount, price)
+            fills += len(result.fills)
+        elapsed = time.perf_counter() - started
+
+        book = orders_service.engine.book("SLH")
+        open_count, open_amount = db.execute(
+            select(func.count(), func.sum(models.Order.amount)).where(models.Order.is_open.is_(True))
+        ).one()
+        trades = db.scalar(select(func.count()).select_from(models.Trade))
+        book_amount = sum(
+            (o.remaining for o in book._orders.values()), Decimal(0)
+        )
+        assert open_count == len(book), (open_count, len(book))
+        assert to_decimal(open_amount) == book_amount, (open_amount, book_amount)
+        assert trades == fills
+        check_candles(db)
+
+    print(f"place_order + SQLite: {resting} resting orders (book loaded in {load_time:.2f}s)")
+    print(f"  {incoming} orders in {elapsed:.2f}s -> {incoming / elapsed:,.0f} orders/s, {fills} trades stored")
+    print(f"  DB open orders == in-memory book ({open_count}), candles == rebuild from trades")
+
+
+def check_candles(db: Session) -> None:
+    """בונה נרות מאפס מכל ה-trades ומשווה לנרות שעודכנו בכל fill."""
+    expected = {}
+    for trade in db.execute(select(models.Trade).order_by(models.Trade.id)).scalars():
+        for interval in INTERVALS:
+            key = (trade.token_symbol, interval, bucket_start(trade.created_at, interval))
+            bar = expected.get(key)
+            if bar is None:
+                expected[key] = [trade.price, trade.price, trade.price, trade.price, trade.amount, 1]
+                continue
+            bar[1] = max(bar[1], trade.price)
+            bar[2] = min(bar[2], trade.price)
+            bar[3] = trade.price
+            bar[4] += trade.amount
+            bar[5] += 1
+
+    stored = {
+        (c.token_symbol, c.interval, c.bucket_start): [c.open, c.high, c.low, c.close, c.volume, c.trades]
+        for c in db.execute(select(models.Candle)).scalars()
+    }
+    assert stored == expected, "incremental candles differ from a full rebuild"
+
+
+def main() -> None:
+    resting = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    incoming = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    db_orders = int(sys.argv[3]) if len(sys.argv) > 3 else 2_000
+    bench_engine(resting, incoming)
+    bench_place_order(resting, db_orders)
+
+
+if __name__ == "__main__":
+    main()
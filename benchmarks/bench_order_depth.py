@@ -0,0 +1,78 @@
+"""
+Benchmark: /orders – טעינת כל ההזמנות הפתוחות (list_open_orders) מול עומק
+ספר ההזמנות המצטבר (orders.get_depth) שמוגש מהספר בזיכרון.
+
+רץ מול SQLite בזיכרון עם `resting` הזמנות פתוחות.
+
+שימוש:
+    python benchmarks/bench_order_depth.py [resting] [levels]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import models  # noqa: E402
+from app.services import orders as orders_service  # noqa: E402
+from app.services.matching import to_decimal  # noqa: E402
+
+
+def main() -> None:
+    resting = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    levels = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = random.Random(5)
+
+    db_engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(db_engine)
+    with Session(db_engine) as db:
+        user = models.User(telegram_id=1, username="bench")
+        db.add(user)
+        db.flush()
+        wallet = models.Wallet(user_id=user.id, address="SLH-1-SLH", token_symbol="SLH")
+        db.add(wallet)
+        db.flush()
+        rows = []
+        for _ in range(resting):
+            side = rng.choice(("buy", "sell"))
+            offset = rng.randint(1, 1000) / 100
+            rows.append({
+                "user_id": user.id, "wallet_id": wallet.id, "side": side, "token_symbol": "SLH",
+                "amount": to_decimal(rng.randint(1, 200) / 10),
+                "price": to_decimal(100 - offset if side == "buy" else 100 + offset),
+                "is_open": True,
+            })
+        db.execute(insert(models.Order), rows)
+        db.commit()
+
+        started = time.perf_counter()
+        first_page = orders_service.list_open_orders(db)[:20]
+        full_time = time.perf_counter() - started
+        db.expunge_all()
+        assert len(first_page) == 20
+
+        orders_service.engine.reset()
+        started = time.perf_counter()
+        orders_service.get_depth(db, "SLH", levels)
+        load_time = time.perf_counter() - started
+
+        calls = 1000
+        started = time.perf_counter()
+        for _ in range(calls):
+            depth = orders_service.get_depth(db, "SLH", levels)
+        depth_time = (time.perf_counter() - started) / calls
+
+        total = sum(level.orders for level in depth["bids"] + depth["asks"])
+        print(f"{resting} open orders, top {levels} levels per side ({total} orders aggregated)")
+        print(f"  list_open_orders()[:20] : {full_time * 1000:9.1f} ms per call")
+        print(f"  get_depth (first call)  : {load_time * 1000:9.1f} ms (loads the book once)")
+        print(f"  get_depth               : {depth_time * 1000:9.3f} ms per call")
+        print(f"  speedup                 : {full_time / depth_time:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: אימות מכירות SLH דרך SaleVerifier מול שרת RPC מקומי.
+
+מודד זמן כולל לאימות N עסקאות (חלקן "עוד לא נכרתו" ונבדקות שוב עם
+backoff), כמה בקשות RPC נשלחו, וכמה ה-event loop נתקע בזמן הזה (lag
+מקסימלי של טיימר שאמור לרוץ כל 10ms). אחר כך מאמת שוב את אותן עסקאות –
+הפעם מה-receipt cache, בלי RPC. התוצאות נכתבות ל-sink בזיכרון במקום ל-DB.
+
+שימוש:
+    python benchmarks/bench_sale_verifier.py [transactions] [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_bsc_rpc import FakeBscRpc  # noqa: E402
+
+TREASURY = "0x000000000000000000000000000000000000dEaD"
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+async def run(count: int, latency: float) -> None:
+    with FakeBscRpc(latency=latency) as rpc:
+        os.environ["BSC_RPC_URL"] = rpc.url
+        from SLH.slh_token import SLH_TOKEN_ADDRESS, SLH_TOKEN_DECIMALS
+        from SLH.receipt_cache import ReceiptCache
+        from SLH.sale_verifier import SaleVerifier
+
+        # כמו create_token_sales: שורה אחת לכל tx_hash, שורה מאומתת לא נדרסת
+        stored = {}
+
+        async def save(rows):
+            out = []
+            for row in rows:
+                tx_hash, status = row[4], row[5]
+                prior = stored.get(tx_hash)
+                already = prior is not None and prior[1][5] == "verified"
+                if prior is None:
+                    stored[tx_hash] = (len(stored) + 1, row)
+                elif not already:
+                    stored[tx_hash] = (prior[0], row)
+                out.append((stored[tx_hash][0], already))
+            return out
+
+        txs = []
+        for i in range(count):
+            tx_hash = "0x" + format(i + 1, "064x")
+            sender = "0x" + format(i * 7919 + 1, "040x")
+            rpc.add_transfer_tx(
+                tx_hash, SLH_TOKEN_ADDRESS, sender, TREASURY,
+                value=(i % 5 + 1) * 10 ** SLH_TOKEN_DECIMALS,
+                pending_polls=1 if i % 4 == 0 else 0,
+            )
+            txs.append((tx_hash, sender))
+
+        verifier = SaleVerifier(
+            [rpc.url], per_rpc_concurrency=8, workers=16,
+            base_delay=0.05, flush_interval=0.05, save=save,
+            # cache בזיכרון בלבד; כל receipt נחשב סופי
+            receipts=ReceiptCache(confirmations=1, load=lambda tx: None, store=lambda *a: None),
+        )
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_lag(stop))
+
+        started = time.perf_counter()
+        futures = [verifier.submit(1000 + i, tx, sender, min_amount=2) for i, (tx, sender) in enumerate(txs)]
+        results = await asyncio.gather(*futures)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        worst_lag = await lag_task
+
+        requests_before = rpc.http_requests
+        started = time.perf_counter()
+        again = await asyncio.gather(
+            *(verifier.submit(1000 + i, tx, sender, min_amount=2) for i, (tx, sender) in enumerate(txs))
+        )
+        again_elapsed = time.perf_counter() - started
+        again_requests = rpc.http_requests - requests_before
+
+        # אותה עסקה משני משתמשים במקביל: כל אחד מקבל בדיקה משלו, רק אחד מזוכה
+        shared_tx = "0x" + format(count + 1, "064x")
+        rpc.add_transfer_tx(shared_tx, SLH_TOKEN_ADDRESS, txs[0][1], TREASURY, value=5 * 10 ** SLH_TOKEN_DECIMALS)
+        first, second = verifier.submit(1, shared_tx, txs[0][1], 2), verifier.submit(2, shared_tx, txs[0][1], 2)
+        assert first is not second
+        shared = await asyncio.gather(first, second)
+        assert all(r.ok for r in shared) and shared[0].sale_id == shared[1].sale_id
+        assert sorted(r.already_credited for r in shared) == [False, True]
+        await verifier.stop()
+        assert [r.ok for r in again] == [r.ok for r in results] and again_requests == 0
+
+        verified = sum(r.ok for r in results)
+        assert len(stored) == count + 1 and all(r.sale_id for r in results + again)
+        assert [r.sale_id for r in again] == [r.sale_id for r in results]
+        assert [r.already_credited for r in again] == [r.ok for r in results]
+        assert verified == sum(1 for i in range(count) if i % 5 + 1 >= 2)
+
+        print(f"{count} sale txs, {latency * 1000:.0f} ms simulated RPC latency")
+        print(f"  total        : {elapsed * 1000:8.1f} ms ({count / elapsed:.0f} tx/s)")
+        print(f"  verified     : {verified} (rest below min amount)")
+        print(f"  RPC requests : {rpc.http_requests} ({verifier.stats['retries']} retries for unmined txs)")
+        print(f"  max loop lag : {worst_lag * 1000:8.1f} ms")
+        print(f"  re-verify    : {again_elapsed * 1000:8.1f} ms ({again_requests} RPC requests, receipt cache)")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    asyncio.run(run(count, latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: יתרות SLH לכמה מאות כתובות – balanceOf אחד לכל כתובת מול batch.
+
+רץ מול שרת ה-RPC המקומי (fake_bsc_rpc.py) עם השהיה מדומה לכל בקשה, כך
+שאפשר להריץ בלי רשת. בודק גם שהתוצאות זהות ושקריאה חוזרת באותו בלוק
+מוגשת מה-cache בלי RPC.
+
+שימוש:
+    python benchmarks/bench_slh_balances.py [addresses] [latency_ms]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_bsc_rpc import FakeBscRpc, fake_balance  # noqa: E402
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    addresses = ["0x" + format(i * 7919 + 1, "040x") for i in range(count)]
+
+    with FakeBscRpc(latency=latency, block_time=60.0) as rpc:
+        os.environ["BSC_RPC_URL"] = rpc.url
+        from SLH import slh_token
+
+        print(f"{count} addresses, {latency * 1000:.0f} ms simulated RPC latency")
+
+        # המסלול הישן: eth_call אחד לכל כתובת דרך web3
+        started = time.perf_counter()
+        sequential = {}
+        for address in addresses:
+            raw = slh_token.SLH_CONTRACT.functions.balanceOf(slh_token.checksum(address)).call()
+            sequential[address] = raw / (10 ** slh_token.SLH_TOKEN_DECIMALS)
+        seq_time = time.perf_counter() - started
+        seq_requests = rpc.http_requests
+
+        started = time.perf_counter()
+        batched = slh_token.get_slh_balances(addresses)
+        batch_time = time.perf_counter() - started
+        batch_requests = rpc.http_requests - seq_requests
+
+        started = time.perf_counter()
+        cached = slh_token.get_slh_balances(addresses)
+        cached_time = time.perf_counter() - started
+        cached_requests = rpc.http_requests - seq_requests - batch_requests
+
+        assert batched == sequential == cached
+        assert all(
+            batched[a] == fake_balance(a) / (10 ** slh_token.SLH_TOKEN_DECIMALS) for a in addresses
+        )
+
+        print(f"  sequential : {seq_time * 1000:8.1f} ms  ({seq_requests} HTTP requests)")
+        print(f"  batched    : {batch_time * 1000:8.1f} ms  ({batch_requests} HTTP requests)")
+        print(f"  cached     : {cached_time * 1000:8.1f} ms  ({cached_requests} HTTP requests)")
+        print(f"  speedup    : {seq_time / batch_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
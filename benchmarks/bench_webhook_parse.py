@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: עלות פענוח עדכון webhook אחד – המסלול הישן מול החדש.
+
+ישן:  json.loads (FastAPI) -> TelegramWebhookUpdate (pydantic) -> .dict() -> Update.de_json
+חדש:  orjson.loads / json.loads פעם אחת -> Update.de_json
+
+שימוש:
+    python benchmarks/bench_webhook_parse.py [iterations]
+"""
+import json
+import sys
+import timeit
+import warnings
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+from telegram import Bot, Update
+
+try:
+    import orjson
+    fast_loads = orjson.loads
+    LOADER = "orjson"
+except ImportError:
+    fast_loads = json.loads
+    LOADER = "json"
+
+
+class TelegramWebhookUpdate(BaseModel):
+    """המודל שה-route הישן השתמש בו"""
+    update_id: int
+    message: Optional[Dict[str, Any]] = None
+    callback_query: Optional[Dict[str, Any]] = None
+    edited_message: Optional[Dict[str, Any]] = None
+
+
+SAMPLE_UPDATES = {
+    "message": {
+        "update_id": 900000001,
+        "message": {
+            "message_id": 4242,
+            "date": 1763300000,
+            "chat": {"id": 123456789, "type": "private", "first_name": "Dana", "username": "dana_slh"},
+            "from": {"id": 123456789, "is_bot": False, "first_name": "Dana", "username": "dana_slh", "language_code": "he"},
+            "text": "/start 987654321",
+            "entities": [{"offset": 0, "length": 6, "type": "bot_command"}],
+        },
+    },
+    "callback_query": {
+        "update_id": 900000002,
+        "callback_query": {
+            "id": "4382bfdwdsb323b2d9",
+            "chat_instance": "-8731122334455",
+            "data": "info_benefits",
+            "from": {"id": 123456789, "is_bot": False, "first_name": "Dana", "username": "dana_slh"},
+            "message": {
+                "message_id": 4243,
+                "date": 1763300005,
+                "chat": {"id": 123456789, "type": "private", "first_name": "Dana"},
+                "from": {"id": 1111111111, "is_bot": True, "first_name": "SLHNET", "username": "slhnet_bot"},
+                "text": "ברוך הבא לשער הדיגיטלי של קהילת SLHNET.",
+            },
+        },
+    },
+}
+
+
+def old_path(body: bytes, bot: Bot) -> Update:
+    # .dict() כמו בקוד הישן (deprecated ב-pydantic v2)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        model = TelegramWebhookUpdate(**json.loads(body))
+        return Update.de_json(model.dict(), bot)
+
+
+def new_path(body: bytes, bot: Bot) -> Update:
+    return Update.de_json(fast_loads(body), bot)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    bot = Bot("123456:BENCHMARK")
+
+    print(f"Webhook parse benchmark – {iterations} iterations, fast loader: {LOADER}")
+    for name, payload in SAMPLE_UPDATES.items():
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        assert old_path(body, bot).to_dict() == new_path(body, bot).to_dict()
+
+        old = min(timeit.repeat(lambda: old_path(body, bot), number=iterations, repeat=3))
+        new = min(timeit.repeat(lambda: new_path(body, bot), number=iterations, repeat=3))
+        old_us = old / iterations * 1e6
+        new_us = new / iterations * 1e6
+        print(
+            f"  {name:<15} old: {old_us:7.2f} µs/update   new: {new_us:7.2f} µs/update"
+            f"   speedup: {old_us / new_us:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
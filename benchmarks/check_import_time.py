@@ -0,0 +1,96 @@
+"""
+בדיקת תקציב זמן import (cold start) עם `python -X importtime`.
+
+כל מודול נטען כמה פעמים בתהליך Python נקי, ולוקחים את הזמן המינימלי
+(cumulative) מתוך הפלט של importtime. הבדיקה נכשלת (exit code 1) אם:
+- מודול חורג מהתקציב שלו, או
+- מודול "כבד" שאמור להיטען רק בשימוש ראשון (למשל web3) נטען כבר ב-import.
+
+שימוש:
+    python benchmarks/check_import_time.py [--runs 3]
+
+IMPORT_BUDGET_SCALE=2 מכפיל את כל התקציבים (למכונות CI איטיות).
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# תקציב במילישניות לכל מודול (cumulative import time)
+BUDGETS_MS: Dict[str, float] = {
+    "main": 900.0,
+    "app.main": 1300.0,
+    "SLH.slh_token": 300.0,
+}
+
+# מודולים שנטענים בעצלות – אסור שיופיעו ב-import של המודולים למעלה
+LAZY_MODULES = ("web3", "eth_account")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure(module: str) -> Tuple[float, Set[str]]:
+    """זמן import מצטבר (ms) של module בתהליך נקי, ורשימת כל המודולים שנטענו."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    env.setdefault("BOT_TOKEN", "123456:IMPORT-TIME-CHECK")
+    # קבצי לוג וכו' נכתבים לתיקייה זמנית ולא לשורש הריפו
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total_us = None
+    loaded: Set[str] = set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        loaded.add(name)
+        if name == module and len(indent) <= 1:
+            total_us = cumulative
+    if total_us is None:
+        raise RuntimeError(f"no importtime entry for {module}")
+    return total_us / 1000.0, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="כמה פעמים למדוד כל מודול (לוקחים מינימום)")
+    args = parser.parse_args()
+    scale = float(os.environ.get("IMPORT_BUDGET_SCALE", "1"))
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        budget *= scale
+        best = float("inf")
+        loaded: Set[str] = set()
+        for _ in range(max(1, args.runs)):
+            elapsed, loaded = measure(module)
+            best = min(best, elapsed)
+        eager = sorted(m for m in LAZY_MODULES if m in loaded)
+
+        ok = best <= budget and not eager
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {module:<16} {best:8.1f} ms  (budget {budget:.0f} ms)")
+        if eager:
+            print(f"     loaded at import time, should be lazy: {', '.join(eager)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+שרת JSON-RPC מקומי שמדמה BSC – לבדיקות ו-benchmarks בלי רשת.
+
+תומך ב-eth_blockNumber, eth_chainId, eth_call של balanceOf (יתרה דטרמיניסטית
+לפי הכתובת) ו-eth_getTransactionReceipt לעסקאות שנרשמו ב-add_transfer_tx,
+בבקשה בודדת או ב-batch. אפשר להוסיף השהיה לכל בקשת HTTP כדי
+לדמות round-trip לשרת RPC אמיתי. סופר כמה בקשות HTTP וכמה קריאות RPC הגיעו.
+
+שימוש:
+    with FakeBscRpc(latency=0.02) as rpc:
+        os.environ["BSC_RPC_URL"] = rpc.url
+        ...
+
+    python benchmarks/fake_bsc_rpc.py [port]   # הרצה עצמאית
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+BALANCE_OF_SELECTOR = "0x70a08231"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def fake_balance(address: str) -> int:
+    """יתרה גולמית קבועה לכל כתובת (עד 10^6 טוקנים עם 15 ספרות)."""
+    digest = hashlib.sha256(address.lower().encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big") % (10 ** 21)
+
+
+class FakeBscRpc:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        block_time: float = 3.0,
+        chain_id: int = 56,
+    ) -> None:
+        self.latency = latency
+        self.block_time = block_time
+        self.chain_id = chain_id
+        self.http_requests = 0
+        self.rpc_calls = 0
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        # tx_hash -> [receipt, כמה קריאות עוד יחזירו None ("עוד לא נכרתה")]
+        self._receipts: Dict[str, list] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def block_number(self) -> int:
+        return 40_000_000 + int((time.monotonic() - self._started_at) / self.block_time)
+
+    def add_transfer_tx(
+        self,
+        tx_hash: str,
+        token: str,
+        sender: str,
+        recipient: str,
+        value: int,
+        status: int = 1,
+        pending_polls: int = 0,
+    ) -> None:
+        """רושם עסקת Transfer; pending_polls הקריאות הראשונות יחזירו None."""
+        block = self.block_number
+        receipt = {
+            "transactionHash": tx_hash,
+            "blockNumber": hex(block),
+            "status": hex(status),
+            "logs": [
+                {
+                    "address": token.lower(),
+                    "topics": [
+                        TRANSFER_TOPIC,
+                        "0x" + sender[2:].lower().rjust(64, "0"),
+                        "0x" + recipient[2:].lower().rjust(64, "0"),
+                    ],
+                    "data": "0x" + format(value, "064x"),
+                    "blockNumber": hex(block),
+                    "transactionHash": tx_hash,
+                }
+            ],
+        }
+        with self._lock:
+            self._receipts[tx_hash.lower()] = [receipt, pending_polls]
+
+    def _receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._receipts.get(tx_hash.lower())
+            if entry is None:
+                return None
+            if entry[1] > 0:
+                entry[1] -= 1
+                return None
+            return entry[0]
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get("method")
+        params = request.get("params") or []
+        reply: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        if method == "eth_blockNumber":
+            reply["result"] = hex(self.block_number)
+        elif method == "eth_chainId":
+            reply["result"] = hex(self.chain_id)
+        elif method == "eth_getTransactionReceipt" and params:
+            reply["result"] = self._receipt(str(params[0]))
+        elif method == "eth_call" and params and str(params[0].get("data", "")).startswith(BALANCE_OF_SELECTOR):
+            address = "0x" + params[0]["data"][-40:]
+            reply["result"] = "0x" + format(fake_balance(address), "064x")
+        else:
+            reply["error"] = {"code": -32601, "message": f"method not supported: {method}"}
+        return reply
+
+    def _handler_class(self):
+        rpc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+                if rpc.latency:
+                    time.sleep(rpc.latency)
+                batch = body if isinstance(body, list) else [body]
+                with rpc._lock:
+                    rpc.http_requests += 1
+                    rpc.rpc_calls += len(batch)
+                replies = [rpc._answer(item) for item in batch]
+                payload = json.dumps(replies if isinstance(body, list) else replies[0]).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeBscRpc":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bsc-rpc", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeBscRpc":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8545
+    server = FakeBscRpc(port=port).start()
+    print(f"Fake BSC RPC listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
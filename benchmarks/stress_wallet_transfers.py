@@ -0,0 +1,167 @@
+"""
+Stress test: העברות בין ארנקים עם הרבה שולחים במקביל (wallet_service.transfer).
+
+`senders` threads, לכל אחד Session משלו, שולחים `per_sender` העברות
+אקראיות בין `wallets` ארנקים. בסוף בודקים:
+- סך כל היתרות לא השתנה ואין יתרה שלילית,
+- היתרה של כל ארנק = יתרת פתיחה + מה שהתקבל - מה שנשלח בהעברות שהצליחו,
+- לכל העברה שהצליחה יש Transfer אחד ושני Tx.
+ומדפיסים העברות לשנייה.
+
+--naive מריץ את אותו עומס עם הלוגיקה הישנה (קריאת balance ל-Python,
+חישוב וכתיבה), כדי לראות את ה-lost updates שהיא מייצרת.
+
+ברירת המחדל היא קובץ SQLite זמני; עם DATABASE_URL (למשל Postgres) הבדיקה
+רצה מול ה-DB הזה – על טבלאות ריקות בלבד.
+
+שימוש:
+    python benchmarks/stress_wallet_transfers.py [--senders 50] [--per-sender 200] [--wallets 20] [--naive]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app import models  # noqa: E402
+from app.services import wallet as wallet_service  # noqa: E402
+
+INITIAL_BALANCE = Decimal("1000")
+
+
+def naive_transfer(db: Session, from_wallet, to_wallet, amount) -> None:
+    """הלוגיקה הישנה: בדיקת יתרה ועדכון ב-Python, בלי נעילה."""
+    db.refresh(from_wallet)
+    db.refresh(to_wallet)
+    amount = Decimal(str(amount))
+    if from_wallet.balance < amount:
+        raise ValueError("אין מספיק יתרה בארנק לשליחה.")
+    from_wallet.balance -= amount
+    to_wallet.balance += amount
+    db.add(models.Transfer(from_wallet_id=from_wallet.id, to_wallet_id=to_wallet.id, amount=amount))
+    db.add(models.Tx(wallet_id=from_wallet.id, note="transfer_out", amount=amount))
+    db.add(models.Tx(wallet_id=to_wallet.id, note="transfer_in", amount=amount))
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--per-sender", type=int, default=200)
+    parser.add_argument("--wallets", type=int, default=20)
+    parser.add_argument("--naive", action="store_true", help="הלוגיקה הישנה (read-modify-write)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{tmpdir.name}/stress.db"
+    connect_args = {"check_same_thread": False, "timeout": 60} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.senders, max_overflow=0)
+    models.Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    with SessionLocal() as db:
+        if db.scalar(select(func.count()).select_from(models.Transfer)):
+            sys.exit("transfers table is not empty – run against an empty database")
+        wallet_ids = []
+        for i in range(args.wallets):
+            user = models.User(telegram_id=900_000 + i, username=f"stress{i}")
+            db.add(user)
+            db.flush()
+            wallet = models.Wallet(
+                user_id=user.id, address=f"SLH-STRESS-{i}", token_symbol="SLH", balance=INITIAL_BALANCE
+            )
+            db.add(wallet)
+            db.flush()
+            wallet_ids.append(wallet.id)
+        db.commit()
+
+    transfer = naive_transfer if args.naive else wallet_service.transfer
+    results = defaultdict(list)  # sender index -> [(from_id, to_id, amount)]
+    counters = defaultdict(int)
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.senders)
+
+    def sender(index: int) -> None:
+        rng = random.Random(index)
+        with SessionLocal() as db:
+            wallets = {w.id: w for w in db.query(models.Wallet).filter(models.Wallet.id.in_(wallet_ids))}
+            barrier.wait()
+            for _ in range(args.per_sender):
+                # כל sender שולח בעיקר מארנק "שלו", כדי שיהיו הרבה שולחים על אותן שורות
+                from_id = wallet_ids[index % len(wallet_ids)] if rng.random() < 0.7 else rng.choice(wallet_ids)
+                to_id = rng.choice([w for w in wallet_ids if w != from_id])
+                amount = Decimal(rng.randint(1, 5000)) / 100
+                try:
+                    transfer(db, wallets[from_id], wallets[to_id], amount)
+                    results[index].append((from_id, to_id, amount))
+                except ValueError:
+                    with lock:
+                        counters["insufficient"] += 1
+                except Exception as e:  # noqa: BLE001 – נספר ומדווח בסוף
+                    db.rollback()
+                    with lock:
+                        counters[type(e).__name__] += 1
+
+    threads = [threading.Thread(target=sender, args=(i,)) for i in range(args.senders)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    expected = {wid: INITIAL_BALANCE for wid in wallet_ids}
+    done = 0
+    for items in results.values():
+        for from_id, to_id, amount in items:
+            expected[from_id] -= amount
+            expected[to_id] += amount
+            done += 1
+
+    with SessionLocal() as db:
+        balances = dict(db.execute(select(models.Wallet.id, models.Wallet.balance).where(models.Wallet.id.in_(wallet_ids))).all())
+        transfers = db.scalar(select(func.count()).select_from(models.Transfer))
+        txs = db.scalar(select(func.count()).select_from(models.Tx))
+
+    total = sum(balances.values())
+    mismatched = sum(1 for wid in wallet_ids if Decimal(balances[wid]) != expected[wid])
+    negative = sum(1 for b in balances.values() if b < 0)
+    attempts = args.senders * args.per_sender
+
+    mode = "naive read-modify-write" if args.naive else "atomic conditional UPDATE"
+    print(f"{mode}: {args.senders} concurrent senders x {args.per_sender}, {args.wallets} wallets ({engine.dialect.name})")
+    print(f"  {attempts} attempts in {elapsed:.2f}s -> {attempts / elapsed:,.0f} attempts/s, {done / elapsed:,.0f} transfers/s")
+    print(f"  succeeded {done}, insufficient balance {counters.pop('insufficient', 0)}, errors {dict(counters) or 0}")
+    print(f"  total supply {total} (expected {INITIAL_BALANCE * args.wallets})")
+    print(f"  wallets with lost updates: {mismatched}, negative balances: {negative}")
+    print(f"  rows: {transfers} transfers, {txs} txs (expected {done}, {2 * done})")
+
+    ok = (
+        total == INITIAL_BALANCE * args.wallets
+        and mismatched == 0
+        and negative == 0
+        and transfers == done
+        and txs == 2 * done
+    )
+    print("  OK" if ok else "  FAILED")
+    engine.dispose()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
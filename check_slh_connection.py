@@ -12,7 +12,7 @@ from SLH.slh_token import (
     SLH_TOKEN_ADDRESS,
     SLH_TOKEN_DECIMALS,
     SLH_TOKEN_SYMBOL,
-    w3,
+    get_w3,
 )
 
 
@@ -25,6 +25,7 @@ def main() -> None:
     print(f"Token Symbol: {SLH_TOKEN_SYMBOL}")
     print()
 
+    w3 = get_w3()
     is_connected = w3.is_connected()
     print(f"Web3 connected: {is_connected}")
     if not is_connected:
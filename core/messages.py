@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .metrics import MESSAGE_CATALOG_LOOKUPS, MESSAGE_CATALOG_RELOADS
+
+logger = logging.getLogger("slhnet.messages")
+
+Parser = Callable[[str], Dict[str, str]]
+
+
+def parse_section_blocks(text: str) -> Dict[str, str]:
+    """Parse `=== NAME ===` ... `=== END` sections (bot_messages_slhnet.txt).
+
+    Keys are the stripped header lines, so callers can keep matching
+    block names as substrings of the header like the old line scanner did.
+    """
+    blocks: Dict[str, str] = {}
+    header: Optional[str] = None
+    lines: list[str] = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("=== END"):
+            if header is not None:
+                blocks.setdefault(header, "\n".join(lines).strip())
+            header, lines = None, []
+            continue
+        if stripped.startswith("==="):
+            if header is not None:
+                blocks.setdefault(header, "\n".join(lines).strip())
+            header, lines = stripped, []
+            continue
+        if header is not None:
+            lines.append(line)
+    if header is not None:
+        blocks.setdefault(header, "\n".join(lines).strip())
+    return blocks
+
+
+def parse_tagged_blocks(text: str) -> Dict[str, str]:
+    """Parse `[block:name]` ... `[/block]` sections (messages/messages.md)."""
+    blocks: Dict[str, str] = {}
+    start_prefix = "[block:"
+    end_tag = "[/block]"
+    pos = 0
+    while True:
+        start = text.find(start_prefix, pos)
+        if start == -1:
+            break
+        name_end = text.find("]", start)
+        if name_end == -1:
+            break
+        name = text[start + len(start_prefix):name_end]
+        body_start = name_end + 1
+        end = text.find(end_tag, body_start)
+        if end == -1:
+            end = len(text)
+        blocks.setdefault(name, text[body_start:end].strip())
+        pos = end
+    return blocks
+
+
+class MessageCatalog:
+    """Message blocks parsed once per file version.
+
+    The file is re-parsed only when its mtime changes, and the mtime itself
+    is checked at most once every `check_interval` seconds, so a lookup is
+    normally a dict access.
+    """
+
+    def __init__(self, path: Path, parser: Parser, name: str, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.parser = parser
+        self.name = name
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, str] = {}
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.available = False
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                if self.available:
+                    logger.warning("Messages file disappeared: %s", self.path)
+                self._blocks, self._resolved, self._mtime = {}, {}, None
+                self.available = False
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                text = self.path.read_text(encoding="utf-8-sig")
+                blocks = self.parser(text)
+            except Exception as e:
+                logger.error("Failed to parse messages file %s: %s", self.path, e)
+                return
+            self._blocks, self._resolved, self._mtime = blocks, {}, mtime
+            self.available = True
+            MESSAGE_CATALOG_RELOADS.labels(catalog=self.name).inc()
+            logger.info("Loaded %s message blocks from %s", len(blocks), self.path)
+
+    def _resolve(self, block_name: str) -> Optional[str]:
+        """Exact key first, then the first header that contains the name."""
+        resolved = self._resolved
+        if block_name in resolved:
+            return resolved[block_name]
+        blocks = self._blocks
+        if block_name in blocks:
+            key: Optional[str] = block_name
+        else:
+            key = next((k for k in blocks if block_name in k), None)
+        resolved[block_name] = key
+        return key
+
+    def lookup(self, block_name: str) -> Optional[str]:
+        """Return the block text, or None if the block (or file) is missing."""
+        self._refresh()
+        key = self._resolve(block_name)
+        if key is None:
+            MESSAGE_CATALOG_LOOKUPS.labels(catalog=self.name, result="miss").inc()
+            return None
+        MESSAGE_CATALOG_LOOKUPS.labels(catalog=self.name, result="hit").inc()
+        return self._blocks.get(key)
+
+    def get(self, block_name: str, fallback: str = "") -> str:
+        block = self.lookup(block_name)
+        return block or fallback
+
+
+_catalogs: Dict[Path, MessageCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path: Path, parser: Parser, name: str) -> MessageCatalog:
+    """Shared catalog per file, so every importer hits the same parsed copy."""
+    key = Path(path).resolve()
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = MessageCatalog(key, parser, name)
+                _catalogs[key] = catalog
+    return catalog
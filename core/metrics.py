@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 MESSAGES_RECEIVED = Counter(
     "slhnet_messages_received_total",
@@ -15,3 +15,73 @@ REQUEST_DURATION = Histogram(
     "slhnet_request_duration_seconds",
     "HTTP request duration in seconds",
 )
+
+DB_POOL_WAIT = Histogram(
+    "slhnet_db_pool_wait_seconds",
+    "Time spent waiting to check out a pooled DB connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "slhnet_db_pool_checkouts_total",
+    "DB pool checkouts by outcome (immediate / waited / timeout)",
+    ["outcome"],
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "slhnet_db_pool_connections",
+    "Open pooled DB connections by state",
+    ["state"],
+)
+
+MESSAGE_CATALOG_LOOKUPS = Counter(
+    "slhnet_message_catalog_lookups_total",
+    "Message block lookups by catalog and result (hit / miss)",
+    ["catalog", "result"],
+)
+
+MESSAGE_CATALOG_RELOADS = Counter(
+    "slhnet_message_catalog_reloads_total",
+    "Times a message catalog re-parsed its file after an mtime change",
+    ["catalog"],
+)
+
+ADMIN_LOG_LINES = Counter(
+    "slhnet_admin_log_lines_total",
+    "Admin log lines by outcome (queued / sent / dropped / failed)",
+    ["outcome"],
+)
+
+ADMIN_LOG_BATCHES = Counter(
+    "slhnet_admin_log_batches_total",
+    "Batched admin log messages delivered to Telegram",
+)
+
+ADMIN_LOG_QUEUE_DEPTH = Gauge(
+    "slhnet_admin_log_queue_depth",
+    "Admin log lines waiting to be sent",
+)
+
+UPDATE_QUEUE_DEPTH = Gauge(
+    "slhnet_update_queue_depth",
+    "Webhook updates waiting for a worker",
+    ["dispatcher"],
+)
+
+UPDATE_QUEUE_EVENTS = Counter(
+    "slhnet_update_queue_events_total",
+    "Webhook update queue events (enqueued / rejected / processed / failed)",
+    ["dispatcher", "event"],
+)
+
+UPDATE_PROCESSING_DURATION = Histogram(
+    "slhnet_update_processing_seconds",
+    "Time a worker spent processing one queued update",
+    ["dispatcher"],
+)
+
+UPDATE_DUPLICATES = Counter(
+    "slhnet_update_duplicates_total",
+    "Telegram updates dropped because their update_id was already seen",
+    ["scope"],
+)
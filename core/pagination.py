@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Position in a (created_at DESC, id DESC) listing: the last row already seen.
+Keyset = Tuple[str, int]
+
+PageFetcher = Callable[..., List[Dict[str, Any]]]
+
+
+def encode_cursor(created_at: Union[datetime, str], row_id: int) -> str:
+    """Opaque, URL-safe cursor for the row after which the next page starts."""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, int(row_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Keyset:
+    """Inverse of `encode_cursor`. Raises ValueError for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Cursor for the following page, or None when this page was the last one."""
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last["created_at"], last["id"])
+
+
+def iter_keyset(fetch_page: PageFetcher, page_size: int = 500, **filters: Any) -> Iterator[Dict[str, Any]]:
+    """Walk a whole keyset-paginated listing page by page.
+
+    `fetch_page(limit=..., before=..., **filters)` must return rows ordered by
+    (created_at DESC, id DESC). Only one page is held in memory at a time,
+    so exporting the full table costs the same per row as reading page 1.
+    """
+    before: Optional[Keyset] = None
+    while True:
+        rows = fetch_page(limit=page_size, before=before, **filters)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+        created_at = last["created_at"]
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        before = (created_at, last["id"])
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import Any, Callable, Optional, Protocol, Tuple
+
+from .metrics import UPDATE_DUPLICATES
+
+logger = logging.getLogger("slhnet.updates")
+
+
+class SeenUpdateStore(Protocol):
+    """Shared backing store, so several workers/processes agree on what was seen."""
+
+    def mark(self, scope: str, update_id: int, ttl: float) -> bool:
+        """Record update_id; return True if it was new, False if already seen."""
+
+    def forget(self, scope: str, update_id: int) -> None:
+        ...
+
+
+class SqliteSeenStore:
+    """Seen update ids in a local SQLite (WAL) file shared by all workers on one host."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: Path, busy_timeout: float = 5.0):
+        self.path = Path(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._inserts = 0
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen_updates (
+                scope     TEXT    NOT NULL,
+                update_id INTEGER NOT NULL,
+                seen_at   REAL    NOT NULL,
+                PRIMARY KEY (scope, update_id)
+            );
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+        return conn
+
+    def mark(self, scope: str, update_id: int, ttl: float) -> bool:
+        conn = self._conn()
+        now = time.time()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO seen_updates (scope, update_id, seen_at) VALUES (?, ?, ?);",
+            (scope, update_id, now),
+        )
+        if cur.rowcount == 0:
+            # already there – but an expired row counts as new
+            cur = conn.execute(
+                "UPDATE seen_updates SET seen_at = ? WHERE scope = ? AND update_id = ? AND seen_at < ?;",
+                (now, scope, update_id, now - ttl),
+            )
+            return cur.rowcount > 0
+        self._inserts += 1
+        if self._inserts % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM seen_updates WHERE seen_at < ?;", (now - ttl,))
+        return True
+
+    def forget(self, scope: str, update_id: int) -> None:
+        self._conn().execute(
+            "DELETE FROM seen_updates WHERE scope = ? AND update_id = ?;", (scope, update_id)
+        )
+
+
+class PostgresSeenStore:
+    """Seen update ids in Postgres, for workers spread over several hosts.
+
+    `cursor` is a context manager factory yielding `(conn, cur)`, like
+    `db.db_cursor`, so the pooled connections of the caller are reused.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, cursor: Callable[[], AbstractContextManager[Tuple[Any, Any]]]):
+        self._cursor = cursor
+        self._inserts = 0
+
+    def mark(self, scope: str, update_id: int, ttl: float) -> bool:
+        with self._cursor() as (conn, cur):
+            if cur is None:
+                return True
+            cur.execute(
+                """
+                INSERT INTO telegram_seen_updates (scope, update_id, seen_at)
+                VALUES (%s, %s, NOW())
+                ON CONFLICT (scope, update_id) DO UPDATE
+                  SET seen_at = EXCLUDED.seen_at
+                  WHERE telegram_seen_updates.seen_at < NOW() - make_interval(secs => %s)
+                RETURNING update_id;
+                """,
+                (scope, update_id, ttl),
+            )
+            is_new = cur.fetchone() is not None
+            self._inserts += 1
+            if self._inserts % self.PURGE_EVERY == 0:
+                cur.execute(
+                    "DELETE FROM telegram_seen_updates WHERE seen_at < NOW() - make_interval(secs => %s);",
+                    (ttl,),
+                )
+            return is_new
+
+    def forget(self, scope: str, update_id: int) -> None:
+        with self._cursor() as (conn, cur):
+            if cur is None:
+                return
+            cur.execute(
+                "DELETE FROM telegram_seen_updates WHERE scope = %s AND update_id = %s;",
+                (scope, update_id),
+            )
+
+
+class UpdateDeduplicator:
+    """Drops Telegram updates whose update_id was already accepted.
+
+    An in-process LRU with TTL answers repeats without I/O; the optional
+    shared store catches redeliveries that reach a different worker.
+    If the shared store fails, the update is let through (fail open).
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        ttl: float = 86400.0,
+        max_entries: int = 100_000,
+        store: Optional[SeenUpdateStore] = None,
+    ):
+        self.scope = scope
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = store
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def _mark_local(self, update_id: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            expires = self._seen.get(update_id)
+            if expires is not None and expires > now:
+                self._seen.move_to_end(update_id)
+                return False
+            self._seen[update_id] = now + self.ttl
+            self._seen.move_to_end(update_id)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return True
+
+    def _count_duplicate(self, update_id: int) -> bool:
+        self.duplicates += 1
+        UPDATE_DUPLICATES.labels(scope=self.scope).inc()
+        logger.info("Dropping duplicate update %s", update_id)
+        return True
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        """Mark update_id as seen; True if it had been seen before."""
+        if not self._mark_local(update_id):
+            return self._count_duplicate(update_id)
+        if self.store is None:
+            return False
+        try:
+            is_new = await asyncio.to_thread(self.store.mark, self.scope, update_id, self.ttl)
+        except Exception as e:
+            logger.warning("Seen-update store unavailable: %s", e)
+            return False
+        if not is_new:
+            return self._count_duplicate(update_id)
+        return False
+
+    async def forget(self, update_id: int) -> None:
+        """Un-mark an update that was not processed, so a redelivery goes through."""
+        with self._lock:
+            self._seen.pop(update_id, None)
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.forget, self.scope, update_id)
+            except Exception as e:
+                logger.warning("Seen-update store unavailable: %s", e)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .metrics import (
+    UPDATE_QUEUE_DEPTH,
+    UPDATE_QUEUE_EVENTS,
+    UPDATE_PROCESSING_DURATION,
+)
+
+logger = logging.getLogger("slhnet.updates")
+
+UpdateProcessor = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def update_chat_key(data: Dict[str, Any]) -> int:
+    """Ordering key for a raw Telegram update: the chat id, else the sender id.
+
+    Updates that share a key always land on the same worker, so they are
+    handled in the order Telegram delivered them.
+    """
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        chat = (data.get(field) or {}).get("chat") or {}
+        if "id" in chat:
+            return int(chat["id"])
+    callback = data.get("callback_query") or {}
+    chat = (callback.get("message") or {}).get("chat") or {}
+    if "id" in chat:
+        return int(chat["id"])
+    for field in ("callback_query", "inline_query", "my_chat_member", "chat_member", "chat_join_request"):
+        sender = (data.get(field) or {}).get("from") or {}
+        if "id" in sender:
+            return int(sender["id"])
+    return int(data.get("update_id", 0))
+
+
+class UpdateDispatcher:
+    """Bounded pool of async workers that drains webhook updates.
+
+    The webhook route calls `enqueue()` and can answer Telegram right away.
+    Each worker owns one queue and updates are sharded to workers by chat,
+    which gives per-chat ordering without a global lock. When the target
+    queue is full `enqueue()` returns False and the route should reject the
+    update (Telegram will redeliver it later).
+    """
+
+    def __init__(self, process: UpdateProcessor, workers: int = 8, max_queue: int = 1000, name: str = "webhook"):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self._process = process
+        self.workers = workers
+        self.per_worker = max(1, max_queue // workers)
+        self.name = name
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._queues = [asyncio.Queue(maxsize=self.per_worker) for _ in range(self.workers)]
+        self._tasks = [
+            loop.create_task(self._worker(q), name=f"{self.name}-worker-{i}")
+            for i, q in enumerate(self._queues)
+        ]
+        logger.info("Update dispatcher %s started (%s workers, %s per queue)", self.name, self.workers, self.per_worker)
+
+    def enqueue(self, data: Dict[str, Any]) -> bool:
+        """Queue a raw update without waiting. False means backpressure (queue full)."""
+        if not self._tasks:
+            self.start()
+        queue = self._queues[update_chat_key(data) % self.workers]
+        try:
+            queue.put_nowait(data)
+        except asyncio.QueueFull:
+            UPDATE_QUEUE_EVENTS.labels(dispatcher=self.name, event="rejected").inc()
+            logger.warning("Update queue full, rejecting update %s", data.get("update_id"))
+            return False
+        UPDATE_QUEUE_EVENTS.labels(dispatcher=self.name, event="enqueued").inc()
+        UPDATE_QUEUE_DEPTH.labels(dispatcher=self.name).inc()
+        return True
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            data = await queue.get()
+            UPDATE_QUEUE_DEPTH.labels(dispatcher=self.name).dec()
+            try:
+                with UPDATE_PROCESSING_DURATION.labels(dispatcher=self.name).time():
+                    await self._process(data)
+                UPDATE_QUEUE_EVENTS.labels(dispatcher=self.name, event="processed").inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                UPDATE_QUEUE_EVENTS.labels(dispatcher=self.name, event="failed").inc()
+                logger.error("Error processing update %s: %s", data.get("update_id"), e)
+            finally:
+                queue.task_done()
+
+    async def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Drain queued updates (up to `timeout` seconds), then stop the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Update dispatcher %s stopped with %s updates still queued", self.name, self.depth())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        UPDATE_QUEUE_DEPTH.labels(dispatcher=self.name).set(0)
+        self._tasks = []
+        self._queues = []
@@ -1,22 +1,316 @@
 ﻿# db.py
 import os
+import time
 import logging
+import threading
 from contextlib import contextmanager
-from typing import Optional, Any, List, Dict
+from datetime import datetime
+from typing import Optional, Any, List, Dict, Tuple
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.sql
+
+from core.metrics import DB_POOL_CHECKOUTS, DB_POOL_CONNECTIONS, DB_POOL_WAIT
+from core.pagination import Keyset, iter_keyset
 
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# הגדרות ה-pool (ניתנות לשינוי דרך משתני סביבה)
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_CHECK_AFTER = float(os.environ.get("DB_POOL_CHECK_AFTER", "30"))
+
 if not DATABASE_URL:
     logger.warning("DATABASE_URL is not set. DB functions will be no-op.")
 
 
+# =========================
+# connection pool
+# =========================
+
+class PoolTimeout(RuntimeError):
+    """נזרק כשאין חיבור פנוי ב-pool בתוך DB_POOL_TIMEOUT שניות."""
+
+
+class ConnectionPool:
+    """
+    Pool חיבורים thread-safe מעל psycopg2.
+
+    - min_size / max_size – מספר חיבורים מינימלי שנשמר חם ומקסימלי פתוח.
+    - health check בזמן checkout לחיבור שלא היה בשימוש check_after שניות.
+    - חיבורים שעומדים idle יותר מ-max_idle שניות נסגרים (מעל ה-min).
+    - זמן ההמתנה לחיבור נמדד ב-Prometheus ובסטטיסטיקות של ה-pool.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_idle: float = 300.0,
+        check_after: float = 30.0,
+    ) -> None:
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("invalid pool size (min_size=%s, max_size=%s)" % (min_size, max_size))
+        self._dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = []  # (conn, last_used) – LIFO
+        self._size = 0  # חיבורים פתוחים (idle + בשימוש)
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "connects": 0,
+            "health_check_failures": 0,
+            "reaped": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+        for _ in range(min_size):
+            conn = self._connect()
+            with self._cond:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+        self._update_gauges()
+
+    # ---- פנימי ----
+
+    def _connect(self):
+        conn = psycopg2.connect(self._dsn, cursor_factory=psycopg2.extras.DictCursor)
+        with self._cond:
+            self._stats["connects"] += 1
+        return conn
+
+    def _update_gauges(self) -> None:
+        idle = len(self._idle)
+        DB_POOL_CONNECTIONS.labels(state="idle").set(idle)
+        DB_POOL_CONNECTIONS.labels(state="in_use").set(self._size - idle)
+
+    def _reap_locked(self, now: float) -> List[Any]:
+        """מוציא מה-pool חיבורים שעמדו idle יותר מדי. נקרא כשה-lock מוחזק."""
+        reaped = []
+        # הרשימה ממוינת מהישן לחדש, כך שהישנים בהתחלה
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            reaped.append(conn)
+        self._stats["reaped"] += len(reaped)
+        return reaped
+
+    @staticmethod
+    def _close_quietly(conns) -> None:
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ---- API ----
+
+    def getconn(self):
+        """מוציא חיבור מה-pool (או פותח חדש אם יש מקום)."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                to_close = self._reap_locked(time.monotonic())
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    DB_POOL_CHECKOUTS.labels(outcome="timeout").inc()
+                    raise PoolTimeout(
+                        "no free DB connection after %.1fs (max_size=%s)" % (self.timeout, self.max_size)
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - started
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += wait
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            if waited:
+                self._stats["waits"] += 1
+            self._update_gauges()
+
+        self._close_quietly(to_close)
+        DB_POOL_WAIT.observe(wait)
+        DB_POOL_CHECKOUTS.labels(outcome="waited" if waited else "immediate").inc()
+
+        if conn is not None and not self._is_healthy(conn, last_used):
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            logger.warning("Discarding unhealthy pooled DB connection")
+            self._close_quietly([conn])
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._update_gauges()
+                    self._cond.notify()
+                raise
+        return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """מחזיר חיבור ל-pool. חיבור שבור או באמצע טרנזקציה מטופל כאן."""
+        if not discard and not conn.closed:
+            try:
+                status = conn.info.transaction_status
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                to_close = [conn]
+            else:
+                self._idle.append((conn, time.monotonic()))
+                to_close = []
+            self._update_gauges()
+            self._cond.notify()
+        self._close_quietly(to_close)
+
+    @contextmanager
+    def connection(self):
+        """context manager: checkout + החזרה אוטומטית ל-pool."""
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.InterfaceError, psycopg2.OperationalError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def reap_idle(self) -> int:
+        """סוגר חיבורים שעמדו idle יותר מ-max_idle. מחזיר כמה נסגרו."""
+        with self._cond:
+            to_close = self._reap_locked(time.monotonic())
+            self._update_gauges()
+        self._close_quietly(to_close)
+        return len(to_close)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            to_close = [conn for conn, _ in self._idle]
+            self._size -= len(to_close)
+            self._idle = []
+            self._update_gauges()
+            self._cond.notify_all()
+        self._close_quietly(to_close)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            data = dict(self._stats)
+            data.update(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+        return data
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    """מחזיר את ה-pool המשותף (נוצר בעצלות), או None אם אין DATABASE_URL."""
+    global _pool, _pool_pid
+    if not DATABASE_URL:
+        return None
+    # אחרי fork (workers) אסור לשתף חיבורים עם תהליך האב
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                DATABASE_URL,
+                min_size=DB_POOL_MIN,
+                max_size=DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                max_idle=DB_POOL_MAX_IDLE,
+                check_after=DB_POOL_CHECK_AFTER,
+            )
+            _pool_pid = os.getpid()
+            logger.info("DB connection pool created (min=%s, max=%s)", DB_POOL_MIN, DB_POOL_MAX)
+    return _pool
+
+
+def close_pool() -> None:
+    """סוגר את כל החיבורים ב-pool (למשל ב-shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """סטטיסטיקות ה-pool לניטור (ריק אם אין DB)."""
+    pool = _pool
+    if pool is None or _pool_pid != os.getpid():
+        return {}
+    return pool.stats()
+
+
 def get_conn():
-    """מחזיר חיבור ל-Postgres או None אם אין DATABASE_URL"""
+    """
+    מחזיר חיבור ישיר (לא מה-pool) ל-Postgres או None אם אין DATABASE_URL.
+    מיועד לסקריפטים חד-פעמיים – הקורא אחראי לסגור את החיבור.
+    """
     if not DATABASE_URL:
         return None
     conn = psycopg2.connect(DATABASE_URL, cursor_factory=psycopg2.extras.DictCursor)
@@ -25,120 +319,48 @@ def get_conn():
 
 @contextmanager
 def db_cursor():
-    conn = get_conn()
-    if conn is None:
+    pool = get_pool()
+    if pool is None:
         yield None, None
         return
-    try:
+    with pool.connection() as conn:
         cur = conn.cursor()
-        yield conn, cur
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        cur.close()
-        conn.close()
+        try:
+            yield conn, cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+@contextmanager
+def db_transaction():
+    """
+    חיבור מה-pool בתוך טרנזקציה (commit ביציאה תקינה, rollback בשגיאה).
+    זורק RuntimeError אם DATABASE_URL לא מוגדר.
+    """
+    pool = get_pool()
+    if pool is None:
+        raise RuntimeError("DATABASE_URL not set")
+    with pool.connection() as conn:
+        with conn:
+            yield conn
 
 
 def init_schema() -> None:
     """
-    מריץ CREATE TABLE IF NOT EXISTS לכל הטבלאות.
-    לא מוחק ולא שובר כלום, רק מוסיף אם חסר.
+    מריץ את ה-migrations שעוד לא רצו (ראו migrate.py ותיקיית migrations/).
+    כל migration רץ פעם אחת בלבד; בהפעלות הבאות זו שאילתה אחת על schema_migrations.
     """
     if not DATABASE_URL:
         logger.warning("init_schema called but DATABASE_URL not set.")
         return
 
-    with db_cursor() as (conn, cur):
-        if cur is None:
-            logger.warning("No DB cursor available in init_schema.")
-            return
-
-        # payments – כבר קיימת אצלך, כאן רק לוודא
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS payments (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT NOT NULL,
-                username TEXT,
-                pay_method TEXT,
-                status TEXT NOT NULL DEFAULT 'pending',
-                reason TEXT,
-                amount NUMERIC(12,2),
-                reserve_ratio NUMERIC(5,4),
-                reserve_amount NUMERIC(12,2),
-                net_amount NUMERIC(12,2),
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-            """
-        )
-
-        # עדכון טבלה קיימת עם עמודות רזרבה, למקרה שהיא כבר קיימת בלי השדות החדשים
-        cur.execute(
-            """
-            ALTER TABLE payments
-                ADD COLUMN IF NOT EXISTS amount NUMERIC(12,2),
-                ADD COLUMN IF NOT EXISTS reserve_ratio NUMERIC(5,4),
-                ADD COLUMN IF NOT EXISTS reserve_amount NUMERIC(12,2),
-                ADD COLUMN IF NOT EXISTS net_amount NUMERIC(12,2);
-            """
-        )
+    from migrate import run_migrations
 
-        # users – רשימת משתמשים
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id BIGINT PRIMARY KEY,      -- Telegram user id
-                username TEXT,
-                first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-            """
-        )
-
-        # referrals – הפניות
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS referrals (
-                id SERIAL PRIMARY KEY,
-                referrer_id BIGINT NOT NULL,
-                referred_id BIGINT NOT NULL,
-                source TEXT,
-                points INT NOT NULL DEFAULT 1,
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-            """
-        )
-
-        # rewards – פרסים/נקודות (SLH, NFT, SHARE וכו')
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS rewards (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT NOT NULL,
-                reward_type TEXT NOT NULL,      -- "SLH", "NFT", "SHARE", ...
-                reason TEXT,
-                points INT NOT NULL DEFAULT 0,
-                status TEXT NOT NULL DEFAULT 'pending',   -- pending/sent/failed
-                tx_hash TEXT,
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-            """
-        )
-
-        # metrics – מונים גלובליים (למשל start_image_views)
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS metrics (
-                key TEXT PRIMARY KEY,
-                value BIGINT NOT NULL DEFAULT 0
-            );
-            """
-        )
-
-        logger.info("DB schema ensured (payments, users, referrals, rewards, metrics).")
+    run_migrations()
 
 
 # =========================
@@ -234,55 +456,100 @@ def store_user(user_id: int, username: Optional[str]) -> None:
         )
 
 
+LEADERBOARD_CACHE_TTL = float(os.environ.get("LEADERBOARD_CACHE_TTL", "30"))
+
+# cache בתהליך ל-top-K: (expires_at, k, rows) – נשמר ה-K הגדול ביותר שנשלף
+_top_referrers_cache: Optional[Tuple[float, int, List[Dict[str, Any]]]] = None
+_top_referrers_lock = threading.Lock()
+
+
+def _invalidate_top_referrers() -> None:
+    global _top_referrers_cache
+    with _top_referrers_lock:
+        _top_referrers_cache = None
+
+
 def add_referral(referrer_id: int, referred_id: int, source: str) -> None:
     """
-    מוסיף רשומת הפנייה.
+    מוסיף רשומת הפנייה ומעדכן את referrer_scores באותה טרנזקציה.
     """
     with db_cursor() as (conn, cur):
         if cur is None:
             return
         cur.execute(
             """
-            INSERT INTO referrals (referrer_id, referred_id, source, points)
-            VALUES (%s, %s, %s, 1)
-            ON CONFLICT DO NOTHING;
+            WITH inserted AS (
+                INSERT INTO referrals (referrer_id, referred_id, source, points)
+                VALUES (%s, %s, %s, 1)
+                ON CONFLICT DO NOTHING
+                RETURNING referrer_id, points
+            )
+            INSERT INTO referrer_scores (referrer_id, total_referrals, total_points, updated_at)
+            SELECT referrer_id, 1, points, NOW()
+            FROM inserted
+            ON CONFLICT (referrer_id) DO UPDATE
+              SET total_referrals = referrer_scores.total_referrals + EXCLUDED.total_referrals,
+                  total_points = referrer_scores.total_points + EXCLUDED.total_points,
+                  updated_at = NOW();
             """,
             (referrer_id, referred_id, source),
         )
+    _invalidate_top_referrers()
 
 
 def get_top_referrers(limit: int = 10) -> List[Dict[str, Any]]:
     """
     מחזיר את המפנים הטופ לפי סך נקודות / מספר הפניות.
+    קורא מ-referrer_scores (אינדקס, O(limit)) עם cache קצר בזיכרון.
     """
+    global _top_referrers_cache
+    now = time.monotonic()
+    cached = _top_referrers_cache
+    if cached is not None and cached[0] > now and cached[1] >= limit:
+        return [dict(row) for row in cached[2][:limit]]
+
     with db_cursor() as (conn, cur):
         if cur is None:
             return []
         cur.execute(
             """
-            SELECT r.referrer_id,
+            SELECT s.referrer_id,
                    u.username,
-                   COUNT(*) AS total_referrals,
-                   SUM(r.points) AS total_points
-            FROM referrals r
-            LEFT JOIN users u ON u.id = r.referrer_id
-            GROUP BY r.referrer_id, u.username
-            ORDER BY total_points DESC, total_referrals DESC
+                   s.total_referrals,
+                   s.total_points
+            FROM referrer_scores s
+            LEFT JOIN users u ON u.id = s.referrer_id
+            ORDER BY s.total_points DESC, s.total_referrals DESC
             LIMIT %s;
             """,
             (limit,),
         )
-        rows = cur.fetchall()
-        return [dict(row) for row in rows]
+        rows = [dict(row) for row in cur.fetchall()]
+
+    if LEADERBOARD_CACHE_TTL > 0:
+        with _top_referrers_lock:
+            current = _top_referrers_cache
+            # לא מחליפים cache תקף שמחזיק K גדול יותר
+            if current is None or current[0] <= now or current[1] <= limit:
+                _top_referrers_cache = (now + LEADERBOARD_CACHE_TTL, limit, rows)
+    return [dict(row) for row in rows]
 
 
 # =========================
 # דוחות על תשלומים
 # =========================
 
+def _month_start(year: int, month: int) -> datetime:
+    """תחילת חודש (month יכול לחרוג מ-12 – מתגלגל לשנה הבאה)."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+
 def get_monthly_payments(year: int, month: int) -> List[Dict[str, Any]]:
     """
     מחזיר פילוח לפי שיטת תשלום וסטטוס לחודש נתון.
+    טווח חצי-פתוח על created_at כדי שהשאילתה תשתמש באינדקס.
     """
     with db_cursor() as (conn, cur):
         if cur is None:
@@ -293,16 +560,45 @@ def get_monthly_payments(year: int, month: int) -> List[Dict[str, Any]]:
                    status,
                    COUNT(*) AS count
             FROM payments
-            WHERE EXTRACT(YEAR FROM created_at) = %s
-              AND EXTRACT(MONTH FROM created_at) = %s
+            WHERE created_at >= %s
+              AND created_at < %s
             GROUP BY pay_method, status
             ORDER BY pay_method, status;
             """,
-            (year, month),
+            (_month_start(year, month), _month_start(year, month + 1)),
         )
         rows = cur.fetchall()
         return [dict(row) for row in rows]
 
+
+def get_yearly_payments(year: int) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    פילוח חודשי לשנה שלמה בשאילתה אחת (במקום 12 קריאות ל-get_monthly_payments).
+    מחזיר {month: [rows]} לכל 12 החודשים (רשימה ריקה לחודש בלי תשלומים).
+    """
+    result: Dict[int, List[Dict[str, Any]]] = {m: [] for m in range(1, 13)}
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            return result
+        cur.execute(
+            """
+            SELECT EXTRACT(MONTH FROM date_trunc('month', created_at))::int AS month,
+                   pay_method,
+                   status,
+                   COUNT(*) AS count
+            FROM payments
+            WHERE created_at >= %s
+              AND created_at < %s
+            GROUP BY 1, pay_method, status
+            ORDER BY 1, pay_method, status;
+            """,
+            (_month_start(year, 1), _month_start(year + 1, 1)),
+        )
+        for row in cur.fetchall():
+            item = dict(row)
+            result[item.pop("month")].append(item)
+    return result
+
 def get_reserve_stats() -> Optional[Dict[str, Any]]:
     """מחזיר סטטיסטיקה כספית על תשלומים ורזרבות (49%)."""
     with db_cursor() as (conn, cur):
@@ -409,30 +705,181 @@ def get_user_total_points(user_id: int, reward_type: Optional[str] = None) -> in
 # metrics – מונים גלובליים
 # =========================
 
+# =========================
+# מונים גלובליים – buffer בכתיבה מאוחרת (write-behind)
+# =========================
+
+# כל כמה שניות ה-buffer נכתב ל-DB – זה גם חלון האובדן המקסימלי בקריסה.
+# 0 = כתיבה ישירה בכל increment (ההתנהגות הישנה).
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+# כמה מפתחות/הגדלות ממתינים לפני flush מוקדם
+METRICS_FLUSH_MAX_PENDING = int(os.environ.get("METRICS_FLUSH_MAX_PENDING", "500"))
+
+
+class MetricBuffer:
+    """
+    צובר הגדלות למונים בזיכרון וכותב אותן ב-upsert אחד מרוכז.
+
+    - flush כל interval שניות (thread רקע) או כשמצטברות max_pending הגדלות.
+    - flush() ב-shutdown; אם ה-flush נכשל ההגדלות חוזרות ל-buffer.
+    - read-through: הערך המוחזר = הערך האחרון הידוע מה-DB + מה שממתין
+      + ה-batch שנכתב כרגע (עד ש-_known מתעדכן), כך שאין ספירה חסרה בזמן flush.
+    """
+
+    def __init__(self, interval: float = 5.0, max_pending: int = 500) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, int] = {}
+        self._pending_count = 0
+        # ה-batch שה-flush כותב כרגע – נספר עד שהערכים החדשים נכנסים ל-_known
+        self._inflight: Dict[str, int] = {}
+        self._known: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_thread(self) -> None:
+        # אחרי fork ה-thread של האב לא קיים בתהליך הבן
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="metrics-flush", daemon=True
+                )
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Metrics flush failed: %s", e)
+
+    def _load(self, key: str) -> int:
+        with db_cursor() as (conn, cur):
+            if cur is None:
+                return 0
+            cur.execute("SELECT value FROM metrics WHERE key = %s;", (key,))
+            row = cur.fetchone()
+            return int(row["value"]) if row else 0
+
+    def add(self, key: str, amount: int = 1) -> int:
+        """מוסיף ל-buffer ומחזיר את הערך החדש (כולל מה שעוד לא נכתב)."""
+        if key not in self._known:
+            base = self._load(key)
+            with self._lock:
+                self._known.setdefault(key, base)
+        self._ensure_thread()
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._pending_count += 1
+            value = self._known[key] + self._inflight.get(key, 0) + self._pending[key]
+            if self._pending_count >= self.max_pending:
+                self._wakeup.set()
+        return value
+
+    def pending(self, key: str) -> int:
+        """הגדלות שעוד לא נכתבו ל-DB (כולל ה-batch שנכתב כרגע)."""
+        with self._lock:
+            return self._pending.get(key, 0) + self._inflight.get(key, 0)
+
+    def flush(self) -> int:
+        """כותב את כל ההגדלות הממתינות ב-upsert אחד. מחזיר כמה מפתחות נכתבו."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._pending_count = 0
+                self._inflight = batch
+            if not batch:
+                return 0
+            try:
+                with db_cursor() as (conn, cur):
+                    if cur is None:
+                        with self._lock:
+                            self._inflight = {}
+                        return 0
+                    rows = psycopg2.extras.execute_values(
+                        cur,
+                        """
+                        INSERT INTO metrics (key, value)
+                        VALUES %s
+                        ON CONFLICT (key)
+                        DO UPDATE SET value = metrics.value + EXCLUDED.value
+                        RETURNING key, value;
+                        """,
+                        sorted(batch.items()),
+                        fetch=True,
+                    )
+            except Exception:
+                # מחזירים את ההגדלות ל-buffer כדי לנסות שוב ב-flush הבא
+                with self._lock:
+                    for key, amount in batch.items():
+                        self._pending[key] = self._pending.get(key, 0) + amount
+                        self._pending_count += 1
+                    self._inflight = {}
+                raise
+            with self._lock:
+                for row in rows:
+                    self._known[row["key"]] = int(row["value"])
+                self._inflight = {}
+            return len(batch)
+
+    def stop(self) -> None:
+        """עוצר את ה-thread וכותב את מה שנשאר (נקרא ב-shutdown)."""
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout=max(self.interval, 1.0) + 5.0)
+        self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            # לא מפילים את ה-shutdown (close_pool עוד צריך לרוץ)
+            logger.error("Final metrics flush failed, %s counters lost: %s", len(self._pending), e)
+
+
+_metric_buffer = MetricBuffer(
+    interval=METRICS_FLUSH_INTERVAL,
+    max_pending=METRICS_FLUSH_MAX_PENDING,
+)
+
+
 def increment_metric(key: str, amount: int = 1) -> int:
     """
     מעלה מונה גלובלי ומחזיר את הערך החדש.
+    ההגדלה נצברת ב-buffer ונכתבת ל-DB תוך METRICS_FLUSH_INTERVAL שניות.
     """
-    with db_cursor() as (conn, cur):
-        if cur is None:
-            return 0
-        cur.execute(
-            """
-            INSERT INTO metrics (key, value)
-            VALUES (%s, %s)
-            ON CONFLICT (key)
-            DO UPDATE SET value = metrics.value + EXCLUDED.value
-            RETURNING value;
-            """,
-            (key, amount),
-        )
-        row = cur.fetchone()
-        return int(row["value"]) if row else 0
+    if not DATABASE_URL:
+        return 0
+    if METRICS_FLUSH_INTERVAL <= 0:
+        with db_cursor() as (conn, cur):
+            cur.execute(
+                """
+                INSERT INTO metrics (key, value)
+                VALUES (%s, %s)
+                ON CONFLICT (key)
+                DO UPDATE SET value = metrics.value + EXCLUDED.value
+                RETURNING value;
+                """,
+                (key, amount),
+            )
+            row = cur.fetchone()
+            return int(row["value"]) if row else 0
+    return _metric_buffer.add(key, amount)
 
 
 def get_metric(key: str) -> int:
     """
-    מחזיר את ערך המונה או 0 אם לא קיים.
+    מחזיר את ערך המונה או 0 אם לא קיים (כולל הגדלות שעוד ב-buffer).
     """
     with db_cursor() as (conn, cur):
         if cur is None:
@@ -442,10 +889,22 @@ def get_metric(key: str) -> int:
             (key,),
         )
         row = cur.fetchone()
-        return int(row["value"]) if row else 0
+        value = int(row["value"]) if row else 0
+    return value + _metric_buffer.pending(key)
+
+
+def flush_metrics() -> int:
+    """כותב מיד את כל המונים שב-buffer. מחזיר כמה מפתחות נכתבו."""
+    return _metric_buffer.flush()
+
+
+def stop_metric_buffer() -> None:
+    """עוצר את ה-flush ברקע וכותב את השארית (ב-shutdown, לפני close_pool)."""
+    _metric_buffer.stop()
+
 
 def get_users_stats() -> Dict[str, int]:
-    """Aggregate basic user/referral stats for admin dashboard."""
+    """Aggregate basic user/referral stats for admin dashboard (one round-trip)."""
     with db_cursor() as (conn, cur):
         if cur is None:
             return {
@@ -455,109 +914,135 @@ def get_users_stats() -> Dict[str, int]:
                 "total_referrers": 0,
             }
 
-        # Total registered users
-        cur.execute("SELECT COUNT(*) FROM users;")
-        total_users = cur.fetchone()[0] or 0
+        # users counted once, referrals scanned once for all three figures
+        cur.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM users)   AS total_users,
+                COUNT(*)                       AS total_referrals,
+                COUNT(DISTINCT referred_id)    AS total_referred_users,
+                COUNT(DISTINCT referrer_id)    AS total_referrers
+            FROM referrals;
+            """
+        )
+        row = cur.fetchone()
 
-        # Total referral rows
-        cur.execute("SELECT COUNT(*) FROM referrals;")
-        total_referrals = cur.fetchone()[0] or 0
+        return {
+            "total_users": int(row["total_users"] or 0),
+            "total_referrals": int(row["total_referrals"] or 0),
+            "total_referred_users": int(row["total_referred_users"] or 0),
+            "total_referrers": int(row["total_referrers"] or 0),
+        }
 
-        # Distinct referred users (joined through any referral link)
-        cur.execute("SELECT COUNT(DISTINCT referred_id) FROM referrals;")
-        total_referred_users = cur.fetchone()[0] or 0
 
-        # Distinct referrers (users who brought at least one friend)
-        cur.execute("SELECT COUNT(DISTINCT referrer_id) FROM referrals;")
-        total_referrers = cur.fetchone()[0] or 0
+# =========================
+# snapshot משולב – כספים + משתמשים (לדשבורד / finance / risk)
+# =========================
 
-        return {
-            "total_users": int(total_users),
-            "total_referrals": int(total_referrals),
-            "total_referred_users": int(total_referred_users),
-            "total_referrers": int(total_referrers),
-        }
-# === SLHNET EXTENSION: wallets, token_sales, posts ===
-import logging
-from typing import List, Dict, Any, Optional
+STATS_SNAPSHOT_TTL = float(os.environ.get("STATS_SNAPSHOT_TTL", "15"))
 
-logger = logging.getLogger("db_slhnet_ext")
+# (fetched_at, data) – fetched_at לפי time.monotonic()
+_stats_snapshot: Optional[Tuple[float, Dict[str, Any]]] = None
+_stats_snapshot_lock = threading.Lock()
 
-def _slhnet_get_conn():
-    import os
-    import psycopg2
-    url = os.environ.get("DATABASE_URL")
-    if not url:
-        raise RuntimeError("DATABASE_URL not set")
-    return psycopg2.connect(url)
 
-try:
-    get_conn  # type: ignore[name-defined]
-except NameError:  # pragma: no cover
-    get_conn = _slhnet_get_conn  # type: ignore[assignment]
+def get_finance_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    מחשב בשאילתה אחת את כל נתוני הכספים (reserve + approvals) ונתוני המשתמשים:
+    סריקה אחת של payments, סריקה אחת של referrals וספירה אחת של users.
+    """
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            return None
+        cur.execute(
+            """
+            SELECT p.*, r.*, (SELECT COUNT(*) FROM users) AS total_users
+            FROM (
+                SELECT
+                    COALESCE(SUM(amount), 0)           AS total_amount,
+                    COALESCE(SUM(reserve_amount), 0)   AS total_reserve,
+                    COALESCE(SUM(net_amount), 0)       AS total_net,
+                    COUNT(*)                           AS total_payments,
+                    COUNT(*) FILTER (WHERE status = 'approved') AS approved_count,
+                    COUNT(*) FILTER (WHERE status = 'pending')  AS pending_count,
+                    COUNT(*) FILTER (WHERE status = 'rejected') AS rejected_count
+                FROM payments
+            ) p
+            CROSS JOIN (
+                SELECT
+                    COUNT(*)                    AS total_referrals,
+                    COUNT(DISTINCT referred_id) AS total_referred_users,
+                    COUNT(DISTINCT referrer_id) AS total_referrers
+                FROM referrals
+            ) r;
+            """
+        )
+        row = dict(cur.fetchone())
+
+    reserve = {
+        key: row[key]
+        for key in (
+            "total_amount",
+            "total_reserve",
+            "total_net",
+            "total_payments",
+            "approved_count",
+            "pending_count",
+            "rejected_count",
+        )
+    }
+    approvals = {
+        "pending": row["pending_count"],
+        "approved": row["approved_count"],
+        "rejected": row["rejected_count"],
+        "total": row["total_payments"],
+    }
+    users = {
+        key: int(row[key] or 0)
+        for key in ("total_users", "total_referrals", "total_referred_users", "total_referrers")
+    }
+    return {"reserve": reserve, "approvals": approvals, "users": users}
+
+
+def get_stats_snapshot() -> Dict[str, Any]:
+    """
+    snapshot משותף עם TTL קצר (STATS_SNAPSHOT_TTL).
+    מחזיר reserve / approvals / users (None אם אין DB) + cache_age_seconds.
+    רק thread אחד מרענן בכל פעם; השאר מחכים ומקבלים את אותה תוצאה.
+    """
+    global _stats_snapshot
+    cached = _stats_snapshot
+    now = time.monotonic()
+    if cached is None or now - cached[0] >= STATS_SNAPSHOT_TTL:
+        with _stats_snapshot_lock:
+            cached = _stats_snapshot
+            now = time.monotonic()
+            if cached is None or now - cached[0] >= STATS_SNAPSHOT_TTL:
+                data = get_finance_snapshot() or {"reserve": None, "approvals": None, "users": None}
+                cached = (time.monotonic(), data)
+                _stats_snapshot = cached
+                now = cached[0]
+
+    snapshot = dict(cached[1])
+    snapshot["cache_age_seconds"] = round(now - cached[0], 3)
+    return snapshot
 
 
-def _init_schema_slhnet():
-    conn = get_conn()
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS wallets (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT NOT NULL,
-                    telegram_username TEXT,
-                    chain_id INTEGER NOT NULL,
-                    address TEXT NOT NULL,
-                    is_primary BOOLEAN NOT NULL DEFAULT TRUE,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    UNIQUE (chain_id, address)
-                );
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS token_sales (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT NOT NULL,
-                    wallet_address TEXT NOT NULL,
-                    chain_id INTEGER NOT NULL,
-                    amount_slh NUMERIC(36, 18) NOT NULL,
-                    tx_hash TEXT NOT NULL,
-                    tx_status TEXT NOT NULL DEFAULT 'verified',
-                    tx_error TEXT,
-                    block_number BIGINT,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS posts (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT NOT NULL,
-                    username TEXT,
-                    title TEXT,
-                    content TEXT,
-                    image_url TEXT,
-                    link_url TEXT,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    status TEXT NOT NULL DEFAULT 'published'
-                );
-                """
-            )
-    logger.info("SLHNET extra tables ensured (wallets, token_sales, posts)")
+# === SLHNET EXTENSION: wallets, token_sales, posts ===
+import logging
+from typing import List, Dict, Any, Optional
 
+logger = logging.getLogger("db_slhnet_ext")
 
-try:
-    _orig_init_schema = init_schema  # type: ignore[name-defined]
-    def init_schema():  # type: ignore[no-redef]
-        _orig_init_schema()
-        _init_schema_slhnet()
-except NameError:
-    def init_schema():  # type: ignore[no-redef]
-        _init_schema_slhnet()
 
+def _keyset_clause(before: Optional[Keyset]) -> Tuple[str, tuple]:
+    """
+    תנאי keyset לדף הבא ברשימה ממוינת (created_at DESC, id DESC).
+    before = (created_at, id) של השורה האחרונה בדף הקודם; None = דף ראשון.
+    """
+    if before is None:
+        return "TRUE", ()
+    return "(created_at, id) < (%s::timestamptz, %s)", (before[0], before[1])
 
 def add_wallet(
     user_id: int,
@@ -566,8 +1051,7 @@ def add_wallet(
     address: str,
     is_primary: bool = True,
 ) -> None:
-    conn = get_conn()
-    with conn:
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             if is_primary:
                 cur.execute(
@@ -587,8 +1071,7 @@ def add_wallet(
 
 
 def get_user_wallets(user_id: int, chain_id: Optional[int] = None) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    with conn:
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             if chain_id is None:
                 cur.execute(
@@ -641,36 +1124,121 @@ def create_token_sale(
     error: Optional[str],
     block_number: Optional[int],
 ) -> int:
-    conn = get_conn()
-    with conn:
+    sale_id, _ = create_token_sales(
+        [(user_id, wallet_address, chain_id, amount_slh, tx_hash, status, error, block_number)]
+    )[0]
+    return sale_id
+
+
+def create_token_sales(
+    sales: List[Tuple[int, str, int, float, str, str, Optional[str], Optional[int]]],
+) -> List[Tuple[int, bool]]:
+    """
+    כמו create_token_sale, לכמה מכירות יחד: upsert אחד בטרנזקציה אחת.
+    כל פריט: (user_id, wallet_address, chain_id, amount_slh, tx_hash, status, error, block_number).
+
+    יש שורה אחת לכל tx_hash (UNIQUE): עסקה שכבר קיימת מתעדכנת במקום להוסיף
+    מכירה חדשה, ושורה שכבר 'verified' לא נדרסת (לא יורדת לסטטוס אחר ולא
+    עוברת למשתמש אחר). מחזיר לכל פריט, לפי סדר הקלט, (sale_id, already_verified)
+    – already_verified=True אם העסקה כבר הייתה מאומתת לפני הפריט הזה.
+
+    הדגל נגזר מה-upsert עצמו: שורה שה-WHERE חסם (כבר 'verified', גם אם אומתה
+    בטרנזקציה מקבילה רגע לפני) לא חוזרת ב-RETURNING. כשאותו tx_hash מופיע
+    כמה פעמים בקלט (משתמשים שונים), נשמר הראשון שאומת – או הראשון, אם אף
+    אחד לא אומת – והשאר נחשבים כפולים שלו.
+    """
+    if not sales:
+        return []
+    # ON CONFLICT DO UPDATE לא יכול לגעת באותה שורה פעמיים באותה פקודה
+    unique: Dict[str, Tuple] = {}
+    for sale in sales:
+        kept = unique.get(sale[4])
+        if kept is None or (kept[5] != "verified" and sale[5] == "verified"):
+            unique[sale[4]] = sale
+    with db_transaction() as conn:
         with conn.cursor() as cur:
-            cur.execute(
+            rows = psycopg2.extras.execute_values(
+                cur,
                 """
                 INSERT INTO token_sales (
                     user_id, wallet_address, chain_id, amount_slh, tx_hash, tx_status, tx_error, block_number
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
+                VALUES %s
+                ON CONFLICT (tx_hash) DO UPDATE SET
+                    user_id = EXCLUDED.user_id,
+                    wallet_address = EXCLUDED.wallet_address,
+                    chain_id = EXCLUDED.chain_id,
+                    amount_slh = EXCLUDED.amount_slh,
+                    tx_status = EXCLUDED.tx_status,
+                    tx_error = EXCLUDED.tx_error,
+                    block_number = EXCLUDED.block_number
+                WHERE token_sales.tx_status <> 'verified'
+                RETURNING tx_hash, id
                 """,
-                (user_id, wallet_address, chain_id, amount_slh, tx_hash, status, error, block_number),
+                list(unique.values()),
+                fetch=True,
             )
-            sale_id = cur.fetchone()[0]
-    return sale_id
+            ids = {r[0]: r[1] for r in rows}
+            # שורות מאומתות לא עודכנו ולכן לא חזרו ב-RETURNING
+            missing = [h for h in unique if h not in ids]
+            if missing:
+                cur.execute(
+                    "SELECT tx_hash, id FROM token_sales WHERE tx_hash = ANY(%s);",
+                    (missing,),
+                )
+                ids.update({r[0]: r[1] for r in cur.fetchall()})
+    already_verified = set(missing)
+    result: List[Tuple[int, bool]] = []
+    for sale in sales:
+        kept = unique[sale[4]]
+        # כפילות של עסקה שנשמרה כמאומתת בקריאה הזו לא מזוכה שוב
+        duplicate = sale is not kept and kept[5] == "verified"
+        result.append((ids[sale[4]], sale[4] in already_verified or duplicate))
+    return result
+
+
+def get_tx_receipt(tx_hash: str) -> Optional[Dict[str, Any]]:
+    """receipt סופי שנשמר ב-tx_receipts, או None אם לא נשמר (או אין DB)."""
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            return None
+        cur.execute(
+            "SELECT tx_hash, block_number, status, transfers FROM tx_receipts WHERE tx_hash = %s;",
+            (tx_hash.lower(),),
+        )
+        row = cur.fetchone()
+        return dict(row) if row else None
 
 
-def list_token_sales(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    with conn:
+def store_tx_receipt(tx_hash: str, block_number: int, status: int, transfers: List[Dict[str, Any]]) -> None:
+    """שומר receipt סופי (אחרי עומק האישורים). receipt קיים לא נדרס."""
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            return
+        cur.execute(
+            """
+            INSERT INTO tx_receipts (tx_hash, block_number, status, transfers)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (tx_hash) DO NOTHING;
+            """,
+            (tx_hash.lower(), block_number, status, psycopg2.extras.Json(transfers)),
+        )
+
+
+def list_token_sales(limit: int = 50, before: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    keyset, params = _keyset_clause(before)
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
+                f"""
                 SELECT id, user_id, wallet_address, chain_id, amount_slh,
                        tx_hash, tx_status, tx_error, block_number, created_at
                 FROM token_sales
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
+                WHERE {keyset}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
                 """,
-                (limit, offset),
+                (*params, limit),
             )
             rows = cur.fetchall()
     return [
@@ -691,8 +1259,7 @@ def list_token_sales(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
 
 
 def get_user_token_sales(user_id: int) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    with conn:
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -729,8 +1296,7 @@ def create_post(
     image_url: Optional[str] = None,
     link_url: Optional[str] = None,
 ) -> int:
-    conn = get_conn()
-    with conn:
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -744,19 +1310,19 @@ def create_post(
     return pid
 
 
-def list_recent_posts(limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    with conn:
+def list_recent_posts(limit: int = 20, before: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    keyset, params = _keyset_clause(before)
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
+                f"""
                 SELECT id, user_id, username, title, content, image_url, link_url, created_at, status
                 FROM posts
-                WHERE status = 'published'
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
+                WHERE status = 'published' AND {keyset}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
                 """,
-                (limit, offset),
+                (*params, limit),
             )
             rows = cur.fetchall()
     return [
@@ -773,71 +1339,26 @@ def list_recent_posts(limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
         }
         for r in rows
     ]
-try:
-    _init_schema_slhnet()
-except Exception as e:
-    try:
-        logger.error("SLHNET: failed to ensure extra tables: %s", e)
-    except Exception:
-        pass
 
 # ================================
 # SLHNET extra tables & helpers
 from typing import List, Dict, Any, Optional
 
-def ensure_extra_tables(conn):
-    """Create SLHNET extra tables if they don't exist"""
-    with conn.cursor() as cur:
-        # פוסטים מהרשת החברתית
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS slh_posts (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT,
-                username TEXT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                share_url TEXT,
-                created_at TIMESTAMPTZ DEFAULT NOW(),
-                is_published BOOLEAN DEFAULT TRUE
-            );
-            """
-        )
-        # מכירות SLH שתועדו דרך המערכת
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS slh_token_sales (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT,
-                username TEXT,
-                wallet_address TEXT,
-                amount_slh NUMERIC(36, 18),
-                price_nis NUMERIC(18, 2),
-                status TEXT DEFAULT 'pending',
-                tx_hash TEXT,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            );
-            """
-        )
-    conn.commit()
-
-
-def fetch_posts(limit: int = 20) -> List[Dict[str, Any]]:
-    """Get recent published posts for SLHNET Social"""
-    conn = get_conn()
-    ensure_extra_tables(conn)
-    with conn:
+def fetch_posts(limit: int = 20, before: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    """Get recent published posts for SLHNET Social (keyset page after `before`)"""
+    keyset, params = _keyset_clause(before)
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
+                f"""
                 SELECT id, user_id, username, title, content, share_url,
                        created_at, is_published
                 FROM slh_posts
-                WHERE is_published = TRUE
-                ORDER BY created_at DESC
+                WHERE is_published = TRUE AND {keyset}
+                ORDER BY created_at DESC, id DESC
                 LIMIT %s;
                 """,
-                (limit,)
+                (*params, limit),
             )
             rows = cur.fetchall()
     posts: List[Dict[str, Any]] = []
@@ -860,9 +1381,7 @@ def fetch_posts(limit: int = 20) -> List[Dict[str, Any]]:
 def add_post(user_id: int, username: str, title: str, content: str,
              share_url: Optional[str] = None) -> int:
     """Insert a new social post and return its id"""
-    conn = get_conn()
-    ensure_extra_tables(conn)
-    with conn:
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -876,21 +1395,21 @@ def add_post(user_id: int, username: str, title: str, content: str,
     return post_id
 
 
-def fetch_token_sales(limit: int = 50) -> List[Dict[str, Any]]:
-    """Get recent SLH token sales for the public board"""
-    conn = get_conn()
-    ensure_extra_tables(conn)
-    with conn:
+def fetch_token_sales(limit: int = 50, before: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    """Get recent SLH token sales for the public board (keyset page after `before`)"""
+    keyset, params = _keyset_clause(before)
+    with db_transaction() as conn:
         with conn.cursor() as cur:
             cur.execute(
-                """
+                f"""
                 SELECT id, user_id, username, wallet_address,
                        amount_slh, price_nis, status, tx_hash, created_at
                 FROM slh_token_sales
-                ORDER BY created_at DESC
+                WHERE {keyset}
+                ORDER BY created_at DESC, id DESC
                 LIMIT %s;
                 """,
-                (limit,),
+                (*params, limit),
             )
             rows = cur.fetchall()
     sales: List[Dict[str, Any]] = []
@@ -908,4 +1427,87 @@ def fetch_token_sales(limit: int = 50) -> List[Dict[str, Any]]:
                 "created_at": r[8].isoformat() if r[8] else None,
             }
         )
-    return sales
\ No newline at end of file
+    return sales
+
+
+# ================================
+# ייצוא מלא – מעבר על כל הרשימה בדפי keyset (דף אחד בזיכרון בכל רגע)
+
+def iter_posts(page_size: int = 500):
+    return iter_keyset(fetch_posts, page_size)
+
+
+def iter_slh_token_sales(page_size: int = 500):
+    return iter_keyset(fetch_token_sales, page_size)
+
+
+# ================================
+# ייצוא אדמין – server-side (named) cursor, זיכרון קבוע בלי קשר לגודל הטבלה
+
+# טבלאות שמותר לייצא ועמודות הייצוא שלהן (כולן עם created_at לסינון תאריכים)
+EXPORT_TABLES: Dict[str, Tuple[str, ...]] = {
+    "payments": (
+        "id", "user_id", "username", "pay_method", "status", "reason",
+        "amount", "reserve_ratio", "reserve_amount", "net_amount",
+        "created_at", "updated_at",
+    ),
+    "token_sales": (
+        "id", "user_id", "wallet_address", "chain_id", "amount_slh",
+        "tx_hash", "tx_status", "tx_error", "block_number", "created_at",
+    ),
+    "slh_token_sales": (
+        "id", "user_id", "username", "wallet_address", "amount_slh",
+        "price_nis", "status", "tx_hash", "created_at",
+    ),
+    "referrals": (
+        "id", "referrer_id", "referred_id", "source", "points", "created_at",
+    ),
+}
+
+EXPORT_FETCH_SIZE = int(os.environ.get("EXPORT_FETCH_SIZE", "2000"))
+
+
+def iter_export_rows(
+    table: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fetch_size: int = EXPORT_FETCH_SIZE,
+):
+    """
+    מחזיר generator של tuples (לפי EXPORT_TABLES[table]) בטווח [since, until),
+    ממוין לפי (created_at, id).
+    השורות נמשכות מה-DB ב-named cursor במנות של fetch_size, כך שרק מנה אחת
+    בזיכרון. החיבור מוחזק מה-pool עד שה-generator נגמר או נסגר.
+    """
+    columns = EXPORT_TABLES.get(table)
+    if columns is None:
+        raise ValueError(f"table {table!r} is not exportable")
+    pool = get_pool()
+    if pool is None:
+        raise RuntimeError("DATABASE_URL not set")
+
+    query = psycopg2.sql.SQL(
+        "SELECT {columns} FROM {table} "
+        "WHERE (%(since)s::timestamptz IS NULL OR created_at >= %(since)s) "
+        "AND (%(until)s::timestamptz IS NULL OR created_at < %(until)s) "
+        "ORDER BY created_at, id"
+    ).format(
+        columns=psycopg2.sql.SQL(", ").join(map(psycopg2.sql.Identifier, columns)),
+        table=psycopg2.sql.Identifier(table),
+    )
+
+    with pool.connection() as conn:
+        try:
+            with conn.cursor(
+                name=f"export_{table}", cursor_factory=psycopg2.extensions.cursor
+            ) as cur:
+                cur.itersize = fetch_size
+                cur.execute(query, {"since": since, "until": until})
+                while True:
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    yield from rows
+        finally:
+            # קריאה בלבד – סוגרים את הטרנזקציה של ה-cursor
+            conn.rollback()
@@ -0,0 +1,113 @@
+# db_async.py
+"""
+גרסה אסינכרונית ל-API של db.py.
+
+כל פונקציה כאן היא coroutine עם אותה חתימה כמו ב-db.py. השאילתה עצמה רצה
+ב-thread pool ייעודי (בגודל DB_POOL_MAX, כך שכל thread מקבל חיבור מה-pool
+בלי להמתין), וה-event loop של FastAPI / PTB ממשיך לטפל בעדכונים אחרים.
+
+קוד סינכרוני (סקריפטים, migrations) ממשיך לקרוא ל-db.py ישירות;
+לכל wrapper יש גם `.sync` שמצביע לפונקציה הסינכרונית המקורית.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import db
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, db.DB_POOL_MAX),
+                    thread_name_prefix="db",
+                )
+    return _executor
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """מריץ פונקציה סינכרונית של DB ב-thread pool ומחכה לתוצאה בלי לחסום את ה-loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def _to_async(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_db(func, *args, **kwargs)
+
+    wrapper.sync = func  # type: ignore[attr-defined]
+    return wrapper
+
+
+def shutdown() -> None:
+    """עוצר את ה-thread pool (נקרא ב-shutdown של האפליקציה)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+# =========================
+# payments
+# =========================
+log_payment = _to_async(db.log_payment)
+update_payment_status = _to_async(db.update_payment_status)
+get_monthly_payments = _to_async(db.get_monthly_payments)
+get_yearly_payments = _to_async(db.get_yearly_payments)
+get_reserve_stats = _to_async(db.get_reserve_stats)
+get_approval_stats = _to_async(db.get_approval_stats)
+
+# =========================
+# users / referrals
+# =========================
+store_user = _to_async(db.store_user)
+add_referral = _to_async(db.add_referral)
+get_top_referrers = _to_async(db.get_top_referrers)
+get_users_stats = _to_async(db.get_users_stats)
+
+# =========================
+# snapshot משולב (finance / risk / dashboard)
+# =========================
+get_finance_snapshot = _to_async(db.get_finance_snapshot)
+get_stats_snapshot = _to_async(db.get_stats_snapshot)
+
+# =========================
+# rewards / metrics
+# =========================
+create_reward = _to_async(db.create_reward)
+get_user_total_points = _to_async(db.get_user_total_points)
+increment_metric = _to_async(db.increment_metric)
+get_metric = _to_async(db.get_metric)
+flush_metrics = _to_async(db.flush_metrics)
+
+# =========================
+# SLHNET: wallets, token_sales, posts
+# =========================
+add_wallet = _to_async(db.add_wallet)
+get_user_wallets = _to_async(db.get_user_wallets)
+get_primary_wallet = _to_async(db.get_primary_wallet)
+create_token_sale = _to_async(db.create_token_sale)
+create_token_sales = _to_async(db.create_token_sales)
+get_tx_receipt = _to_async(db.get_tx_receipt)
+store_tx_receipt = _to_async(db.store_tx_receipt)
+list_token_sales = _to_async(db.list_token_sales)
+get_user_token_sales = _to_async(db.get_user_token_sales)
+create_post = _to_async(db.create_post)
+list_recent_posts = _to_async(db.list_recent_posts)
+fetch_posts = _to_async(db.fetch_posts)
+add_post = _to_async(db.add_post)
+fetch_token_sales = _to_async(db.fetch_token_sales)
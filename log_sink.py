@@ -0,0 +1,150 @@
+# log_sink.py
+"""
+Sink אסינכרוני להודעות לוג לקבוצת הניהול בטלגרם.
+
+send_log_message רק מכניס שורה לתור ומחזיר מיד – ה-handler לא מחכה ל-round-trip
+לטלגרם. worker ברקע מאחד כמה שורות להודעה אחת (עד 4096 תווים), שומר על
+מרווח מינימלי בין הודעות לאותו צ'אט ומכבד RetryAfter.
+התור חסום בגודלו: כשהוא מלא שורות חדשות נזרקות ונספרות.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from telegram.error import RetryAfter
+
+from core.metrics import ADMIN_LOG_BATCHES, ADMIN_LOG_LINES, ADMIN_LOG_QUEUE_DEPTH
+
+logger = logging.getLogger("slhnet.log_sink")
+
+TELEGRAM_MAX_CHARS = 4096
+SEPARATOR = "\n\n"
+
+
+class AdminLogSink:
+    """תור חסום + worker יחיד שמאחד שורות לוג להודעות טלגרם."""
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[object]],
+        max_queue: int = 1000,
+        max_chars: int = TELEGRAM_MAX_CHARS,
+        min_interval: float = 3.0,
+        linger: float = 0.5,
+    ) -> None:
+        self._send = send
+        self.max_queue = max_queue
+        self.max_chars = max_chars
+        self.min_interval = min_interval
+        self.linger = linger
+
+        self._buffer: Deque[str] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_sent = 0.0
+        self.stats: Dict[str, int] = {"queued": 0, "dropped": 0, "sent": 0, "failed": 0, "batches": 0}
+
+    def _count(self, outcome: str, n: int = 1) -> None:
+        self.stats[outcome] += n
+        ADMIN_LOG_LINES.labels(outcome=outcome).inc(n)
+
+    def submit(self, text: str) -> bool:
+        """מכניס שורה לתור בלי לחכות. מחזיר False אם השורה נזרקה."""
+        if len(self._buffer) >= self.max_queue:
+            self._count("dropped")
+            return False
+        if len(text) > self.max_chars:
+            text = text[: self.max_chars - 1] + "…"
+        self._buffer.append(text)
+        self._count("queued")
+        ADMIN_LOG_QUEUE_DEPTH.set(len(self._buffer))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        """מפעיל את ה-worker על ה-event loop הנוכחי (פעם אחת)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        if self._buffer:
+            self._wakeup.set()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="admin-log-sink")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """flush של מה שנשאר בתור ועצירת ה-worker (נקרא ב-shutdown)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Log sink flush timed out, dropping %s lines", len(self._buffer))
+        finally:
+            if self._buffer:
+                self._count("dropped", len(self._buffer))
+                self._buffer.clear()
+                ADMIN_LOG_QUEUE_DEPTH.set(0)
+            self._task = None
+
+    def _take_batch(self) -> List[str]:
+        batch: List[str] = []
+        size = 0
+        while self._buffer:
+            line = self._buffer[0]
+            extra = len(line) + (len(SEPARATOR) if batch else 0)
+            if batch and size + extra > self.max_chars:
+                break
+            batch.append(self._buffer.popleft())
+            size += extra
+        ADMIN_LOG_QUEUE_DEPTH.set(len(self._buffer))
+        return batch
+
+    async def _deliver(self, batch: List[str]) -> None:
+        text = SEPARATOR.join(batch)
+        for attempt in range(2):
+            try:
+                await self._send(text)
+                self._count("sent", len(batch))
+                self.stats["batches"] += 1
+                ADMIN_LOG_BATCHES.inc()
+                return
+            except RetryAfter as e:
+                delay = e.retry_after
+                delay = delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+                if attempt == 0:
+                    logger.warning("Log sink rate limited, retrying in %ss", delay)
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error("Log sink still rate limited, dropping batch")
+            except Exception as e:
+                logger.error("Failed to send log batch: %s", e)
+                break
+        self._count("failed", len(batch))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._buffer:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if not self._stopping and self.linger > 0:
+                # מחכים רגע כדי לאחד שורות שמגיעות ברצף
+                await asyncio.sleep(self.linger)
+
+            wait = self._last_sent + self.min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            batch = self._take_batch()
+            if batch:
+                await self._deliver(batch)
+                self._last_sent = loop.time()
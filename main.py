@@ -1,12 +1,20 @@
 ﻿from telegram.ext import MessageHandler, filters, CallbackQueryHandler
 import os
+import asyncio
 import json
 import logging
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
-from db import init_schema, get_approval_stats, get_monthly_payments, get_reserve_stats
+from db import init_schema, close_pool, db_cursor, stop_metric_buffer
+import db_async
+from referral_store import ReferralStore
+from media_cache import TelegramFileIdCache
+from log_sink import AdminLogSink
+from core.messages import get_catalog, parse_section_blocks
+from core.update_queue import UpdateDispatcher
+from core.update_dedup import UpdateDeduplicator, SqliteSeenStore, PostgresSeenStore
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse, HTMLResponse, Response, Response
@@ -21,6 +29,13 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from fastapi.middleware.cors import CORSMiddleware
 
 from telegram import Update
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson אופציונלי
+    _json_loads = json.loads
+
 try:
     from slh_public_api import router as public_router
 except Exception:
@@ -37,6 +52,15 @@ try:
     from slhnet_extra import router as slhnet_extra_router
 except Exception:
     slhnet_extra_router = None
+try:
+    from admin_export import router as admin_export_router
+except Exception:
+    admin_export_router = None
+try:
+    from SLH.sale_verifier import SaleVerifier
+    from SLH.slh_token import SLH_CHAIN_ID, SLH_RPC_URL
+except Exception:  # web3 לא מותקן – אימות מכירות כבוי
+    SaleVerifier = None
 
 from telegram.ext import CommandHandler, ContextTypes, Application
 
@@ -77,12 +101,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# אתחול סכמת בסיס הנתונים (טבלאות + רזרבות 49%)
-try:
-    init_schema()
-except Exception as e:
-    logger.warning(f"init_schema failed: {e}")
-
 BASE_DIR = Path(__file__).resolve().parent
 
 # סטטיק וטמפלטס עם הגנות
@@ -115,6 +133,8 @@ try:
         app.include_router(core_router, prefix="/api/core", tags=["core"])
     if slhnet_extra_router is not None:
         app.include_router(slhnet_extra_router, prefix="/api/extra", tags=["extra"])
+    if admin_export_router is not None:
+        app.include_router(admin_export_router, prefix="/api/admin", tags=["admin"])
 except Exception as e:
     logger.error(f"Error including routers: {e}")
 
@@ -124,62 +144,27 @@ except Exception as e:
 # =========================
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
-REF_FILE = DATA_DIR / "referrals.json"
-
-
-def load_referrals() -> Dict[str, Any]:
-    """טוען נתוני referrals עם הגנת שגיאות"""
-    if not REF_FILE.exists():
-        return {"users": {}, "statistics": {"total_users": 0}}
-    
-    try:
-        with open(REF_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except (json.JSONDecodeError, Exception) as e:
-        logger.error(f"Error loading referrals: {e}")
-        return {"users": {}, "statistics": {"total_users": 0}}
+REF_FILE = DATA_DIR / "referrals.json"  # פורמט ישן – מיובא פעם אחת ל-SQLite
+REF_DB_FILE = DATA_DIR / "referrals.db"
 
+referral_store = ReferralStore(REF_DB_FILE)
+try:
+    referral_store.migrate_from_json(REF_FILE)
+except Exception as e:
+    logger.error(f"Error migrating referrals.json: {e}")
 
-def save_referrals(data: Dict[str, Any]) -> None:
-    """שומר נתוני referrals עם הגנת שגיאות"""
-    try:
-        # עדכון סטטיסטיקות
-        data["statistics"]["total_users"] = len(data["users"])
-        
-        with open(REF_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Error saving referrals: {e}")
+# file_id של תמונת השער – מעלים פעם אחת ושולחים לפי file_id
+banner_cache = TelegramFileIdCache(DATA_DIR / "telegram_file_ids.json")
 
 
 def register_referral(user_id: int, referrer_id: Optional[int] = None) -> bool:
     """רושם משתמש חדש עם referral"""
     try:
-        data = load_referrals()
-        suid = str(user_id)
-        
-        if suid in data["users"]:
-            return False  # כבר רשום
-            
-        user_data = {
-            "referrer": str(referrer_id) if referrer_id else None,
-            "joined_at": datetime.now().isoformat(),
-            "referral_count": 0
-        }
-        
-        data["users"][suid] = user_data
-        
-        # עדכן סטטיסטיקת referrer אם קיים
-        if referrer_id:
-            referrer_str = str(referrer_id)
-            if referrer_str in data["users"]:
-                data["users"][referrer_str]["referral_count"] = data["users"][referrer_str].get("referral_count", 0) + 1
-        
-        save_referrals(data)
-        logger.info(f"Registered new user {user_id} with referrer {referrer_id}")
-        return True
-        
+        created = referral_store.register(user_id, referrer_id)
+        if created:
+            logger.info(f"Registered new user {user_id} with referrer {referrer_id}")
+        return created
+
     except Exception as e:
         logger.error(f"Error registering referral: {e}")
         return False
@@ -189,59 +174,34 @@ def register_referral(user_id: int, referrer_id: Optional[int] = None) -> bool:
 # ניהול הודעות משופר
 # =========================
 MESSAGES_FILE = BASE_DIR / "bot_messages_slhnet.txt"
+MESSAGES = get_catalog(MESSAGES_FILE, parse_section_blocks, name="bot_messages")
 
 
 def load_message_block(block_name: str, fallback: str = "") -> str:
     """
-    טוען בלוק טקסט מהקובץ עם הגנות וטקסט ברירת מחדל
+    טוען בלוק טקסט מהקטלוג (הקובץ נקרא מחדש רק כשה-mtime משתנה)
+    עם הגנות וטקסט ברירת מחדל
     """
-    if not MESSAGES_FILE.exists():
-        logger.warning(f"Messages file not found: {MESSAGES_FILE}")
-        return fallback or f"[שגיאה: קובץ הודעות לא נמצא]"
-
     try:
-        content = MESSAGES_FILE.read_text(encoding="utf-8")
-        lines = content.splitlines()
-
-        result_lines = []
-        in_block = False
-        found_block = False
-        
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith("===") and block_name in stripped:
-                in_block = True
-                found_block = True
-                continue
-            if in_block and stripped.startswith("=== END"):
-                break
-            if in_block:
-                result_lines.append(line)
-
-        if not found_block and not fallback:
-            logger.warning(f"Message block '{block_name}' not found")
-            return f"[שגיאה: בלוק {block_name} לא נמצא]"
-            
-        if not result_lines and fallback:
-            return fallback
-            
-        return "\n".join(result_lines).strip() or fallback
-        
+        block = MESSAGES.lookup(block_name)
     except Exception as e:
         logger.error(f"Error loading message block '{block_name}': {e}")
         return fallback or f"[שגיאה בטעינת בלוק {block_name}]"
 
+    if not MESSAGES.available:
+        logger.warning(f"Messages file not found: {MESSAGES_FILE}")
+        return fallback or f"[שגיאה: קובץ הודעות לא נמצא]"
+
+    if block is None and not fallback:
+        logger.warning(f"Message block '{block_name}' not found")
+        return f"[שגיאה: בלוק {block_name} לא נמצא]"
+
+    return block or fallback
+
 
 # =========================
 # מודלים עם ולידציה
 # =========================
-class TelegramWebhookUpdate(BaseModel):
-    update_id: int
-    message: Optional[Dict[str, Any]] = None
-    callback_query: Optional[Dict[str, Any]] = None
-    edited_message: Optional[Dict[str, Any]] = None
-
-
 class HealthResponse(BaseModel):
     status: str
     service: str
@@ -266,6 +226,20 @@ class Config:
     START_IMAGE_PATH: str = os.getenv("START_IMAGE_PATH", "assets/start_banner.jpg")
     TON_WALLET_ADDRESS: str = os.getenv("TON_WALLET_ADDRESS", "")
     LOGS_GROUP_CHAT_ID: str = os.getenv("LOGS_GROUP_CHAT_ID", ADMIN_ALERT_CHAT_ID or "")
+    LOG_SINK_MAX_QUEUE: int = int(os.getenv("LOG_SINK_MAX_QUEUE", "1000"))
+    LOG_SINK_MIN_INTERVAL: float = float(os.getenv("LOG_SINK_MIN_INTERVAL", "3"))
+    # fast-ack: ה-webhook מחזיר 200 מיד ו-workers ברקע מעבדים את העדכונים
+    WEBHOOK_FAST_ACK: bool = os.getenv("WEBHOOK_FAST_ACK", "false").lower() in ("1", "true", "yes")
+    UPDATE_WORKERS: int = int(os.getenv("UPDATE_WORKERS", "8"))
+    UPDATE_QUEUE_SIZE: int = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+    # מניעת עיבוד כפול של update_id: memory / sqlite / postgres
+    UPDATE_DEDUP_BACKEND: str = os.getenv("UPDATE_DEDUP_BACKEND", "memory").lower()
+    UPDATE_DEDUP_TTL: float = float(os.getenv("UPDATE_DEDUP_TTL", "86400"))
+    # אימות עסקאות מכירת SLH (פקודת /verify_sale)
+    SLH_RPC_URLS: str = os.getenv("SLH_RPC_URLS", "")
+    SALE_VERIFY_WORKERS: int = int(os.getenv("SALE_VERIFY_WORKERS", "4"))
+    SALE_VERIFY_PER_RPC: int = int(os.getenv("SALE_VERIFY_PER_RPC", "4"))
+    SLH_MIN_SALE_AMOUNT: float = float(os.getenv("SLH_MIN_SALE_AMOUNT", "0"))
 
     @classmethod
     def validate(cls) -> List[str]:
@@ -312,6 +286,7 @@ class TelegramAppManager:
             CommandHandler("start", start_command),
             CommandHandler("whoami", whoami_command),
             CommandHandler("stats", stats_command),
+            CommandHandler("verify_sale", verify_sale_command),
             CallbackQueryHandler(callback_query_handler),
             MessageHandler(filters.TEXT & ~filters.COMMAND, echo_message),
             MessageHandler(filters.COMMAND, unknown_command),
@@ -339,10 +314,13 @@ class TelegramAppManager:
                 logger.error(f"Failed to set webhook: {e}")
             cls._started = True
             logger.info("Telegram Application started")
+        log_sink.start()
 
     @classmethod
     async def shutdown(cls) -> None:
         """עצירת האפליקציה בצורה נקייה"""
+        # קודם משחררים את לוגי האדמין שעוד בתור, כל עוד הבוט פעיל
+        await log_sink.stop()
         try:
             app_instance = cls.get_app()
             await app_instance.stop()
@@ -416,20 +394,30 @@ def build_payment_instructions() -> str:
     parts.append(footer)
     return "".join(parts)
 
+async def _deliver_log_batch(text: str) -> None:
+    """שליחה בפועל של הודעת לוג (מאוחדת) לקבוצת הלוגים"""
+    app_instance = TelegramAppManager.get_app()
+    await app_instance.bot.send_message(
+        chat_id=int(Config.LOGS_GROUP_CHAT_ID),
+        text=text
+    )
+
+
+log_sink = AdminLogSink(
+    _deliver_log_batch,
+    max_queue=Config.LOG_SINK_MAX_QUEUE,
+    min_interval=Config.LOG_SINK_MIN_INTERVAL,
+)
+
+
 async def send_log_message(text: str) -> None:
-    """שולח הודעת לוג עם הגנות"""
+    """מכניס הודעת לוג לתור ברקע – לא מחכה לשליחה לטלגרם"""
     if not Config.LOGS_GROUP_CHAT_ID:
         logger.warning("LOGS_GROUP_CHAT_ID not set; skipping log message")
         return
-        
-    try:
-        app_instance = TelegramAppManager.get_app()
-        await app_instance.bot.send_message(
-            chat_id=int(Config.LOGS_GROUP_CHAT_ID), 
-            text=text
-        )
-    except Exception as e:
-        logger.error(f"Failed to send log message: {e}")
+
+    if not log_sink.submit(text):
+        logger.warning("Admin log queue full; log message dropped")
 
 
 def safe_get_url(url: str, fallback: str) -> str:
@@ -452,7 +440,7 @@ async def send_start_screen(update: Update, context: ContextTypes.DEFAULT_TYPE,
         return
 
     # רישום referral
-    register_referral(user.id, referrer)
+    await db_async.run_db(register_referral, user.id, referrer)
 
     # טעינת הודעות עם ברירת מחדל
     title = load_message_block("START_TITLE", "🚀 ברוך הבא ל-SLHNET!")
@@ -467,10 +455,11 @@ async def send_start_screen(update: Update, context: ContextTypes.DEFAULT_TYPE,
 
     # שליחת תמונה עם הגנות
     image_path = BASE_DIR / Config.START_IMAGE_PATH
+    image_sent = False
     try:
         if image_path.exists() and image_path.is_file():
-            with image_path.open("rb") as f:
-                await chat.send_photo(photo=InputFile(f), caption=title)
+            await banner_cache.send_photo(chat, image_path, caption=title)
+            image_sent = True
         else:
             logger.warning(f"Start image not found: {image_path}")
             await chat.send_message(text=title)
@@ -478,6 +467,12 @@ async def send_start_screen(update: Update, context: ContextTypes.DEFAULT_TYPE,
         logger.error(f"Error sending start image: {e}")
         await chat.send_message(text=title)
 
+    if image_sent:
+        try:
+            await db_async.increment_metric("start_image_views")
+        except Exception as e:
+            logger.warning(f"Failed to count start image view: {e}")
+
     # כפתורי פעולה
     pay_url = safe_get_url(Config.PAYBOX_URL, Config.LANDING_URL + "#join39")
 
@@ -522,9 +517,8 @@ async def whoami_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await chat.send_message("❌ לא זיהיתי משתמש.")
         return
 
-    # מידע נוסף מהרפר�rals
-    referrals_data = load_referrals()
-    user_ref_data = referrals_data["users"].get(str(user.id), {})
+    # מידע נוסף מהרפרלים
+    user_ref_data = await db_async.run_db(referral_store.get_user, user.id) or {}
     
     text = (
         f"👤 **פרטי המשתמש שלך:**\n"
@@ -546,14 +540,13 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not user:
         return
 
-    referrals_data = load_referrals()
-    stats = referrals_data.get("statistics", {})
+    stats = await db_async.run_db(referral_store.get_stats)
     
     text = (
         f"📊 **סטטיסטיקות קהילה:**\n"
-        f"👥 סה״כ משתמשים: {stats.get('total_users', 0)}\n"
-        f"📈 משתמשים פעילים: {len(referrals_data.get('users', {}))}\n"
-        f"🔄 הפניות כוללות: {sum(u.get('referral_count', 0) for u in referrals_data.get('users', {}).values())}"
+        f"👥 סה״כ משתמשים: {stats['total_users']}\n"
+        f"📈 משתמשים פעילים: {stats['total_users']}\n"
+        f"🔄 הפניות כוללות: {stats['total_referrals']}"
     )
     
     await chat.send_message(text=text, parse_mode="Markdown")
@@ -561,6 +554,54 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 
 
+async def verify_sale_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/verify_sale <tx_hash> – אימות עסקת מכירת SLH ברקע, התשובה נשלחת כשהבדיקה מסתיימת"""
+    user = update.effective_user
+    chat = update.effective_chat
+    if not user or not chat:
+        return
+
+    if sale_verifier is None:
+        await chat.send_message("❌ אימות עסקאות לא זמין כרגע.")
+        return
+    if not context.args:
+        await chat.send_message("שימוש: /verify_sale <tx_hash>")
+        return
+
+    try:
+        wallet = await db_async.get_primary_wallet(user.id, SLH_CHAIN_ID)
+    except Exception as e:
+        logger.error(f"Failed to load wallet for {user.id}: {e}")
+        wallet = None
+    if not wallet:
+        await chat.send_message("❌ לא נמצא ארנק BSC מקושר לחשבון שלך.")
+        return
+
+    try:
+        result_future = sale_verifier.submit(user.id, context.args[0], wallet["address"], Config.SLH_MIN_SALE_AMOUNT)
+    except (ValueError, RuntimeError) as e:
+        await chat.send_message(f"❌ {e}")
+        return
+
+    await chat.send_message("⏳ העסקה התקבלה לבדיקה – נעדכן כאן כשהיא תאומת.")
+    context.application.create_task(_report_sale_result(chat, result_future))
+
+
+async def _report_sale_result(chat, result_future) -> None:
+    try:
+        result = await result_future
+    except asyncio.CancelledError:
+        return
+    if result.already_credited:
+        # אותה עסקה כבר אומתה ונרשמה – לא מאשרים ולא מדווחים לאדמין שוב
+        await chat.send_message(f"ℹ️ העסקה כבר אומתה וזוכתה בעבר (מכירה #{result.sale_id}).")
+    elif result.ok:
+        await chat.send_message(f"✅ העסקה אומתה: {result.amount_slh} SLH (בלוק {result.block_number}).")
+        await send_log_message(f"💰 מכירת SLH אומתה: {result.tx_hash} ({result.amount_slh} SLH)")
+    else:
+        await chat.send_message(f"❌ העסקה לא אומתה: {result.message}")
+
+
 async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """מטפל ב-callback queries של תפריט ההתחלה"""
     query = update.callback_query
@@ -658,13 +699,15 @@ async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def finance_metrics():
     """סטטוס כספי כולל – הכנסות, רזרבות, נטו ואישורים."""
     from datetime import datetime
-    reserve_stats = get_reserve_stats() or {}
-    approval_stats = get_approval_stats() or {}
+    # snapshot משותף (שאילתה אחת, cache קצר) – גם ל-risk summary ולדשבורד
+    snapshot = await db_async.get_stats_snapshot()
 
     return {
         "timestamp": datetime.utcnow().isoformat() + "Z",
-        "reserve": reserve_stats,
-        "approvals": approval_stats,
+        "reserve": snapshot["reserve"] or {},
+        "approvals": snapshot["approvals"] or {},
+        "users": snapshot["users"] or {},
+        "cache_age_seconds": snapshot["cache_age_seconds"],
     }
 
 
@@ -708,16 +751,88 @@ async def landing(request: Request):
     )
 
 
+async def _process_raw_update(raw_update: Dict[str, Any]) -> None:
+    """מעבד עדכון גולמי (dict) דרך ה-Application של PTB"""
+    app_instance = TelegramAppManager.get_app()
+    ptb_update = Update.de_json(raw_update, app_instance.bot)
+    if ptb_update:
+        await app_instance.process_update(ptb_update)
+
+
+sale_verifier = None
+if SaleVerifier is not None:
+    sale_verifier = SaleVerifier(
+        [u.strip() for u in (Config.SLH_RPC_URLS or SLH_RPC_URL).split(",") if u.strip()],
+        per_rpc_concurrency=Config.SALE_VERIFY_PER_RPC,
+        workers=Config.SALE_VERIFY_WORKERS,
+    )
+
+update_dispatcher = UpdateDispatcher(
+    _process_raw_update,
+    workers=Config.UPDATE_WORKERS,
+    max_queue=Config.UPDATE_QUEUE_SIZE,
+    name="main",
+)
+
+
+def _build_seen_update_store():
+    """בוחר את ה-backend המשותף ל-update_id שכבר נראו"""
+    if Config.UPDATE_DEDUP_BACKEND == "sqlite":
+        return SqliteSeenStore(DATA_DIR / "seen_updates.db")
+    if Config.UPDATE_DEDUP_BACKEND == "postgres":
+        return PostgresSeenStore(db_cursor)
+    return None
+
+
+update_dedup = UpdateDeduplicator(
+    scope="main",
+    ttl=Config.UPDATE_DEDUP_TTL,
+    store=_build_seen_update_store(),
+)
+
+
+def parse_webhook_body(body: bytes) -> Optional[Dict[str, Any]]:
+    """
+    מפענח את גוף ה-webhook פעם אחת (orjson אם מותקן) ומחזיר dict,
+    או None אם זה לא עדכון טלגרם תקין (חסר update_id מספרי).
+    """
+    try:
+        data = _json_loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    update_id = data.get("update_id")
+    if not isinstance(update_id, int) or isinstance(update_id, bool):
+        return None
+    return data
+
+
 @app.post("/webhook")
-async def telegram_webhook(update: TelegramWebhookUpdate):
+async def telegram_webhook(request: Request):
     """Webhook endpoint עם הגנות"""
+    raw_update = parse_webhook_body(await request.body())
+    if raw_update is None:
+        return JSONResponse({"status": "invalid_update"}, status_code=400)
+    update_id = raw_update["update_id"]
+
     try:
         # אתחול אוטומטי אם needed
         TelegramAppManager.initialize_handlers()
         app_instance = TelegramAppManager.get_app()
 
-        # המרה ועיבוד
-        raw_update = update.dict()
+        # עדכון שכבר התקבל (שליחה חוזרת של טלגרם) – מאשרים ולא מעבדים שוב
+        if await update_dedup.is_duplicate(update_id):
+            return JSONResponse({"status": "duplicate"})
+
+        if Config.WEBHOOK_FAST_ACK:
+            # מחזירים 200 מיד; אם התור מלא – 503 וטלגרם ישלח שוב מאוחר יותר
+            if update_dispatcher.enqueue(raw_update):
+                return JSONResponse({"status": "queued"})
+            await update_dedup.forget(update_id)
+            return JSONResponse({"status": "busy"}, status_code=503)
+
+        # ה-dict עובר ישירות ל-PTB, בלי מודל ביניים
         ptb_update = Update.de_json(raw_update, app_instance.bot)
         
         if ptb_update:
@@ -728,12 +843,20 @@ async def telegram_webhook(update: TelegramWebhookUpdate):
             
     except Exception as e:
         logger.error(f"Webhook error: {e}")
+        # העדכון לא עובד – מאפשרים לטלגרם לשלוח אותו שוב
+        await update_dedup.forget(update_id)
         return JSONResponse({"status": "error", "detail": str(e)}, status_code=500)
 
 
 @app.on_event("startup")
 async def startup_event():
     """אתחול during startup"""
+    # סכמת בסיס הנתונים (migrations) – בעליית השרת ולא בזמן import של המודול
+    try:
+        await db_async.run_db(init_schema)
+    except Exception as e:
+        logger.warning(f"init_schema failed: {e}")
+
     warnings = Config.validate()
     for warning in warnings:
         logger.warning(warning)
@@ -745,6 +868,22 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start Telegram Application: {e}")
         # לא מפילים את השרת HTTP, אבל שומרים לוג
+    if Config.WEBHOOK_FAST_ACK:
+        update_dispatcher.start()
+    if sale_verifier is not None:
+        sale_verifier.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """סגירה מסודרת של משאבים"""
+    await update_dispatcher.stop()
+    if sale_verifier is not None:
+        await sale_verifier.stop()
+    await TelegramAppManager.shutdown()
+    db_async.shutdown()
+    stop_metric_buffer()
+    close_pool()
 
 # הרצה מקומית
 # =========================
@@ -0,0 +1,107 @@
+# media_cache.py
+"""
+Cache של file_id מטלגרם לקבצי מדיה קבועים (למשל תמונת השער של /start).
+
+במקום להעלות את הקובץ מחדש בכל שליחה, מעלים פעם אחת, שומרים את ה-file_id
+שטלגרם החזיר ושולחים אותו בפעמים הבאות. המפתח הוא hash של תוכן הקובץ
+(+ מזהה הבוט, כי file_id תקף רק לבוט שהעלה אותו), כך שהחלפת התמונה
+מבטלת את ה-cache אוטומטית.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from telegram import InputFile, Message
+from telegram.error import BadRequest
+
+logger = logging.getLogger("slhnet.media")
+
+
+class TelegramFileIdCache:
+    """file_id לפי hash של הקובץ, נשמר לקובץ JSON (כתיבה אטומית)."""
+
+    def __init__(self, store_path: Path) -> None:
+        self.store_path = Path(store_path)
+        self._lock = threading.Lock()
+        self._digests: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, size, sha256)
+        self._file_ids: Dict[str, str] = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        if not self.store_path.exists():
+            return {}
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {str(k): str(v) for k, v in data.items()}
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read file_id cache %s: %s", self.store_path, e)
+            return {}
+
+    def _save(self) -> None:
+        tmp = self.store_path.with_name(f"{self.store_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._file_ids, f, indent=2)
+        os.replace(tmp, self.store_path)
+
+    def digest(self, path: Path) -> str:
+        """sha256 של הקובץ; מחושב מחדש רק כשה-mtime/size משתנים."""
+        st = os.stat(path)
+        key = str(path)
+        cached = self._digests.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+        self._digests[key] = (st.st_mtime_ns, st.st_size, sha)
+        return sha
+
+    def get(self, key: str) -> Optional[str]:
+        return self._file_ids.get(key)
+
+    def put(self, key: str, file_id: str) -> None:
+        with self._lock:
+            # מיזוג עם מה ש-workers אחרים אולי כתבו בינתיים
+            merged = self._load()
+            merged.update(self._file_ids)
+            merged[key] = file_id
+            self._file_ids = merged
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Could not persist file_id cache: %s", e)
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            if self._file_ids.pop(key, None) is not None:
+                try:
+                    self._save()
+                except OSError as e:
+                    logger.warning("Could not persist file_id cache: %s", e)
+
+    async def send_photo(self, chat, path: Path, caption: Optional[str] = None) -> Message:
+        """
+        שולח תמונה לצ'אט: לפי file_id שמור אם יש, אחרת העלאה ושמירת ה-file_id.
+        file_id שטלגרם דוחה נמחק ומועלה מחדש.
+        """
+        key = f"{chat.get_bot().id}:{self.digest(path)}"
+        file_id = self.get(key)
+        if file_id:
+            try:
+                return await chat.send_photo(photo=file_id, caption=caption)
+            except BadRequest as e:
+                logger.warning("Cached file_id rejected (%s), re-uploading %s", e, path)
+                self.forget(key)
+
+        with open(path, "rb") as f:
+            message = await chat.send_photo(photo=InputFile(f), caption=caption)
+        if message.photo:
+            self.put(key, message.photo[-1].file_id)
+            logger.info("Uploaded %s, cached file_id", path)
+        return message
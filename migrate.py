@@ -0,0 +1,173 @@
+# migrate.py
+"""
+מריץ migrations של סכמת ה-DB לפי סדר.
+
+כל קובץ ב-migrations/ בשם NNNN_description.sql הוא migration אחד. הטבלה
+schema_migrations שומרת אילו גרסאות כבר רצו, כך שכל migration רץ פעם אחת
+בלבד (בטרנזקציה משלו). advisory lock של Postgres מבטיח שרק תהליך אחד מריץ
+migrations בזמן deploy, גם כשכמה workers עולים יחד.
+
+שימוש:
+    python migrate.py           # מריץ את כל מה שעוד לא רץ
+    python migrate.py --status  # מציג אילו migrations רצו ואילו ממתינים
+"""
+import hashlib
+import logging
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Set
+
+import db
+
+logger = logging.getLogger("slhnet.migrate")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+MIGRATION_FILE_RE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+
+# מספר קבוע ל-pg_advisory_lock (כל תהליך שמריץ migrations נועל אותו)
+MIGRATIONS_LOCK_ID = 0x534C484E  # "SLHN"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """כל קבצי ה-migration בתיקייה, ממוינים לפי מספר הגרסה."""
+    migrations: List[Migration] = []
+    seen: Set[str] = set()
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE_RE.match(path.name)
+        if not match:
+            logger.warning("Skipping migration file with unexpected name: %s", path.name)
+            continue
+        version, name = match.groups()
+        if version in seen:
+            raise RuntimeError(f"Duplicate migration version {version} ({path.name})")
+        seen.add(version)
+        migrations.append(Migration(version=version, name=name, path=path))
+    return migrations
+
+
+def _ensure_migrations_table(cur) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """
+    )
+
+
+def _applied_versions(cur) -> Set[str]:
+    cur.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cur.fetchall()}
+
+
+def run_migrations(directory: Path = MIGRATIONS_DIR) -> List[str]:
+    """
+    מריץ את כל ה-migrations שעוד לא רצו. מחזיר את רשימת הגרסאות שהורצו.
+    זורק RuntimeError אם DATABASE_URL לא מוגדר.
+    """
+    migrations = discover_migrations(directory)
+    pool = db.get_pool()
+    if pool is None:
+        raise RuntimeError("DATABASE_URL not set")
+
+    applied_now: List[str] = []
+    with pool.connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_ID,))
+            try:
+                with conn.cursor() as cur:
+                    _ensure_migrations_table(cur)
+                    done = _applied_versions(cur)
+
+                conn.autocommit = False
+                for migration in migrations:
+                    if migration.version in done:
+                        continue
+                    logger.info("Applying migration %s_%s", migration.version, migration.name)
+                    with conn:
+                        with conn.cursor() as cur:
+                            cur.execute(migration.sql)
+                            cur.execute(
+                                """
+                                INSERT INTO schema_migrations (version, name, checksum)
+                                VALUES (%s, %s, %s);
+                                """,
+                                (migration.version, migration.name, migration.checksum),
+                            )
+                    applied_now.append(migration.version)
+            finally:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATIONS_LOCK_ID,))
+        finally:
+            conn.autocommit = False
+
+    if applied_now:
+        logger.info("Applied %s migration(s): %s", len(applied_now), ", ".join(applied_now))
+    else:
+        logger.info("DB schema is up to date (%s migrations).", len(migrations))
+    return applied_now
+
+
+def migration_status(directory: Path = MIGRATIONS_DIR) -> List[dict]:
+    """מצב כל migration: רץ / ממתין, ואם הקובץ השתנה מאז שרץ."""
+    migrations = discover_migrations(directory)
+    with db.db_transaction() as conn:
+        with conn.cursor() as cur:
+            _ensure_migrations_table(cur)
+            cur.execute("SELECT version, checksum, applied_at FROM schema_migrations;")
+            applied = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+    status = []
+    for migration in migrations:
+        checksum, applied_at = applied.get(migration.version, (None, None))
+        status.append(
+            {
+                "version": migration.version,
+                "name": migration.name,
+                "applied_at": applied_at,
+                "modified": checksum is not None and checksum != migration.checksum,
+            }
+        )
+    return status
+
+
+def main(argv: List[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        if "--status" in argv:
+            for item in migration_status():
+                state = item["applied_at"].isoformat() if item["applied_at"] else "pending"
+                flag = "  (file changed since applied!)" if item["modified"] else ""
+                print(f"{item['version']}_{item['name']:<40} {state}{flag}")
+        else:
+            run_migrations()
+    finally:
+        db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,61 @@
+-- טבלאות הבסיס: תשלומים, משתמשים, הפניות, פרסים ומונים.
+-- IF NOT EXISTS כי בהתקנות קיימות הטבלאות כבר נוצרו ע"י init_schema הישן.
+
+-- payments – תשלומים (כולל רזרבה 49%)
+CREATE TABLE IF NOT EXISTS payments (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    username TEXT,
+    pay_method TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    reason TEXT,
+    amount NUMERIC(12,2),
+    reserve_ratio NUMERIC(5,4),
+    reserve_amount NUMERIC(12,2),
+    net_amount NUMERIC(12,2),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- טבלה ישנה בלי עמודות הרזרבה
+ALTER TABLE payments
+    ADD COLUMN IF NOT EXISTS amount NUMERIC(12,2),
+    ADD COLUMN IF NOT EXISTS reserve_ratio NUMERIC(5,4),
+    ADD COLUMN IF NOT EXISTS reserve_amount NUMERIC(12,2),
+    ADD COLUMN IF NOT EXISTS net_amount NUMERIC(12,2);
+
+-- users – רשימת משתמשים
+CREATE TABLE IF NOT EXISTS users (
+    id BIGINT PRIMARY KEY,      -- Telegram user id
+    username TEXT,
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- referrals – הפניות
+CREATE TABLE IF NOT EXISTS referrals (
+    id SERIAL PRIMARY KEY,
+    referrer_id BIGINT NOT NULL,
+    referred_id BIGINT NOT NULL,
+    source TEXT,
+    points INT NOT NULL DEFAULT 1,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- rewards – פרסים/נקודות (SLH, NFT, SHARE וכו')
+CREATE TABLE IF NOT EXISTS rewards (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    reward_type TEXT NOT NULL,      -- "SLH", "NFT", "SHARE", ...
+    reason TEXT,
+    points INT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending/sent/failed
+    tx_hash TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- metrics – מונים גלובליים (למשל start_image_views)
+CREATE TABLE IF NOT EXISTS metrics (
+    key TEXT PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
@@ -0,0 +1,6 @@
+-- אינדקסים לדוחות חודשיים ולעדכון התשלום האחרון של משתמש
+CREATE INDEX IF NOT EXISTS payments_created_at_idx
+    ON payments (created_at);
+
+CREATE INDEX IF NOT EXISTS payments_user_created_at_idx
+    ON payments (user_id, created_at DESC);
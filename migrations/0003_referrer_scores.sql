@@ -0,0 +1,18 @@
+-- referrer_scores – סיכום הפניות לכל מפנה, מתעדכן ב-add_referral (Leaderboard)
+CREATE TABLE IF NOT EXISTS referrer_scores (
+    referrer_id BIGINT PRIMARY KEY,
+    total_referrals BIGINT NOT NULL DEFAULT 0,
+    total_points BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS referrer_scores_rank_idx
+    ON referrer_scores (total_points DESC, total_referrals DESC);
+
+-- מילוי ראשוני מתוך referrals (רק כשהטבלה עדיין ריקה)
+INSERT INTO referrer_scores (referrer_id, total_referrals, total_points)
+SELECT referrer_id, COUNT(*), COALESCE(SUM(points), 0)
+FROM referrals
+WHERE NOT EXISTS (SELECT 1 FROM referrer_scores)
+GROUP BY referrer_id
+ON CONFLICT (referrer_id) DO NOTHING;
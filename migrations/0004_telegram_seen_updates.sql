@@ -0,0 +1,7 @@
+-- telegram_seen_updates – update_id שכבר טופלו (מניעת כפילויות בין workers)
+CREATE TABLE IF NOT EXISTS telegram_seen_updates (
+    scope TEXT NOT NULL,
+    update_id BIGINT NOT NULL,
+    seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (scope, update_id)
+);
@@ -0,0 +1,36 @@
+-- SLHNET: ארנקים, מכירות טוקן מאומתות ופוסטים
+CREATE TABLE IF NOT EXISTS wallets (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    telegram_username TEXT,
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    is_primary BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (chain_id, address)
+);
+
+CREATE TABLE IF NOT EXISTS token_sales (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    wallet_address TEXT NOT NULL,
+    chain_id INTEGER NOT NULL,
+    amount_slh NUMERIC(36, 18) NOT NULL,
+    tx_hash TEXT NOT NULL,
+    tx_status TEXT NOT NULL DEFAULT 'verified',
+    tx_error TEXT,
+    block_number BIGINT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    username TEXT,
+    title TEXT,
+    content TEXT,
+    image_url TEXT,
+    link_url TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    status TEXT NOT NULL DEFAULT 'published'
+);
@@ -0,0 +1,24 @@
+-- פוסטים מהרשת החברתית
+CREATE TABLE IF NOT EXISTS slh_posts (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT,
+    username TEXT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    share_url TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    is_published BOOLEAN DEFAULT TRUE
+);
+
+-- מכירות SLH שתועדו דרך המערכת
+CREATE TABLE IF NOT EXISTS slh_token_sales (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT,
+    username TEXT,
+    wallet_address TEXT,
+    amount_slh NUMERIC(36, 18),
+    price_nis NUMERIC(18, 2),
+    status TEXT DEFAULT 'pending',
+    tx_hash TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,23 @@
+-- pagination לפי (created_at, id) בפיד ובלוח המכירות – אינדקס מורכב לכל רשימה,
+-- כך שכל דף (גם דף 1000) הוא index scan קצר במקום OFFSET שסורק את כל מה שלפניו.
+
+-- ב-slh_posts / slh_token_sales העמודה הייתה nullable; keyset דורש ערך בכל שורה
+UPDATE slh_posts SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE slh_posts ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE slh_token_sales SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE slh_token_sales ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS token_sales_created_id_idx
+    ON token_sales (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS posts_published_created_id_idx
+    ON posts (created_at DESC, id DESC)
+    WHERE status = 'published';
+
+CREATE INDEX IF NOT EXISTS slh_posts_published_created_id_idx
+    ON slh_posts (created_at DESC, id DESC)
+    WHERE is_published = TRUE;
+
+CREATE INDEX IF NOT EXISTS slh_token_sales_created_id_idx
+    ON slh_token_sales (created_at DESC, id DESC);
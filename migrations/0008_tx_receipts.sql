@@ -0,0 +1,9 @@
+-- tx_receipts – receipts סופיים (מעבר לעומק האישורים) של עסקאות SLH שנבדקו,
+-- עם אירועי ה-Transfer המפוענחים. אימות חוזר של אותה עסקה לא פונה ל-RPC.
+CREATE TABLE IF NOT EXISTS tx_receipts (
+    tx_hash TEXT PRIMARY KEY,           -- lowercase 0x...
+    block_number BIGINT NOT NULL,
+    status SMALLINT NOT NULL,           -- 1 = הצליחה, 0 = נכשלה
+    transfers JSONB NOT NULL DEFAULT '[]'::jsonb,   -- [{"from", "to", "value"}] (value כמחרוזת)
+    cached_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,19 @@
+-- מכירה אחת לכל tx_hash: אימות חוזר של אותה עסקה מעדכן את השורה הקיימת
+-- (create_token_sales עושה ON CONFLICT) במקום להוסיף מכירה נוספת.
+
+-- ה-verifier שומר tx_hash באותיות קטנות; מיישרים שורות ישנות לפני האיחוד
+UPDATE token_sales SET tx_hash = lower(tx_hash) WHERE tx_hash <> lower(tx_hash);
+
+-- כפילויות קיימות: נשארת שורה אחת לכל עסקה – המאומתת, ואם אין כזו הראשונה
+DELETE FROM token_sales t
+USING (
+    SELECT id,
+           row_number() OVER (
+               PARTITION BY tx_hash
+               ORDER BY (tx_status = 'verified') DESC, id
+           ) AS rn
+    FROM token_sales
+) ranked
+WHERE t.id = ranked.id AND ranked.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS token_sales_tx_hash_key ON token_sales (tx_hash);
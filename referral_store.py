@@ -0,0 +1,190 @@
+# referral_store.py
+"""
+מאגר referrals מבוסס SQLite (WAL) במקום data/referrals.json.
+
+- חיפוש / עדכון של משתמש בודד לפי מפתח ראשי – O(1) ולא קריאה של כל הקובץ.
+- כל רישום רץ בטרנזקציה אחת (BEGIN IMMEDIATE), כך שכמה workers של uvicorn
+  יכולים לכתוב במקביל בלי לדרוס אחד את השני.
+- הסטטיסטיקות (סה"כ משתמשים / הפניות) נשמרות כמונים ומתעדכנות באותה טרנזקציה.
+- בפתיחה הראשונה מייבאים חד-פעמית את referrals.json הישן (אם קיים).
+"""
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("slhnet.referrals")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS referral_users (
+    user_id        INTEGER PRIMARY KEY,
+    referrer_id    INTEGER,
+    joined_at      TEXT NOT NULL,
+    referral_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS referral_meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class ReferralStore:
+    """מאגר referrals thread-safe (חיבור SQLite נפרד לכל thread)."""
+
+    def __init__(self, db_path: Path, busy_timeout: float = 10.0) -> None:
+        self.db_path = Path(db_path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                str(self.db_path),
+                timeout=self.busy_timeout,
+                isolation_level=None,  # ניהול טרנזקציות ידני
+                check_same_thread=False,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, key: str, amount: int = 1) -> None:
+        conn.execute(
+            """
+            INSERT INTO referral_meta (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = value + excluded.value;
+            """,
+            (key, amount),
+        )
+
+    def register(self, user_id: int, referrer_id: Optional[int] = None) -> bool:
+        """רושם משתמש חדש. מחזיר False אם המשתמש כבר רשום."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            cur = conn.execute(
+                """
+                INSERT OR IGNORE INTO referral_users (user_id, referrer_id, joined_at)
+                VALUES (?, ?, ?);
+                """,
+                (user_id, referrer_id, datetime.now().isoformat()),
+            )
+            if cur.rowcount == 0:
+                conn.execute("ROLLBACK;")
+                return False
+
+            self._bump(conn, "total_users")
+            if referrer_id:
+                cur = conn.execute(
+                    "UPDATE referral_users SET referral_count = referral_count + 1 WHERE user_id = ?;",
+                    (referrer_id,),
+                )
+                if cur.rowcount:
+                    self._bump(conn, "total_referrals")
+            conn.execute("COMMIT;")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT referrer_id, joined_at, referral_count FROM referral_users WHERE user_id = ?;",
+            (user_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "referrer": str(row["referrer_id"]) if row["referrer_id"] else None,
+            "joined_at": row["joined_at"],
+            "referral_count": row["referral_count"],
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT key, value FROM referral_meta WHERE key IN ('total_users', 'total_referrals');"
+        ).fetchall()
+        stats = {"total_users": 0, "total_referrals": 0}
+        stats.update({row["key"]: int(row["value"]) for row in rows})
+        return stats
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """
+        ייבוא חד-פעמי מ-referrals.json הישן. מחזיר כמה משתמשים יובאו.
+        אחרי ייבוא מוצלח הקובץ משתנה ל-referrals.json.migrated.
+        """
+        json_path = Path(json_path)
+        if not json_path.exists():
+            return 0
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            done = conn.execute(
+                "SELECT value FROM referral_meta WHERE key = 'json_migrated';"
+            ).fetchone()
+            if done and done["value"]:
+                conn.execute("ROLLBACK;")
+                return 0
+
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            users = data.get("users", {})
+
+            rows = []
+            for suid, info in users.items():
+                try:
+                    referrer = info.get("referrer")
+                    rows.append(
+                        (
+                            int(suid),
+                            int(referrer) if referrer else None,
+                            info.get("joined_at") or datetime.now().isoformat(),
+                            int(info.get("referral_count", 0)),
+                        )
+                    )
+                except (TypeError, ValueError):
+                    logger.warning("Skipping malformed referral entry %r", suid)
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO referral_users (user_id, referrer_id, joined_at, referral_count)
+                VALUES (?, ?, ?, ?);
+                """,
+                rows,
+            )
+
+            # חישוב מחדש של המונים מתוך הטבלה, פעם אחת
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO referral_meta (key, value)
+                SELECT 'total_users', COUNT(*) FROM referral_users;
+                """
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO referral_meta (key, value)
+                SELECT 'total_referrals', COALESCE(SUM(referral_count), 0) FROM referral_users;
+                """
+            )
+            conn.execute("INSERT OR REPLACE INTO referral_meta (key, value) VALUES ('json_migrated', 1);")
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+        try:
+            json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        except OSError as e:
+            logger.warning("Could not rename %s after migration: %s", json_path, e)
+        logger.info("Migrated %s referral users from %s", len(rows), json_path)
+        return len(rows)
@@ -1,15 +1,39 @@
 ﻿from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+import db
+import db_async
+from core.pagination import Keyset, decode_cursor, next_cursor
+
+try:
+    import orjson
+
+    def _ndjson_line(row: Dict[str, Any]) -> bytes:
+        return orjson.dumps(row) + b"\n"
+except ImportError:  # orjson אופציונלי
+    import json
+
+    def _ndjson_line(row: Dict[str, Any]) -> bytes:
+        return (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8")
 
 router = APIRouter()
 
 
-@router.get("/api/posts")
-async def list_posts(limit: int = Query(20, ge=1, le=100)) -> Dict[str, Any]:
-    # כרגע פוסטים דמיוניים  רק כדי שפיד לא יקרוס
-    example_posts = [
+def _parse_cursor(cursor: Optional[str]) -> Optional[Keyset]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def _demo_posts() -> List[Dict[str, Any]]:
+    # פוסט דמו כשאין DB – רק כדי שהפיד לא יקרוס
+    return [
         {
             "id": "demo-1",
             "author": "SLHNET System",
@@ -18,7 +42,58 @@ async def list_posts(limit: int = Query(20, ge=1, le=100)) -> Dict[str, Any]:
             "created_at": datetime.utcnow().isoformat() + "Z",
         }
     ]
-    return {
-        "items": example_posts[:limit],
-        "total": len(example_posts),
-    }
+
+
+@router.get("/api/posts")
+async def list_posts(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor מהדף הקודם"),
+) -> Dict[str, Any]:
+    """
+    פיד הפוסטים, מהחדש לישן. הדף הבא מתבקש עם ה-next_cursor שהוחזר
+    (pagination לפי (created_at, id) – כל דף עולה אותו דבר, גם דף 1000).
+    """
+    before = _parse_cursor(cursor)
+    if not db.DATABASE_URL:
+        return {"items": _demo_posts()[:limit], "next_cursor": None}
+
+    posts = await db_async.fetch_posts(limit=limit, before=before)
+    return {"items": posts, "next_cursor": next_cursor(posts, limit)}
+
+
+@router.get("/api/token-sales")
+async def list_token_sales(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor מהדף הקודם"),
+) -> Dict[str, Any]:
+    """לוח המכירות הציבורי (slh_token_sales), מהחדש לישן, עם cursor לדף הבא."""
+    before = _parse_cursor(cursor)
+    if not db.DATABASE_URL:
+        return {"items": [], "next_cursor": None}
+
+    sales = await db_async.fetch_token_sales(limit=limit, before=before)
+    return {"items": sales, "next_cursor": next_cursor(sales, limit)}
+
+
+def _ndjson_stream(rows) -> StreamingResponse:
+    # גנרטור סינכרוני – Starlette מריץ אותו ב-threadpool, דף keyset אחד בזיכרון בכל רגע
+    return StreamingResponse(
+        (_ndjson_line(row) for row in rows),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/api/posts/export")
+def export_posts() -> StreamingResponse:
+    """כל הפוסטים שפורסמו כ-NDJSON (שורה לכל פוסט)."""
+    if not db.DATABASE_URL:
+        raise HTTPException(status_code=503, detail="database not configured")
+    return _ndjson_stream(db.iter_posts())
+
+
+@router.get("/api/token-sales/export")
+def export_token_sales() -> StreamingResponse:
+    """כל לוח המכירות כ-NDJSON (שורה לכל מכירה)."""
+    if not db.DATABASE_URL:
+        raise HTTPException(status_code=503, detail="database not configured")
+    return _ndjson_stream(db.iter_slh_token_sales())